@@ -1,70 +1,3710 @@
-import psutil
 import time
 from datetime import datetime, timedelta
 import json
 from pathlib import Path
 import os
-import tkinter as tk
-from tkinter import ttk, simpledialog, messagebox
 import threading
-from collections import defaultdict
-import win32gui
-import win32process
+import queue
+from collections import defaultdict, OrderedDict, namedtuple
 import sys
-import winreg
-import pystray
-from PIL import Image
+import random
+import bisect
+import re
+from array import array
+from itertools import islice
+
+def atomic_write_bytes(path, data):
+    """Escribe `data` en un archivo temporal y lo renombra sobre `path`. Devuelve los bytes escritos."""
+    path = Path(path)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return len(data)
+
+def atomic_write_json(path, data, indent=None):
+    """Escribe JSON en un archivo temporal y lo renombra sobre `path`. Devuelve los bytes escritos."""
+    if indent is None:
+        text = json.dumps(data, separators=(',', ':'))
+    else:
+        text = json.dumps(data, indent=indent)
+    return atomic_write_bytes(path, text.encode('utf-8'))
+
+class LatencyHistogram:
+    """Histograma de latencias con cubetas logarítmicas fijas, en milisegundos.
+
+    Registrar una muestra cuesta una búsqueda binaria sobre 16 límites y no
+    guarda las muestras, así que puede quedar activo siempre. Los percentiles se
+    aproximan con el límite superior de la cubeta correspondiente.
+    """
+
+    BOUNDS_MS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, seconds):
+        ms = seconds * 1000
+        self.counts[bisect.bisect_left(self.BOUNDS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def percentile(self, fraction):
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.BOUNDS_MS, self.counts):
+            seen += count
+            if seen >= target:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'mean_ms': self.total_ms / self.count if self.count else 0.0,
+            'p50_ms': self.percentile(0.50),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'max_ms': self.max_ms,
+            'buckets': {f"<={bound}": count for bound, count in zip(self.BOUNDS_MS, self.counts) if count},
+            'over_max_bucket': self.counts[-1],
+        }
+
+class SamplerStats:
+    """Métricas del hilo de muestreo: latencia por fase, ticks atrasados y ventanas.
+
+    El hilo de muestreo junta las duraciones de una vuelta y las registra de una
+    sola vez con record_loop(), así el lock se toma una vez por vuelta. Las fases
+    son 'resync' (enumerar y validar todas las ventanas), 'update' (revalidar
+    las que avisaron los eventos), 'focus' (primer plano e inactividad),
+    'accounting' (acreditar el tiempo y anotarlo en el diario), 'publish'
+    (snapshot y aviso a la interfaz) y 'loop' (la vuelta completa, sin la espera).
+    """
+
+    PHASES = ('resync', 'update', 'focus', 'accounting', 'publish', 'loop')
+
+    def __init__(self, overrun_threshold=1.0):
+        self.overrun_threshold = overrun_threshold
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started = time.time()
+            self.phases = {phase: LatencyHistogram() for phase in self.PHASES}
+            self.wake_lag = LatencyHistogram()
+            self.loops = 0
+            self.ticks = 0
+            self.overruns = 0
+            self.windows_last = 0
+            self.windows_max = 0
+            self.windows_total = 0
+
+    def record_loop(self, timings, windows, due, lag=0.0):
+        """Registra una vuelta: `timings` es {fase: segundos} y `lag` el atraso del tick."""
+        with self.lock:
+            for phase, seconds in timings.items():
+                self.phases[phase].record(seconds)
+            self.loops += 1
+            if due:
+                self.ticks += 1
+                self.wake_lag.record(lag)
+            if timings.get('loop', 0.0) > self.overrun_threshold:
+                self.overruns += 1
+            self.windows_last = windows
+            self.windows_max = max(self.windows_max, windows)
+            self.windows_total += windows
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                'since': datetime.fromtimestamp(self.started).isoformat(timespec='seconds'),
+                'loops': self.loops,
+                'ticks': self.ticks,
+                'overruns': self.overruns,
+                'overrun_threshold_s': self.overrun_threshold,
+                'windows': {
+                    'last': self.windows_last,
+                    'max': self.windows_max,
+                    'mean': self.windows_total / self.loops if self.loops else 0.0,
+                },
+                'phases': {phase: histogram.to_dict() for phase, histogram in self.phases.items()},
+                'wake_lag': self.wake_lag.to_dict(),
+            }
+
+class SamplerProfiler:
+    """Perfilado opcional del hilo de muestreo con cProfile, activable en ejecución.
+
+    cProfile solo mide el hilo que lo activa: `enabled` es el pedido y el hilo
+    de muestreo lo aplica con apply() al comienzo de cada vuelta. Al apagarlo se
+    guarda el perfil en `output_dir` (se abre con pstats o snakeviz) y se
+    conserva un resumen de las funciones con más tiempo propio.
+    """
+
+    def __init__(self, output_dir, top=25):
+        self.output_dir = Path(output_dir)
+        self.top = top
+        self.enabled = False
+        self.error = None
+        self.last_path = None
+        self.summary = []
+        self._profile = None
+
+    def apply(self):
+        """Enciende o apaga el perfilado según `enabled`. Solo desde el hilo de muestreo."""
+        if self.enabled and self._profile is None:
+            import cProfile
+
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError as e:
+                # Ya hay otro perfilador activo (un depurador, por ejemplo)
+                self.enabled = False
+                self.error = str(e)
+                return
+            self._profile = profile
+            self.error = None
+        elif not self.enabled and self._profile is not None:
+            self.finish()
+
+    def finish(self):
+        """Detiene el perfil en curso y lo guarda. Devuelve la ruta, o None si no había."""
+        profile, self._profile = self._profile, None
+        if profile is None:
+            return None
+        profile.disable()
+        import pstats
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        path = self.output_dir / f"sampler-{datetime.now():%Y%m%d-%H%M%S}.prof"
+        profile.dump_stats(path)
+        # Por tiempo propio: por tiempo acumulado encabezaría la espera de eventos
+        rows = sorted(pstats.Stats(profile).stats.items(), key=lambda item: item[1][2], reverse=True)
+        self.summary = [
+            {'function': f"{file}:{line}({name})", 'calls': calls,
+             'total_ms': total * 1000, 'cumulative_ms': cumulative * 1000}
+            for (file, line, name), (_, calls, total, cumulative, _) in rows[:self.top]
+        ]
+        self.last_path = str(path)
+        return path
+
+    def to_dict(self):
+        return {
+            'enabled': self.enabled,
+            'active': self._profile is not None,
+            'error': self.error,
+            'last_profile': self.last_path,
+            'top': list(self.summary),
+        }
+
+class PersistenceScheduler:
+    """Agrupa las escrituras a disco en un hilo de fondo.
+
+    Cada destino ('data', 'config', ...) se registra con una función que lo
+    escribe y devuelve los bytes escritos. mark_dirty() solo marca el destino;
+    el hilo lo escribe cuando vence `flush_interval` o cuando los bytes
+    pendientes superan `byte_budget`. Lo que se puede perder ante un cierre
+    abrupto es, como mucho, un intervalo de escrituras.
+    """
+
+    def __init__(self, flush_interval=5.0, byte_budget=64 * 1024):
+        self.flush_interval = flush_interval
+        self.byte_budget = byte_budget
+        self._targets = {}
+        self._dirty = set()
+        self._pending_bytes = 0
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._running = False
+        self.metrics = {}
+        self.latency = {}
+
+    def register(self, name, flush_func):
+        self._targets[name] = flush_func
+        self.metrics[name] = {'flushes': 0, 'bytes': 0, 'last_latency_ms': 0.0, 'max_latency_ms': 0.0}
+        self.latency[name] = LatencyHistogram()
+
+    def mark_dirty(self, name, nbytes=0):
+        with self._cond:
+            self._dirty.add(name)
+            self._pending_bytes += nbytes
+            if self._pending_bytes >= self.byte_budget:
+                self._cond.notify()
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="persistence", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._running and self._pending_bytes < self.byte_budget:
+                    self._cond.wait(self.flush_interval)
+                if not self._running:
+                    return
+            self.flush()
+
+    def flush(self):
+        """Escribe ahora todos los destinos marcados."""
+        with self._flush_lock:
+            with self._cond:
+                dirty, self._dirty = self._dirty, set()
+                self._pending_bytes = 0
+            for name in sorted(dirty):
+                start = time.perf_counter()
+                written = self._targets[name]()
+                elapsed = time.perf_counter() - start
+                latency_ms = elapsed * 1000
+                self.latency[name].record(elapsed)
+                metrics = self.metrics[name]
+                metrics['flushes'] += 1
+                metrics['bytes'] += written or 0
+                metrics['last_latency_ms'] = latency_ms
+                metrics['max_latency_ms'] = max(metrics['max_latency_ms'], latency_ms)
+
+    def stop(self):
+        """Detiene el hilo y hace la escritura final."""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def stats(self):
+        with self._cond:
+            pending = {'dirty': sorted(self._dirty), 'pending_bytes': self._pending_bytes}
+        targets = {name: dict(metrics, latency=self.latency[name].to_dict()) for name, metrics in self.metrics.items()}
+        return {
+            'flush_interval': self.flush_interval,
+            'byte_budget': self.byte_budget,
+            'targets': targets,
+            'bytes_written': sum(metrics['bytes'] for metrics in self.metrics.values()),
+            **pending,
+        }
+
+class UsageRollups:
+    """Totales precalculados por mes y por semana, para consultas de rangos.
+
+    Cada mes se guarda en rollups/AAAA-MM.json con el total del mes y los
+    tramos semanales que caen dentro de él (una semana que cruza un cambio de
+    mes se parte en dos tramos), tanto del tiempo visible ('total', 'weeks')
+    como del tiempo en primer plano ('focus_total', 'focus_weeks'). Así un rango se cubre con meses completos,
+    tramos semanales y unos pocos días sueltos, y la consulta cuesta
+    O(cantidad de buckets) en lugar de O(días × apps).
+
+    Los rollups se derivan de los snapshots diarios: si el archivo de un mes es
+    más viejo que alguno de sus días (por ejemplo tras un cierre abrupto entre
+    ambas escrituras) o no existe, se reconstruye a partir de esos días.
+    """
+
+    def __init__(self, store, cache_size=4):
+        self.store = store
+        self.rollups_dir = store.data_dir / 'rollups'
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # 'AAAA-MM' -> {'total': {...}, 'weeks': {inicio: {...}}, 'focus_...': ...}
+        self._dirty_months = set()
+
+    @staticmethod
+    def week_start(day):
+        """Inicio del tramo semanal de una fecha: el lunes, o el día 1 si el mes empezó después."""
+        return max(day - timedelta(days=day.weekday()), day.replace(day=1))
+
+    @staticmethod
+    def month_end(day):
+        next_month = (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+        return next_month - timedelta(days=1)
+
+    def month_path(self, month):
+        return self.rollups_dir / f"{month}.json"
+
+    def get_month(self, month):
+        rollup = self._cache.get(month)
+        if rollup is not None:
+            self._cache.move_to_end(month)
+            return rollup
+
+        rollup = self._read_month(month)
+        if rollup is None:
+            rollup = self.rebuild_month(month)
+        self._cache[month] = rollup
+        excess = len(self._cache) - self.cache_size
+        for cached in list(self._cache):
+            if excess <= 0:
+                break
+            if cached not in self._dirty_months:
+                del self._cache[cached]
+                excess -= 1
+        return rollup
+
+    def _read_month(self, month):
+        path = self.month_path(month)
+        try:
+            mtime = path.stat().st_mtime
+        except OSError:
+            return None
+        if any(day.stat().st_mtime > mtime for day in self.store.days_dir.glob(f"{month}-*.json")):
+            return None
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, OSError):
+            return None
+
+    def rebuild_month(self, month):
+        """Recalcula el rollup de un mes sumando sus snapshots diarios (o archivados)."""
+        rollup = {'total': {}, 'weeks': {}}
+        for date in self.store.month_days(month):
+            day = self.store.get_day(date, create=False) or {}
+            self._add_totals(rollup, date, {proc_name: data['ms'] for proc_name, data in day.items()})
+            focus = {proc_name: data['focus_ms'] for proc_name, data in day.items() if data.get('focus_ms')}
+            if focus:
+                self._add_totals(rollup, date, focus, 'focus_')
+        if rollup['total']:
+            self._dirty_months.add(month)
+        return rollup
+
+    @staticmethod
+    def metric_prefix(metric):
+        """Prefijo de las claves del rollup para 'ms' (tiempo visible) o 'focus_ms'."""
+        return 'focus_' if metric == 'focus_ms' else ''
+
+    def _add_totals(self, rollup, date, totals, prefix=''):
+        week = self.week_start(datetime.strptime(date, "%Y-%m-%d").date()).isoformat()
+        week_totals = rollup.setdefault(prefix + 'weeks', {}).setdefault(week, {})
+        month_totals = rollup.setdefault(prefix + 'total', {})
+        for proc_name, ms in totals.items():
+            month_totals[proc_name] = month_totals.get(proc_name, 0) + ms
+            week_totals[proc_name] = week_totals.get(proc_name, 0) + ms
+
+    def add(self, date, updates):
+        """Suma los deltas de un tick al mes y a la semana correspondientes."""
+        month = date[:7]
+        self._dirty_months.add(month)
+        rollup = self.get_month(month)
+        self._add_totals(rollup, date, {p: update[0] for p, update in updates.items()})
+        focus = {p: update[3] for p, update in updates.items() if len(update) > 3 and update[3]}
+        if focus:
+            self._add_totals(rollup, date, focus, 'focus_')
+
+    def write_dirty(self):
+        """Escribe los meses modificados. Se llama después de escribir los snapshots diarios."""
+        self.rollups_dir.mkdir(parents=True, exist_ok=True)
+        written = 0
+        for month in sorted(self._dirty_months):
+            written += atomic_write_json(self.month_path(month), self._cache[month])
+        self._dirty_months.clear()
+        return written
+
+    def range_buckets(self, start, end):
+        """Descompone [start, end] en meses completos, tramos semanales y días sueltos."""
+        buckets = []
+        day = start
+        while day <= end:
+            month_end = self.month_end(day)
+            if day.day == 1 and month_end <= end:
+                buckets.append(('month', day.strftime("%Y-%m")))
+                day = month_end + timedelta(days=1)
+                continue
+            week_end = min(day + timedelta(days=6 - day.weekday()), month_end)
+            if self.week_start(day) == day and week_end <= end:
+                buckets.append(('week', day.isoformat()))
+                day = week_end + timedelta(days=1)
+                continue
+            buckets.append(('day', day.isoformat()))
+            day += timedelta(days=1)
+        return buckets
+
+    def range_totals(self, start, end, metric='ms'):
+        """Devuelve {proceso: milisegundos} sumados entre dos fechas (datetime.date) inclusive.
+
+        `metric` elige el tiempo visible ('ms') o el tiempo en primer plano ('focus_ms').
+        """
+        prefix = self.metric_prefix(metric)
+        totals = {}
+        for kind, key in self.range_buckets(start, end):
+            if kind == 'month':
+                bucket = self.get_month(key).get(prefix + 'total', {})
+            elif kind == 'week':
+                bucket = self.get_month(key[:7]).get(prefix + 'weeks', {}).get(key, {})
+            else:
+                day = self.store.get_day(key, create=False) or {}
+                bucket = {proc_name: data[metric] for proc_name, data in day.items() if metric in data}
+            for proc_name, ms in bucket.items():
+                totals[proc_name] = totals.get(proc_name, 0) + ms
+        return totals
+
+class TitleIndex:
+    """Tabla de títulos de ventana internados, con reglas de normalización.
+
+    Cada título distinto se guarda una sola vez en memoria y tiene un id
+    numérico que usa el diario para no repetir el texto en cada tick. Las
+    reglas son pares (expresión regular, reemplazo) que se aplican antes de
+    internar, por ejemplo para quitar " - Google Chrome". La tabla se poda con
+    retain() para que no crezca con cada título visto desde el arranque.
+    """
+
+    DEFAULT_RULES = [
+        (r"\s+[-\u2013\u2014]\s+(Google Chrome|Mozilla Firefox|Microsoft\u200b?\s?Edge|Opera|Brave)$", ""),
+    ]
+
+    def __init__(self, rules=None):
+        self.titles = []  # id -> título
+        self.ids = {}  # título -> id
+        self._normalized = {}  # título original -> título normalizado e internado
+        self.set_rules(self.DEFAULT_RULES if rules is None else rules)
+
+    def set_rules(self, rules):
+        self.rules = [(re.compile(pattern), replacement) for pattern, replacement in rules]
+        self._normalized = {}
+
+    def intern(self, title):
+        """Devuelve la instancia única del título y le asigna un id si es nuevo."""
+        if title not in self.ids:
+            self.ids[title] = len(self.titles)
+            self.titles.append(title)
+            return title
+        return self.titles[self.ids[title]]
+
+    def retain(self, titles):
+        """Conserva solo los títulos indicados, con ids nuevos; el resto se vuelve a internar si reaparece.
+
+        Solo se puede llamar cuando ya nada usa los ids anteriores, como al
+        vaciar el diario.
+        """
+        self.titles = [title for title in dict.fromkeys(titles) if title in self.ids]
+        self.ids = {title: tid for tid, title in enumerate(self.titles)}
+        self._normalized = {raw: title for raw, title in self._normalized.items() if title in self.ids}
+
+    def normalize(self, title):
+        normalized = self._normalized.get(title)
+        if normalized is None:
+            if len(self._normalized) > 10000:
+                self._normalized = {}
+            normalized = title
+            for pattern, replacement in self.rules:
+                normalized = pattern.sub(replacement, normalized)
+            normalized = self._normalized[title] = self.intern(normalized.strip() or title)
+        return normalized
+
+_numpy = None
+
+def optional_numpy():
+    """Importa NumPy la primera vez que se necesita; devuelve None si no está instalado."""
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+            _numpy = numpy
+        except ImportError:
+            _numpy = False
+    return _numpy or None
+
+class ColumnarUsage:
+    """Representación compacta de los datos de uso en columnas.
+
+    Cada registro ocupa cuatro enteros en arrays tipados (día como ordinal, id
+    de app, milisegundos visibles y en primer plano) y los nombres de proceso se
+    guardan una sola vez en una tabla de ids. Los registros se mantienen
+    ordenados por día, así que un rango de fechas es un corte de los arrays. Si
+    NumPy está disponible las sumas se vectorizan; si no, se recorren los arrays
+    en Python. TrackerCore la usa para los reportes con report_engine 'columnar'.
+    """
+
+    def __init__(self):
+        self.names = []  # id -> nombre de proceso
+        self.ids = {}  # nombre de proceso -> id
+        self.days = array('i')
+        self.apps = array('I')
+        self.ms = array('q')
+        self.focus_ms = array('q')
+
+    def __len__(self):
+        return len(self.ms)
+
+    def app_id(self, name):
+        app_id = self.ids.get(name)
+        if app_id is None:
+            app_id = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return app_id
+
+    def append_day(self, date, day_data):
+        """Agrega los registros de un día ({proceso: datos}) posterior a los ya cargados."""
+        self.append_rows(date, (
+            (proc_name, data['ms'] if 'ms' in data else data['time'] * 1000, data.get('focus_ms', 0))
+            for proc_name, data in day_data.items()
+        ))
+
+    def append_rows(self, date, rows):
+        """Agrega las filas (proceso, ms, focus_ms) de un día, como las de StorageBackend.day_rows."""
+        ordinal = datetime.strptime(date, "%Y-%m-%d").toordinal()
+        if self.days and ordinal < self.days[-1]:
+            raise ValueError("Los días deben agregarse en orden")
+        for proc_name, ms, focus_ms in rows:
+            self.days.append(ordinal)
+            self.apps.append(self.app_id(proc_name))
+            self.ms.append(ms)
+            self.focus_ms.append(focus_ms)
+
+    @classmethod
+    def from_legacy(cls, usage_data):
+        """Construye las columnas desde el formato {fecha: {proceso: {'ms', 'last_seen'}}}."""
+        columnar = cls()
+        for date in sorted(usage_data):
+            columnar.append_day(date, usage_data[date])
+        return columnar
+
+    def to_legacy(self):
+        """Exporta al formato de diccionarios por día (sin 'last_seen', que no se conserva)."""
+        usage_data = {}
+        for ordinal, app_id, ms, focus_ms in zip(self.days, self.apps, self.ms, self.focus_ms):
+            date = datetime.fromordinal(ordinal).strftime("%Y-%m-%d")
+            data = usage_data.setdefault(date, {})[self.names[app_id]] = {'ms': ms, 'last_seen': None}
+            if focus_ms:
+                data['focus_ms'] = focus_ms
+        return usage_data
+
+    def _slice(self, start, end):
+        """Índices [i, j) de los registros entre dos fechas (datetime.date) inclusive."""
+        i = bisect.bisect_left(self.days, start.toordinal()) if start else 0
+        j = bisect.bisect_right(self.days, end.toordinal()) if end else len(self.days)
+        return i, j
+
+    def totals(self, start=None, end=None, metric='ms'):
+        """Devuelve {proceso: milisegundos} sumados en el rango de fechas; `metric` es 'ms' o 'focus_ms'."""
+        i, j = self._slice(start, end)
+        column = self.focus_ms if metric == 'focus_ms' else self.ms
+        np = optional_numpy()
+        if np is not None:
+            apps = np.frombuffer(self.apps, dtype=np.uint32)[i:j]
+            ms = np.frombuffer(column, dtype=np.int64)[i:j]
+            # bincount suma en float64, exacto para totales menores a 2**53 ms
+            sums = np.bincount(apps, weights=ms, minlength=len(self.names)).astype(np.int64)
+            return {self.names[app_id]: int(sums[app_id]) for app_id in np.flatnonzero(sums)}
+
+        sums = [0] * len(self.names)
+        apps, ms = self.apps, column
+        for k in range(i, j):
+            sums[apps[k]] += ms[k]
+        return {self.names[app_id]: total for app_id, total in enumerate(sums) if total}
+
+class StorageBackend:
+    """Interfaz del almacenamiento de uso que usa TrackerCore.
+
+    Un día es {proceso: {'ms', 'last_seen'[, 'titles': {título: ms}][, 'focus_ms']
+    [, 'title_focus': {título: ms en primer plano}]}} y las métricas son 'ms'
+    (tiempo visible) o 'focus_ms' (tiempo en primer plano). Las implementaciones tienen además `titles` (un TitleIndex),
+    `title_top_k` y `load_errors`. No son seguras entre hilos: TrackerCore las
+    usa siempre con su state_lock tomado.
+    """
+
+    def load(self, today, read_only=False):
+        """Abre el almacenamiento y devuelve los datos del día `today`.
+
+        Con `read_only` no se escribe nada en disco (ni migraciones, ni
+        compactación, ni recortes) y record() no se puede usar.
+        """
+        raise NotImplementedError
+
+    def get_day(self, date, create=True):
+        raise NotImplementedError
+
+    def days(self):
+        """Fechas con datos, ordenadas."""
+        raise NotImplementedError
+
+    def day_totals(self, date, metric='ms'):
+        """Devuelve {proceso: milisegundos} de un día."""
+        day = self.get_day(date, create=False) or {}
+        return {proc_name: data[metric] for proc_name, data in day.items() if metric in data}
+
+    def day_rows(self, date):
+        """Devuelve [(proceso, ms, focus_ms)] de un día, ordenadas por proceso."""
+        day = self.get_day(date, create=False) or {}
+        return sorted((proc_name, data['ms'], data.get('focus_ms', 0)) for proc_name, data in day.items())
+
+    def range_totals(self, start, end, metric='ms'):
+        """Devuelve {proceso: milisegundos} entre dos fechas (datetime.date) inclusive."""
+        raise NotImplementedError
+
+    def known_apps(self):
+        """Nombres de los procesos con datos en todo el historial."""
+        raise NotImplementedError
+
+    def record(self, date, updates):
+        """Registra los deltas de un tick: {proceso: (ms, last_seen[, {título: ms}[, ms en primer plano[, título]]])}.
+
+        El último elemento es el título de la ventana en primer plano, que
+        recibe los ms en primer plano. Devuelve los bytes aproximados que agrega.
+        """
+        raise NotImplementedError
+
+    def record_presence(self, date, active_apps, ms, last_seen=None, focused=None, focused_title=None):
+        """Suma `ms` milisegundos a cada proceso activo y a cada uno de sus títulos.
+
+        `focused` es el proceso en primer plano (None si no hay o el usuario está
+        inactivo); solo a él se le suma además el tiempo en primer plano, y
+        también a `focused_title`, el título de su ventana en primer plano.
+        """
+        if last_seen is None:
+            last_seen = time.time()
+        normalize = self.titles.normalize
+        updates = {}
+        for proc_name, titles in active_apps.items():
+            updates[proc_name] = (ms, last_seen, {normalize(title): ms for title in titles})
+        if focused in updates:
+            title = normalize(focused_title) if focused_title else None
+            updates[focused] += (ms, title) if title in updates[focused][2] else (ms,)
+        return self.record(date, updates)
+
+    def flush(self):
+        """Hace durable lo registrado. Devuelve los bytes escritos."""
+        raise NotImplementedError
+
+    def archivable_months(self, before):
+        """Meses que se pueden pasar a un archivo comprimido (ver UsageStore.archive_month)."""
+        return []
+
+    def archive_month(self, month, drop_titles=False):
+        return 0
+
+    def strip_titles(self, before):
+        """Descarta el detalle por título de los días anteriores a `before` ('AAAA-MM-DD')."""
+        raise NotImplementedError
+
+    def close(self):
+        raise NotImplementedError
+
+    def stats(self):
+        return {}
+
+class UsageStore(StorageBackend):
+    """Almacenamiento de uso: diario de deltas en modo append y snapshots por día.
+
+    Cada tick agrega una línea compacta al diario, de modo que el costo de
+    escritura no depende del tamaño del historial. Cada cierto número de
+    registros se compactan los días modificados en snapshots que se escriben
+    con un archivo temporal y un rename atómico.
+
+    Los días se cargan bajo demanda y se mantienen en una caché LRU pequeña,
+    así que el arranque y la memoria no crecen con el historial.
+
+    Los meses viejos se pueden mover a archivos comprimidos con lzma, uno por
+    mes (archive/AAAA-MM.json.xz), y pasado un segundo horizonte se les quita
+    el detalle por título conservando los totales (ver archive_month y
+    strip_titles). archive/index.json lista los días de cada archivo; get_day
+    los lee de ahí cuando no hay snapshot, así que las consultas no cambian.
+    """
+
+    OTHER_TITLES = "(otros)"
+
+    def __init__(self, data_dir, legacy_file=None, compact_every=300, cache_size=8, title_top_k=50):
+        self.data_dir = Path(data_dir)
+        self.days_dir = self.data_dir / 'days'
+        self.archive_dir = self.data_dir / 'archive'
+        self.journal_file = self.data_dir / 'journal.log'
+        self.legacy_file = Path(legacy_file) if legacy_file else None
+        self.compact_every = compact_every
+        self.cache_size = cache_size
+        self.load_errors = []
+        self._cache = OrderedDict()  # fecha -> {proceso: {'ms', 'last_seen', 'titles', 'focus_ms', 'title_focus'}}
+        self._day_seq = {}  # Último número de secuencia incluido en el snapshot de cada día
+        self._dirty_days = set()
+        self._seq = 0
+        self._pending = 0
+        self._journal = None
+        self._buffer = []  # Líneas del diario aún no escritas (ver flush)
+        self.rollups = UsageRollups(self)
+        self.titles = TitleIndex()
+        self.title_top_k = title_top_k  # Títulos que se conservan por app y día; el resto va a "(otros)"
+        self._journal_titles = set()  # Ids de título ya declarados en el diario actual
+        # Mes -> {'dates': [...], 'titles': bool}, más 'titles_before': fecha hasta la que ya se quitaron títulos
+        self.archive_index = {'months': {}, 'titles_before': None}
+        self._archive_cache = OrderedDict()  # mes -> {fecha: snapshot}, los últimos archivos leídos
+        self._legacy = {}  # Con read_only, el JSON antiguo sin migrar: {fecha: {proceso: datos}}
+        self.read_only = False
+
+    def day_path(self, date):
+        return self.days_dir / f"{date}.json"
+
+    def archive_path(self, month):
+        return self.archive_dir / f"{month}.json.xz"
+
+    def load(self, today, read_only=False):
+        """Migra el JSON antiguo, reproduce el diario y carga solo el día indicado.
+
+        Con `read_only` el JSON antiguo se lee en memoria y el diario se
+        reproduce sin compactarlo, así que otro proceso puede seguir escribiendo.
+        """
+        self.read_only = read_only
+        if not read_only:
+            self.days_dir.mkdir(parents=True, exist_ok=True)
+        self.load_archive_index()
+        if self.legacy_file and self.legacy_file.exists():
+            if read_only:
+                self.read_legacy()
+            else:
+                self.migrate_legacy()
+
+        replayed = self.replay_journal()
+        if read_only:
+            return self.get_day(today)
+        self._journal = open(self.journal_file, 'a', encoding='utf-8')
+        if replayed:
+            self.compact()
+        return self.get_day(today)
+
+    def days(self):
+        """Lista las fechas con datos sin cargarlas."""
+        dates = {path.stem for path in self.days_dir.glob('*.json')}
+        for month in self.archive_index['months'].values():
+            dates.update(month['dates'])
+        return sorted(dates | set(self._cache) | set(self._legacy))
+
+    def range_totals(self, start, end, metric='ms'):
+        return self.rollups.range_totals(start, end, metric)
+
+    def known_apps(self):
+        names = set()
+        for month in sorted({date[:7] for date in self.days()}):
+            names.update(self.rollups.get_month(month)['total'])
+        return names
+
+    def month_days(self, month):
+        """Fechas con datos de un mes ('AAAA-MM'), con snapshot o archivadas."""
+        dates = {path.stem for path in self.days_dir.glob(f"{month}-*.json")}
+        dates.update(self.archive_index['months'].get(month, {}).get('dates', ()))
+        return sorted(dates)
+
+    def get_day(self, date, create=True):
+        """Devuelve los datos de un día, cargándolos desde disco si hace falta."""
+        day = self._cache.get(date)
+        if day is not None:
+            self._cache.move_to_end(date)
+            return day
+
+        day = self._read_snapshot(date)
+        if day is None:
+            if not create:
+                return None
+            day = {}
+        self._cache[date] = day
+        self._evict()
+        return day
+
+    def _read_snapshot(self, date):
+        path = self.day_path(date)
+        if not path.exists():
+            # El snapshot tiene prioridad: un día archivado que se modifica vuelve a days/
+            if date in self._legacy:
+                snapshot = {'seq': 0, 'apps': self._legacy[date]}
+            else:
+                snapshot = self.read_archive(date[:7]).get(date)
+            if snapshot is None:
+                return None
+            snapshot = json.loads(json.dumps(snapshot))  # Copia: el archivo en caché no se modifica
+        else:
+            try:
+                with open(path, 'r') as f:
+                    snapshot = json.load(f)
+            except (json.JSONDecodeError, OSError) as e:
+                self.load_errors.append(f"{path.name}: {e}")
+                if not self.read_only:
+                    path.replace(path.with_suffix('.corrupt'))
+                return None
+        self._day_seq[date] = snapshot.get('seq', 0)
+        # Si se perdió la cabecera del diario, la secuencia no puede quedar por
+        # debajo de la del snapshot: los registros nuevos se descartarían al reproducirlos
+        self._seq = max(self._seq, self._day_seq[date])
+        apps = snapshot.get('apps', {})
+        for data in apps.values():
+            # Los datos anteriores guardaban segundos enteros en 'time'
+            if 'time' in data:
+                data['ms'] = data.pop('time') * 1000
+            for key in ('titles', 'title_focus'):
+                if key in data:
+                    data[key] = {self.titles.intern(title): ms for title, ms in data[key].items()}
+        return apps
+
+    def _evict(self):
+        """Descarta los días menos usados que no tengan cambios pendientes."""
+        excess = len(self._cache) - self.cache_size
+        for date in list(self._cache):
+            if excess <= 0:
+                break
+            if date in self._dirty_days:
+                continue
+            del self._cache[date]
+            excess -= 1
+
+    def migrate_legacy(self):
+        """Convierte app_usage_data.json (un único diccionario) en snapshots por día."""
+        try:
+            with open(self.legacy_file, 'r') as f:
+                legacy = json.load(f)
+        except json.JSONDecodeError as e:
+            self.load_errors.append(f"{self.legacy_file.name}: {e}")
+            self.legacy_file.replace(self.legacy_file.with_suffix('.corrupt'))
+            return
+
+        for date, apps in legacy.items():
+            if not self.day_path(date).exists():
+                self.write_snapshot(date, apps, 0)
+        self.legacy_file.replace(self.legacy_file.with_suffix('.json.bak'))
+
+    def read_legacy(self):
+        """Lee app_usage_data.json sin migrarlo, para abrir en modo de solo lectura."""
+        try:
+            with open(self.legacy_file, 'r') as f:
+                self._legacy = json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            self.load_errors.append(f"{self.legacy_file.name}: {e}")
+            return
+        # Como en migrate_legacy, un snapshot existente tiene prioridad
+        self._legacy = {date: apps for date, apps in self._legacy.items() if not self.day_path(date).exists()}
+
+    def replay_journal(self):
+        """Aplica los registros del diario posteriores a cada snapshot.
+
+        Una última línea sin salto de línea quedó a medio escribir: no se aplica
+        y, salvo en solo lectura, se corta del archivo para que el próximo
+        registro no quede pegado a ella.
+        """
+        if not self.journal_file.exists():
+            return 0
+
+        replayed = 0
+        journal_titles = {}  # id del diario -> título
+        complete = 0  # Bytes hasta el final de la última línea completa
+        torn = False
+        with open(self.journal_file, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    torn = True
+                    break
+                complete += len(line)
+                try:
+                    record = json.loads(line)
+                    seq = record['s']
+                    if 'd' not in record:
+                        # Cabecera escrita al compactar con la última secuencia usada
+                        self._seq = max(self._seq, seq)
+                        continue
+                    date = record['d']
+                    journal_titles.update(record.get('t', {}))
+                    if 'm' in record:
+                        updates = {}
+                        for proc_name, update in record['m'].items():
+                            if len(update) > 2:
+                                titles = {}
+                                for tid, ms in update[2].items():
+                                    # Un id cuya declaración se perdió no descarta el registro:
+                                    # los totales de la app se conservan y ese tiempo va a "(otros)"
+                                    title = self.titles.intern(journal_titles.get(tid, self.OTHER_TITLES))
+                                    titles[title] = titles.get(title, 0) + ms
+                                update = (update[0], update[1], titles) + tuple(update[3:4])
+                                if len(record['m'][proc_name]) > 4:
+                                    tid = record['m'][proc_name][4]
+                                    update += (self.titles.intern(journal_titles.get(tid, self.OTHER_TITLES)),)
+                            updates[proc_name] = update
+                    else:
+                        # Registros anteriores, con deltas en segundos
+                        updates = {p: (delta * 1000, seen) for p, (delta, seen) in record['u'].items()}
+                except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+                    continue
+                self._seq = max(self._seq, seq)
+                self.get_day(date)
+                if seq <= self._day_seq.get(date, 0):
+                    continue
+                self._apply(date, updates)
+                replayed += 1
+        if torn and not self.read_only:
+            with open(self.journal_file, 'r+b') as f:
+                f.truncate(complete)
+                os.fsync(f.fileno())
+        return replayed
+
+    def _apply(self, date, updates):
+        self._dirty_days.add(date)
+        self.rollups.add(date, updates)
+        day = self.get_day(date)
+        for proc_name, update in updates.items():
+            delta_ms, last_seen = update[0], update[1]
+            data = day.get(proc_name)
+            if data is None:
+                data = day[proc_name] = {'ms': delta_ms, 'last_seen': last_seen}
+            else:
+                data['ms'] += delta_ms
+                data['last_seen'] = last_seen
+            if len(update) > 2:
+                titles = data.setdefault('titles', {})
+                for title, ms in update[2].items():
+                    titles[title] = titles.get(title, 0) + ms
+                # Se recorta al doble del límite para no ordenar en cada tick
+                if len(titles) > 2 * self.title_top_k:
+                    self.trim_titles(titles)
+            if len(update) > 3 and update[3]:
+                data['focus_ms'] = data.get('focus_ms', 0) + update[3]
+                if len(update) > 4:
+                    titles = data.setdefault('title_focus', {})
+                    titles[update[4]] = titles.get(update[4], 0) + update[3]
+                    if len(titles) > 2 * self.title_top_k:
+                        self.trim_titles(titles)
+
+    def trim_titles(self, titles):
+        """Conserva los `title_top_k` títulos con más tiempo y suma el resto en "(otros)"."""
+        other = titles.pop(self.OTHER_TITLES, 0)
+        ranked = sorted(titles.items(), key=lambda item: item[1], reverse=True)
+        titles.clear()
+        titles.update(ranked[:self.title_top_k])
+        other += sum(ms for _, ms in ranked[self.title_top_k:])
+        if other:
+            titles[self.OTHER_TITLES] = other
+
+    def record(self, date, updates):
+        """Registra los deltas de un tick: {proceso: (ms, last_seen[, {título: ms}[, ms en primer plano[, título]]])}.
+
+        La línea queda en memoria hasta el próximo flush(). Devuelve su tamaño en bytes.
+        En el diario los títulos se escriben como ids; cada id se declara con su
+        texto la primera vez que aparece después de una compactación.
+        """
+        if not updates:
+            return 0
+        self._apply(date, updates)
+        self._seq += 1
+        encoded = {}
+        new_titles = {}
+        for proc_name, update in updates.items():
+            if len(update) > 2:
+                title_ms = {}
+                for title, ms in update[2].items():
+                    tid = self.titles.ids[title]
+                    if tid not in self._journal_titles:
+                        self._journal_titles.add(tid)
+                        new_titles[tid] = title
+                    title_ms[tid] = ms
+                update = (update[0], update[1], title_ms) + tuple(update[3:4])
+                if len(updates[proc_name]) > 4:
+                    # El título en primer plano es uno de los del tick: ya está declarado
+                    update += (str(self.titles.ids[updates[proc_name][4]]),)
+            encoded[proc_name] = update
+        record = {'s': self._seq, 'd': date, 'm': encoded}
+        if new_titles:
+            record['t'] = new_titles
+        line = json.dumps(record, separators=(',', ':')) + '\n'
+        self._buffer.append(line)
+        self._pending += 1
+        return len(line)
+
+    def flush(self):
+        """Agrega al diario las líneas pendientes y compacta si se acumularon demasiadas."""
+        if self.read_only:
+            return 0
+        if self._pending >= self.compact_every:
+            return self.compact()
+        if not self._buffer:
+            return 0
+        data = ''.join(self._buffer)
+        self._buffer = []
+        self._journal.write(data)
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        return len(data)
+
+    def write_snapshot(self, date, apps, seq):
+        """Escribe el snapshot de un día de forma atómica (temporal + rename)."""
+        return atomic_write_json(self.day_path(date), {'seq': seq, 'apps': apps})
+
+    def compact(self):
+        """Vuelca los días modificados a sus snapshots y vacía el diario."""
+        written = 0
+        for date in sorted(self._dirty_days):
+            for data in self._cache[date].values():
+                for key in ('titles', 'title_focus'):
+                    if len(data.get(key, ())) > self.title_top_k:
+                        self.trim_titles(data[key])
+            written += self.write_snapshot(date, self._cache[date], self._seq)
+            self._day_seq[date] = self._seq
+        self._dirty_days.clear()
+        self._evict()
+        written += self.rollups.write_dirty()
+
+        # Los snapshots ya incluyen todo el diario; si el proceso muere antes de
+        # truncarlo, el número de secuencia evita aplicar los registros dos veces.
+        if self._journal:
+            self._journal.close()
+        self._journal = open(self.journal_file, 'w', encoding='utf-8')
+        self._journal.write(json.dumps({'s': self._seq}) + '\n')
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        self._buffer = []
+        # El diario nuevo vuelve a declarar los ids: solo quedan los títulos de los días en caché
+        self.titles.retain(
+            title for day in self._cache.values() for data in day.values()
+            for key in ('titles', 'title_focus') for title in data.get(key, ())
+        )
+        self._journal_titles = set()
+        self._pending = 0
+        return written
+
+    def close(self):
+        if self.read_only:
+            return
+        self.compact()
+        self._journal.close()
+        self._journal = None
+
+    def load_archive_index(self):
+        try:
+            with open(self.archive_dir / 'index.json', 'r') as f:
+                self.archive_index = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (json.JSONDecodeError, OSError) as e:
+            # Sin índice los archivos siguen en disco; se recupera con rebuild_archive_index
+            self.load_errors.append(f"archive/index.json: {e}")
+            self.rebuild_archive_index()
+
+    def rebuild_archive_index(self):
+        """Reconstruye archive/index.json leyendo cada archivo mensual."""
+        self.archive_index = {'months': {}, 'titles_before': None}
+        for path in sorted(self.archive_dir.glob('*.json.xz')):
+            month = path.name[:7]
+            days = self.read_archive(month, indexed=False)
+            if days:
+                self.archive_index['months'][month] = {
+                    'dates': sorted(days),
+                    'titles': any('titles' in data for day in days.values() for data in day['apps'].values()),
+                }
+        return self.write_archive_index() if self.archive_index['months'] and not self.read_only else 0
+
+    def write_archive_index(self):
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        return atomic_write_json(self.archive_dir / 'index.json', self.archive_index)
+
+    def read_archive(self, month, indexed=True):
+        """Devuelve {fecha: snapshot} de un mes archivado, o {} si no hay archivo."""
+        if indexed and month not in self.archive_index['months']:
+            return {}
+        days = self._archive_cache.get(month)
+        if days is not None:
+            self._archive_cache.move_to_end(month)
+            return days
+        import lzma
+
+        path = self.archive_path(month)
+        try:
+            with open(path, 'rb') as f:
+                days = json.loads(lzma.decompress(f.read()))['days']
+        except FileNotFoundError:
+            return {}
+        except (lzma.LZMAError, json.JSONDecodeError, KeyError, OSError) as e:
+            self.load_errors.append(f"{path.name}: {e}")
+            return {}
+        self._archive_cache[month] = days
+        if len(self._archive_cache) > 2:
+            self._archive_cache.popitem(last=False)
+        return days
+
+    def write_archive(self, month, days):
+        """Escribe el archivo comprimido de un mes: JSON minificado con lzma."""
+        import lzma
+
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        data = json.dumps({'days': days}, separators=(',', ':')).encode('utf-8')
+        written = atomic_write_bytes(self.archive_path(month), lzma.compress(data, preset=6))
+        self._archive_cache.pop(month, None)
+        return written
+
+    @staticmethod
+    def drop_titles(apps):
+        """Quita el detalle por título de un día; los totales no cambian. Devuelve True si había."""
+        dropped = False
+        for data in apps.values():
+            data.pop('title_focus', None)
+            dropped = data.pop('titles', None) is not None or dropped
+        return dropped
+
+    def archivable_months(self, before):
+        """Meses con snapshots en days/ que terminan antes de la fecha `before` (datetime.date)."""
+        months = set()
+        for path in self.days_dir.glob('*.json'):
+            month = path.stem[:7]
+            if UsageRollups.month_end(datetime.strptime(month + '-01', "%Y-%m-%d").date()) < before:
+                months.add(month)
+        return sorted(months)
+
+    def archive_month(self, month, drop_titles=False):
+        """Mueve los snapshots de un mes a su archivo comprimido. Devuelve los bytes escritos.
+
+        Los días con cambios sin compactar se dejan para la próxima vez. Si el
+        mes ya tenía archivo se combinan, con prioridad para los snapshots. Los
+        snapshots se borran recién después de escribir el archivo y el índice.
+        """
+        dates = [path.stem for path in sorted(self.days_dir.glob(f"{month}-*.json"))]
+        if not dates or any(date in self._dirty_days for date in dates):
+            return 0
+        days = dict(self.read_archive(month))
+        archived = []
+        for date in dates:
+            try:
+                with open(self.day_path(date), 'r') as f:
+                    days[date] = json.load(f)
+            except (json.JSONDecodeError, OSError):
+                # Un snapshot dañado se aparta al leerlo con get_day, no se archiva
+                continue
+            archived.append(date)
+        if drop_titles:
+            for snapshot in days.values():
+                self.drop_titles(snapshot['apps'])
+        written = self.write_archive(month, days)
+        self.archive_index['months'][month] = {
+            'dates': sorted(days),
+            'titles': any('titles' in data for day in days.values() for data in day['apps'].values()),
+        }
+        written += self.write_archive_index()
+        for date in archived:
+            self.day_path(date).unlink()
+            self._cache.pop(date, None)
+        return written
+
+    def strip_titles(self, before):
+        """Quita los títulos de los días anteriores a `before` ('AAAA-MM-DD'). Devuelve los bytes escritos.
+
+        Los archivos se reescriben solo cuando el mes entero quedó antes del
+        horizonte; los snapshots sueltos, una vez cada uno.
+        """
+        written = 0
+        for month, entry in self.archive_index['months'].items():
+            if entry['titles'] and entry['dates'][-1][:7] < before[:7]:
+                days = self.read_archive(month)
+                for snapshot in days.values():
+                    self.drop_titles(snapshot['apps'])
+                written += self.write_archive(month, days)
+                entry['titles'] = False
+                for date in entry['dates']:
+                    if date not in self._dirty_days:
+                        self._cache.pop(date, None)
+        done = self.archive_index.get('titles_before') or ''
+        for path in sorted(self.days_dir.glob('*.json')):
+            date = path.stem
+            if not done <= date < before or date in self._dirty_days:
+                continue
+            day = self.get_day(date, create=False)
+            if day is not None and self.drop_titles(day):
+                written += self.write_snapshot(date, day, self._day_seq.get(date, 0))
+        self.archive_index['titles_before'] = before
+        return written + self.write_archive_index()
+
+    def stats(self):
+        return {
+            'backend': 'json',
+            'cached_days': len(self._cache),
+            'records_since_compaction': self._pending,
+            'unflushed_lines': len(self._buffer),
+            'titles': len(self.titles.titles),
+            'archived_months': len(self.archive_index['months']),
+        }
+
+class SqliteUsageStore(StorageBackend):
+    """Almacenamiento de uso en SQLite, alternativo a UsageStore.
+
+    La tabla usage tiene una fila por (día, proceso) y titles una por (día,
+    proceso, título), ambas con esa clave primaria y sin rowid, más un índice
+    (app, day) para las consultas por aplicación. Cada tick es un único upsert
+    por lotes dentro de una transacción. Con journal_mode=WAL y
+    synchronous=NORMAL el commit no espera al disco, pero un cierre abrupto del
+    proceso no pierde ningún tick confirmado. Los totales por día y por rango
+    se calculan en SQL.
+
+    Si hay datos JSON (`import_dir` o el archivo antiguo) se importan al abrir
+    la base, en una transacción que además pone PRAGMA user_version en
+    IMPORTED; si la importación falla o se corta, se reintenta en la próxima
+    apertura. Los archivos JSON no se borran.
+    """
+
+    OTHER_TITLES = UsageStore.OTHER_TITLES
+    IMPORTED = 1  # PRAGMA user_version: los datos JSON ya se importaron (o no había)
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS usage ("
+        " day TEXT NOT NULL, app TEXT NOT NULL, ms INTEGER NOT NULL DEFAULT 0,"
+        " focus_ms INTEGER NOT NULL DEFAULT 0, last_seen REAL,"
+        " PRIMARY KEY (day, app)) WITHOUT ROWID",
+        "CREATE INDEX IF NOT EXISTS usage_app_day ON usage (app, day)",
+        "CREATE TABLE IF NOT EXISTS titles ("
+        " day TEXT NOT NULL, app TEXT NOT NULL, title TEXT NOT NULL, ms INTEGER NOT NULL,"
+        " focus_ms INTEGER NOT NULL DEFAULT 0,"
+        " PRIMARY KEY (day, app, title)) WITHOUT ROWID",
+    )
+    UPSERT_USAGE = (
+        "INSERT INTO usage (day, app, ms, focus_ms, last_seen) VALUES (?, ?, ?, ?, ?)"
+        " ON CONFLICT (day, app) DO UPDATE SET ms = ms + excluded.ms,"
+        " focus_ms = focus_ms + excluded.focus_ms, last_seen = excluded.last_seen"
+    )
+    UPSERT_TITLE = (
+        "INSERT INTO titles (day, app, title, ms, focus_ms) VALUES (?, ?, ?, ?, ?)"
+        " ON CONFLICT (day, app, title) DO UPDATE SET ms = ms + excluded.ms,"
+        " focus_ms = focus_ms + excluded.focus_ms"
+    )
+
+    def __init__(self, db_file, import_dir=None, legacy_file=None, title_top_k=50):
+        self.db_file = Path(db_file)
+        self.import_dir = Path(import_dir) if import_dir else None
+        self.legacy_file = Path(legacy_file) if legacy_file else None
+        self.title_top_k = title_top_k
+        self.titles = TitleIndex()
+        self.load_errors = []
+        self.conn = None
+        self.read_only = False
+        self._touched_days = set()  # Días con títulos nuevos desde el último recorte
+
+    def load(self, today, read_only=False):
+        import sqlite3
+
+        self.read_only = read_only
+        if read_only:
+            # Solo lectura: sin esquema ni importación; falla si la base no existe
+            self.conn = sqlite3.connect(self.db_file.resolve().as_uri() + '?mode=ro', uri=True,
+                                        check_same_thread=False)
+            return self.get_day(today)
+        # La conexión la usan varios hilos, siempre bajo el state_lock de TrackerCore
+        self.conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            for statement in self.SCHEMA:
+                self.conn.execute(statement)
+            # Bases anteriores al tiempo en primer plano por título
+            if 'focus_ms' not in {row[1] for row in self.conn.execute("PRAGMA table_info(titles)")}:
+                self.conn.execute("ALTER TABLE titles ADD COLUMN focus_ms INTEGER NOT NULL DEFAULT 0")
+        version, = self.conn.execute("PRAGMA user_version").fetchone()
+        if version < self.IMPORTED:
+            sources = ((self.import_dir and self.import_dir.exists())
+                       or (self.legacy_file and self.legacy_file.exists()))
+            # Una importación fallida no deja filas: con datos, la base es anterior a user_version
+            imported = self.conn.execute("SELECT 1 FROM usage LIMIT 1").fetchone() is not None
+            if sources and not imported:
+                # En solo lectura: sin migrar el archivo antiguo ni compactar el diario.
+                # Sin import_dir, un directorio que no existe deja solo el archivo antiguo
+                source = UsageStore(self.import_dir or self.db_file.with_name(self.db_file.name + '.import'),
+                                    legacy_file=self.legacy_file)
+                source.load(today, read_only=True)
+                self.import_store(source)
+                source.close()
+                self.load_errors.extend(source.load_errors)
+            else:
+                self.conn.execute(f"PRAGMA user_version = {self.IMPORTED}")
+        return self.get_day(today)
+
+    def import_store(self, source):
+        """Copia todos los días de otro almacenamiento (por ejemplo un UsageStore JSON). Devuelve los días copiados.
+
+        La copia y la marca de importación completa (user_version) se confirman juntas.
+        """
+        dates = source.days()
+        with self.conn:
+            for date in dates:
+                day = source.get_day(date, create=False) or {}
+                self.conn.executemany(self.UPSERT_USAGE, [
+                    (date, proc_name, data['ms'], data.get('focus_ms', 0), data.get('last_seen'))
+                    for proc_name, data in day.items()
+                ])
+                self.conn.executemany(self.UPSERT_TITLE, [
+                    (date, proc_name, title, ms, data.get('title_focus', {}).get(title, 0))
+                    for proc_name, data in day.items() for title, ms in data.get('titles', {}).items()
+                ])
+            self.conn.execute(f"PRAGMA user_version = {self.IMPORTED}")
+        return len(dates)
+
+    def get_day(self, date, create=True):
+        day = {}
+        for app, ms, focus_ms, last_seen in self.conn.execute(
+                "SELECT app, ms, focus_ms, last_seen FROM usage WHERE day = ?", (date,)):
+            data = day[app] = {'ms': ms, 'last_seen': last_seen}
+            if focus_ms:
+                data['focus_ms'] = focus_ms
+        for app, title, ms, focus_ms in self.conn.execute(
+                "SELECT app, title, ms, focus_ms FROM titles WHERE day = ?", (date,)):
+            if app in day:
+                title = self.titles.intern(title)
+                day[app].setdefault('titles', {})[title] = ms
+                if focus_ms:
+                    day[app].setdefault('title_focus', {})[title] = focus_ms
+        return day if day or create else None
+
+    def days(self):
+        return [row[0] for row in self.conn.execute("SELECT DISTINCT day FROM usage ORDER BY day")]
+
+    @staticmethod
+    def _metric_column(metric):
+        return 'focus_ms' if metric == 'focus_ms' else 'ms'
+
+    def day_totals(self, date, metric='ms'):
+        column = self._metric_column(metric)
+        return dict(self.conn.execute(
+            f"SELECT app, {column} FROM usage WHERE day = ? AND {column} > 0", (date,)))
+
+    def day_rows(self, date):
+        return self.conn.execute(
+            "SELECT app, ms, focus_ms FROM usage WHERE day = ? ORDER BY app", (date,)).fetchall()
+
+    def range_totals(self, start, end, metric='ms'):
+        column = self._metric_column(metric)
+        return dict(self.conn.execute(
+            f"SELECT app, SUM({column}) FROM usage WHERE day BETWEEN ? AND ? AND {column} > 0 GROUP BY app",
+            (start.isoformat(), end.isoformat())))
+
+    def known_apps(self):
+        # DISTINCT sobre el índice (app, day) no necesita leer la tabla
+        return {row[0] for row in self.conn.execute("SELECT DISTINCT app FROM usage")}
+
+    def record(self, date, updates):
+        if not updates:
+            return 0
+        usage_rows = []
+        title_rows = []
+        for proc_name, update in updates.items():
+            focus_ms = update[3] if len(update) > 3 else 0
+            usage_rows.append((date, proc_name, update[0], focus_ms, update[1]))
+            if len(update) > 2:
+                focused_title = update[4] if len(update) > 4 else None
+                title_rows.extend((date, proc_name, title, ms, focus_ms if title == focused_title else 0)
+                                  for title, ms in update[2].items())
+        with self.conn:
+            self.conn.executemany(self.UPSERT_USAGE, usage_rows)
+            if title_rows:
+                self.conn.executemany(self.UPSERT_TITLE, title_rows)
+        if title_rows:
+            self._touched_days.add(date)
+        # Estimación del tamaño de las filas, para el presupuesto de la persistencia
+        return 32 * len(usage_rows) + sum(24 + len(row[2]) for row in title_rows)
+
+    def flush(self):
+        """Los ticks ya están confirmados; solo recorta los títulos de los días modificados."""
+        for date in sorted(self._touched_days):
+            self.trim_titles(date)
+        self._touched_days.clear()
+        # Los títulos quedan en la base; en memoria solo hace falta la caché de normalización
+        self.titles.retain(())
+        return 0
+
+    def trim_titles(self, date):
+        """Conserva los `title_top_k` títulos con más tiempo por proceso y suma el resto en "(otros)"."""
+        ranked = (
+            "SELECT app, title, ms, focus_ms, ROW_NUMBER() OVER (PARTITION BY app ORDER BY ms DESC) AS rank"
+            " FROM titles WHERE day = ? AND title != ?"
+        )
+        with self.conn:
+            excess = self.conn.execute(
+                f"SELECT app, title, ms, focus_ms FROM ({ranked}) WHERE rank > ?",
+                (date, self.OTHER_TITLES, self.title_top_k)).fetchall()
+            if not excess:
+                return
+            other = {}
+            for app, _, ms, focus_ms in excess:
+                total = other.setdefault(app, [0, 0])
+                total[0] += ms
+                total[1] += focus_ms
+            self.conn.executemany("DELETE FROM titles WHERE day = ? AND app = ? AND title = ?",
+                                  [(date, app, title) for app, title, _, _ in excess])
+            self.conn.executemany(self.UPSERT_TITLE,
+                                  [(date, app, self.OTHER_TITLES, ms, focus_ms)
+                                   for app, (ms, focus_ms) in other.items()])
+
+    def strip_titles(self, before):
+        with self.conn:
+            self.conn.execute("DELETE FROM titles WHERE day < ?", (before,))
+        return 0
+
+    def close(self):
+        if self.conn is None:
+            return
+        if not self.read_only:
+            self.flush()
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.conn.close()
+        self.conn = None
+
+    def stats(self):
+        page_size, = self.conn.execute("PRAGMA page_size").fetchone()
+        page_count, = self.conn.execute("PRAGMA page_count").fetchone()
+        wal = self.db_file.with_name(self.db_file.name + '-wal')
+        return {
+            'backend': 'sqlite',
+            'database_bytes': page_size * page_count,
+            'wal_bytes': wal.stat().st_size if wal.exists() else 0,
+            'titles': len(self.titles.titles),
+        }
+
+class UsageAccountant:
+    """Convierte el tiempo transcurrido en intervalos acreditables por día.
+
+    La duración se mide con un reloj monotónico en milisegundos enteros, así que
+    no se acumula deriva aunque los ticks se retrasen. El reloj de pared solo se
+    usa para decidir a qué fecha pertenece cada tramo, partiendo los intervalos
+    que cruzan la medianoche. Un salto mayor que `max_gap` (suspensión,
+    hibernación o un bloqueo del proceso) se acredita solo hasta ese límite.
+    """
+
+    def __init__(self, max_gap=20.0, clock=time.monotonic, wall_clock=time.time):
+        self.max_gap_ms = int(max_gap * 1000)
+        self.clock = clock
+        self.wall_clock = wall_clock
+        self.last_ms = None  # Lecturas de la última llamada, que TraceRecorder guarda tal cual
+        self.last_wall = None
+
+    def start(self):
+        self.last_ms = int(self.clock() * 1000)
+
+    def advance(self):
+        """Devuelve [(fecha, milisegundos)] transcurridos desde la llamada anterior."""
+        now_ms = int(self.clock() * 1000)
+        elapsed_ms = min(now_ms - self.last_ms, self.max_gap_ms)
+        self.last_ms = now_ms
+        self.last_wall = self.wall_clock()
+        if elapsed_ms <= 0:
+            return []
+        return self.split_by_day(self.last_wall, elapsed_ms)
+
+    @staticmethod
+    def split_by_day(end_timestamp, elapsed_ms):
+        """Reparte el intervalo que termina en `end_timestamp` entre las fechas que abarca."""
+        end = datetime.fromtimestamp(end_timestamp)
+        start = end - timedelta(milliseconds=elapsed_ms)
+        intervals = []
+        while start.date() < end.date():
+            midnight = datetime.combine(start.date() + timedelta(days=1), datetime.min.time())
+            ms = round((midnight - start).total_seconds() * 1000)
+            intervals.append((start.strftime("%Y-%m-%d"), ms))
+            elapsed_ms -= ms
+            start = midnight
+        # Un tick que termina justo a medianoche no deja tramo en el día nuevo
+        if elapsed_ms > 0:
+            intervals.append((end.strftime("%Y-%m-%d"), elapsed_ms))
+        return intervals
+
+class WindowSource:
+    """Interfaz de acceso a las ventanas y procesos del sistema que consume el rastreador."""
+
+    def enum_windows(self):
+        """Devuelve los identificadores de las ventanas de nivel superior."""
+        raise NotImplementedError
+
+    def is_visible(self, hwnd):
+        raise NotImplementedError
+
+    def get_title(self, hwnd):
+        raise NotImplementedError
+
+    def get_rect(self, hwnd):
+        """Devuelve (izquierda, arriba, derecha, abajo)."""
+        raise NotImplementedError
+
+    def get_pid(self, hwnd):
+        raise NotImplementedError
+
+    def get_process_name(self, pid):
+        """Devuelve el nombre del proceso o None si ya no existe o no es accesible."""
+        raise NotImplementedError
+
+    def get_process_create_time(self, pid):
+        """Devuelve la hora de creación del proceso o None si ya no existe."""
+        raise NotImplementedError
+
+    def get_process_identity(self, pid):
+        """Devuelve (nombre, hora de creación) del proceso, o None si ya no existe o no es accesible."""
+        create_time = self.get_process_create_time(pid)
+        name = self.get_process_name(pid) if create_time is not None else None
+        return (name, create_time) if name is not None else None
+
+    def live_pids(self):
+        """Devuelve el conjunto de PIDs en ejecución."""
+        raise NotImplementedError
+
+    def get_foreground_window(self):
+        """Devuelve la ventana que tiene el foco, o None."""
+        raise NotImplementedError
+
+    def get_idle_seconds(self):
+        """Devuelve los segundos transcurridos desde la última entrada de teclado o ratón."""
+        raise NotImplementedError
+
+class Win32WindowSource(WindowSource):
+    """Fuente de ventanas real basada en win32gui/win32process y psutil."""
+
+    def __init__(self):
+        # Se importan al crear la fuente y no al cargar el módulo: psutil sola
+        # demora decenas de milisegundos y el demonio puede no necesitarlas
+        import psutil
+        import win32api
+        import win32gui
+        import win32process
+        self.psutil = psutil
+        self.win32api = win32api
+        self.win32gui = win32gui
+        self.win32process = win32process
+
+    def enum_windows(self):
+        hwnds = []
+        self.win32gui.EnumWindows(lambda hwnd, acc: acc.append(hwnd), hwnds)
+        return hwnds
+
+    def is_visible(self, hwnd):
+        return self.win32gui.IsWindowVisible(hwnd)
+
+    def get_title(self, hwnd):
+        return self.win32gui.GetWindowText(hwnd)
+
+    def get_rect(self, hwnd):
+        return self.win32gui.GetWindowRect(hwnd)
+
+    def get_pid(self, hwnd):
+        _, pid = self.win32process.GetWindowThreadProcessId(hwnd)
+        return pid
+
+    def get_process_name(self, pid):
+        try:
+            return self.psutil.Process(pid).name()
+        except (self.psutil.NoSuchProcess, self.psutil.AccessDenied, self.psutil.ZombieProcess):
+            return None
+
+    def get_process_create_time(self, pid):
+        try:
+            return self.psutil.Process(pid).create_time()
+        except (self.psutil.NoSuchProcess, self.psutil.AccessDenied, self.psutil.ZombieProcess):
+            return None
+
+    def get_process_identity(self, pid):
+        # Un solo Process: psutil ya lee la hora de creación al construirlo
+        try:
+            process = self.psutil.Process(pid)
+            return process.name(), process.create_time()
+        except (self.psutil.NoSuchProcess, self.psutil.AccessDenied, self.psutil.ZombieProcess):
+            return None
+
+    def live_pids(self):
+        return set(self.psutil.pids())
+
+    def get_foreground_window(self):
+        return self.win32gui.GetForegroundWindow() or None
+
+    def get_idle_seconds(self):
+        # Ambos valores son contadores de milisegundos de 32 bits que dan la vuelta
+        idle_ms = (self.win32api.GetTickCount() - self.win32api.GetLastInputInfo()) & 0xFFFFFFFF
+        return idle_ms / 1000
+
+class SimulatedWindowSource(WindowSource):
+    """Fuente de ventanas determinista para pruebas de carga sin APIs de Windows.
+
+    Reproduce `windows` ventanas repartidas entre `processes` procesos. En cada
+    llamada a advance() una fracción `churn` de las ventanas se cierra y se
+    reemplaza por otras nuevas, y otra fracción igual cambia de título.
+
+    También simula el foco y la entrada del usuario: advance() cuenta como
+    actividad y, con probabilidad `churn`, pasa el foco a otra ventana;
+    set_idle() simula un período sin entrada.
+    """
+
+    def __init__(self, windows=10, processes=5, churn=0.1, seed=0, clock=time.monotonic):
+        self.processes = processes
+        self.churn = churn
+        self.rng = random.Random(seed)
+        self.windows = {}  # hwnd -> [pid, título, rect, visible]
+        self.process_names = {pid: f"proc{pid:04d}.exe" for pid in range(1, processes + 1)}
+        self.create_times = {pid: 0.0 for pid in self.process_names}
+        self._next_hwnd = 1
+        self._next_title = 0
+        self.changed = set()  # Ventanas modificadas desde la última consulta de eventos
+        self.lock = threading.Lock()  # Permite llamar a advance() desde otro hilo
+        self.clock = clock
+        self.last_input = clock()
+        self.foreground = None
+        for _ in range(windows):
+            self.open_window()
+        if self.windows:
+            self.focus_window(next(iter(self.windows)))
+
+    def open_window(self):
+        hwnd = self._next_hwnd
+        self._next_hwnd += 1
+        pid = self.rng.randint(1, self.processes)
+        # Una parte de las ventanas queda oculta o es demasiado pequeña, como en Windows
+        visible = self.rng.random() > 0.1
+        size = 50 if self.rng.random() < 0.1 else 800
+        self.windows[hwnd] = [pid, self.new_title(), (0, 0, size, size), visible]
+        self.changed.add(hwnd)
+        return hwnd
+
+    def new_title(self):
+        self._next_title += 1
+        return f"Documento {self._next_title}"
+
+    def close_window(self, hwnd):
+        del self.windows[hwnd]
+        self.changed.add(hwnd)
+        if hwnd == self.foreground:
+            self.foreground = None
+
+    def focus_window(self, hwnd):
+        """Pasa el foco a una ventana; como en Windows, genera un evento de cambio."""
+        if self.foreground is not None:
+            self.changed.add(self.foreground)
+        self.foreground = hwnd
+        self.changed.add(hwnd)
+
+    def set_idle(self, seconds):
+        """Simula que la última entrada del usuario fue hace `seconds` segundos."""
+        self.last_input = self.clock() - seconds
+
+    def set_title(self, hwnd, title):
+        self.windows[hwnd][1] = title
+        self.changed.add(hwnd)
+
+    def advance(self):
+        """Simula un tick de actividad: cierra, abre y renombra ventanas."""
+        with self.lock:
+            changes = int(len(self.windows) * self.churn)
+            for hwnd in self.rng.sample(list(self.windows), changes):
+                self.close_window(hwnd)
+                self.open_window()
+            for hwnd in self.rng.sample(list(self.windows), changes):
+                self.set_title(hwnd, self.new_title())
+            if self.windows and (self.foreground is None or self.rng.random() < self.churn):
+                self.focus_window(self.rng.choice(list(self.windows)))
+            self.last_input = self.clock()
+
+    def pop_changes(self):
+        with self.lock:
+            changed, self.changed = self.changed, set()
+        return changed
+
+    def enum_windows(self):
+        with self.lock:
+            return list(self.windows)
+
+    # Una ventana cerrada se comporta como en Windows: deja de ser visible y no
+    # tiene título, aunque se consulte entre la enumeración y la validación
+    def is_visible(self, hwnd):
+        window = self.windows.get(hwnd)
+        return window is not None and window[3]
+
+    def get_title(self, hwnd):
+        window = self.windows.get(hwnd)
+        return window[1] if window else ""
+
+    def get_rect(self, hwnd):
+        window = self.windows.get(hwnd)
+        return window[2] if window else (0, 0, 0, 0)
+
+    def get_pid(self, hwnd):
+        window = self.windows.get(hwnd)
+        return window[0] if window else 0
+
+    def get_process_name(self, pid):
+        return self.process_names.get(pid)
+
+    def get_process_create_time(self, pid):
+        return self.create_times.get(pid)
+
+    def live_pids(self):
+        return set(self.process_names)
+
+    def get_foreground_window(self):
+        return self.foreground
+
+    def get_idle_seconds(self):
+        return self.clock() - self.last_input
+
+    def restart_process(self, pid, name=None):
+        """Simula que el PID fue reutilizado por otro proceso."""
+        self.create_times[pid] += 1.0
+        if name:
+            self.process_names[pid] = name
+
+class ProcessNameCache:
+    """Caché PID -> nombre de proceso con detección de reutilización de PIDs.
+
+    Cada entrada guarda la hora de creación del proceso. Una entrada se da por
+    válida durante `revalidate_interval` segundos; después se compara la hora de
+    creación, que cambia si el sistema reasignó el PID a otro proceso. Con
+    `revalidate` se compara siempre: ActiveWindowModel lo pide para las
+    ventanas nuevas, que es donde aparece un PID reutilizado. En cada tick se
+    descartan los PIDs que ya no existen.
+    """
+
+    def __init__(self, source, revalidate_interval=30.0, clock=time.monotonic):
+        self.source = source
+        self.revalidate_interval = revalidate_interval
+        self.clock = clock
+        self.entries = {}  # pid -> [nombre, hora de creación, última validación]
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+        self.lookup_latency = LatencyHistogram()  # Consultas al sistema (fallos y revalidaciones)
+
+    def get(self, pid, revalidate=False):
+        now = self.clock()
+        entry = self.entries.get(pid)
+        if entry is not None:
+            if not revalidate and now - entry[2] < self.revalidate_interval:
+                self.hits += 1
+                return entry[0]
+            self.revalidations += 1
+            start = time.perf_counter()
+            create_time = self.source.get_process_create_time(pid)
+            self.lookup_latency.record(time.perf_counter() - start)
+            if create_time == entry[1]:
+                entry[2] = now
+                self.hits += 1
+                return entry[0]
+            del self.entries[pid]
+
+        self.misses += 1
+        start = time.perf_counter()
+        identity = self.source.get_process_identity(pid)
+        self.lookup_latency.record(time.perf_counter() - start)
+        if identity is None:
+            return None
+        self.entries[pid] = [identity[0], identity[1], now]
+        return identity[0]
+
+    def evict_dead(self):
+        """Elimina las entradas de procesos que ya terminaron."""
+        if not self.entries:
+            return
+        live = self.source.live_pids()
+        for pid in [pid for pid in self.entries if pid not in live]:
+            del self.entries[pid]
+            self.evictions += 1
+
+    def stats(self):
+        return {
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'revalidations': self.revalidations,
+            'evictions': self.evictions,
+            'lookup': self.lookup_latency.to_dict(),
+        }
+
+class WindowSampler:
+    """Obtiene en cada tick las ventanas activas agrupadas por proceso."""
+
+    def __init__(self, source, removed_apps):
+        self.source = source
+        self.removed_apps = removed_apps
+        self.process_cache = ProcessNameCache(source)
+
+    def get_process_name(self, hwnd, revalidate=False):
+        return self.process_cache.get(self.source.get_pid(hwnd), revalidate)
+
+    def get_window_title(self, hwnd):
+        return self.source.get_title(hwnd)
+
+    def is_valid_window(self, hwnd, new=False):
+        """Devuelve (proceso, título) si la ventana cuenta como activa, o None.
+
+        Con `new` (una ventana que no se validó antes) el nombre del proceso en
+        caché se revalida: el PID puede ser de un proceso que terminó.
+        """
+        if not self.source.is_visible(hwnd):
+            return None
+        
+        title = self.get_window_title(hwnd)
+        if not title:
+            return None
+            
+        process_name = self.get_process_name(hwnd, new)
+        if not process_name:
+            return None
+            
+        # Modificar esta condición para incluir todas las ventanas excepto las de apps eliminadas
+        if process_name in self.removed_apps:
+            return None
+            
+        rect = self.source.get_rect(hwnd)
+        width = rect[2] - rect[0]
+        height = rect[3] - rect[1]
+        if width < 100 or height < 100:
+            return None
+            
+        return process_name, title
+
+    def enum_windows_callback(self, hwnd, active_apps):
+        window = self.is_valid_window(hwnd)
+        if window:
+            process_name, window_title = window
+            if process_name not in active_apps:
+                active_apps[process_name] = set()
+            active_apps[process_name].add(window_title)
+
+    def get_active_windows(self):
+        active_apps = {}
+        for hwnd in self.source.enum_windows():
+            self.enum_windows_callback(hwnd, active_apps)
+        self.process_cache.evict_dead()
+        return active_apps
+
+class ActiveWindowModel:
+    """Modelo incremental de las ventanas activas, actualizado a partir de eventos.
+
+    Guarda el resultado de validar cada ventana y solo vuelve a validar las que
+    el origen de eventos reporta como modificadas.
+    """
+
+    def __init__(self, sampler):
+        self.sampler = sampler
+        self.windows = {}  # hwnd -> (proceso, título)
+        self._active_apps = None
+
+    def resync(self):
+        """Vuelve a enumerar todas las ventanas."""
+        previous, self.windows = self.windows, {}
+        for hwnd in self.sampler.source.enum_windows():
+            window = self.sampler.is_valid_window(hwnd, hwnd not in previous)
+            if window:
+                self.windows[hwnd] = window
+        self.sampler.process_cache.evict_dead()
+        self._active_apps = None
+
+    def update(self, hwnds):
+        """Vuelve a validar solo las ventanas indicadas. Devuelve True si algo cambió."""
+        changed = False
+        for hwnd in hwnds:
+            window = self.sampler.is_valid_window(hwnd, hwnd not in self.windows)
+            if window != self.windows.get(hwnd):
+                changed = True
+                if window:
+                    self.windows[hwnd] = window
+                else:
+                    del self.windows[hwnd]
+        if changed:
+            self._active_apps = None
+        return changed
+
+    def focused_window(self, idle_timeout=0):
+        """Devuelve (proceso, título) de la ventana en primer plano.
+
+        Devuelve None si el foco no está en una ventana válida, o si no hubo
+        entrada del usuario en los últimos `idle_timeout` segundos (0 desactiva
+        la detección de inactividad). Reutiliza la validación ya hecha para el
+        modo visible, así que solo agrega dos consultas por tick.
+        """
+        source = self.sampler.source
+        if idle_timeout and source.get_idle_seconds() >= idle_timeout:
+            return None
+        window = self.windows.get(source.get_foreground_window())
+        if window is None or window[0] in self.sampler.removed_apps:
+            return None
+        return window
+
+    def focused_app(self, idle_timeout=0):
+        """Devuelve el proceso de la ventana en primer plano, o None (ver focused_window)."""
+        window = self.focused_window(idle_timeout)
+        return window[0] if window else None
+
+    def active_apps(self):
+        """Devuelve {proceso: conjunto de títulos}, como get_active_windows."""
+        if self._active_apps is None:
+            active_apps = {}
+            for process_name, title in self.windows.values():
+                if process_name in self.sampler.removed_apps:
+                    continue
+                active_apps.setdefault(process_name, set()).add(title)
+            self._active_apps = active_apps
+        return self._active_apps
+
+class WindowEventSource:
+    """Interfaz de notificaciones de cambios de ventanas (creación, cierre, foco, título)."""
+
+    def start(self):
+        pass
+
+    def wait(self, timeout):
+        """Espera hasta `timeout` segundos a que haya cambios.
+
+        Devuelve el conjunto de ventanas modificadas, o None si hay que volver
+        a enumerar todas las ventanas.
+        """
+        raise NotImplementedError
+
+    def wake(self):
+        """Interrumpe un wait() en curso. Se puede llamar desde cualquier hilo."""
+        pass
+
+    def stop(self):
+        pass
+
+class PollingEventSource(WindowEventSource):
+    """Alternativa sin notificaciones: espera el intervalo y pide enumerar todo."""
+
+    def __init__(self):
+        self._wake = threading.Event()
+
+    def wait(self, timeout):
+        self._wake.wait(timeout)
+        self._wake.clear()
+        return None
+
+    def wake(self):
+        self._wake.set()
+
+class SimulatedEventSource(WindowEventSource):
+    """Eventos generados por una SimulatedWindowSource.
+
+    Con `realtime=False` no duerme, lo que permite recorrer la simulación tan
+    rápido como se consuman los eventos.
+    """
+
+    def __init__(self, source, realtime=True):
+        self.source = source
+        self.realtime = realtime
+        self._first = True
+        self._wake = threading.Event()
+
+    def wake(self):
+        self._wake.set()
+
+    def wait(self, timeout):
+        if self.realtime:
+            self._wake.wait(timeout)
+            self._wake.clear()
+        changed = self.source.pop_changes()
+        if self._first:
+            self._first = False
+            return None
+        return changed
+
+class Win32EventSource(WindowEventSource):
+    """Notificaciones de Windows mediante SetWinEventHook.
+
+    Los hooks se reciben por la cola de mensajes del hilo que llamó a start(),
+    así que start(), wait() y stop() deben ejecutarse en el hilo del rastreador.
+    """
+
+    EVENT_RANGES = [
+        (0x0003, 0x0003),  # EVENT_SYSTEM_FOREGROUND
+        (0x0016, 0x0017),  # EVENT_SYSTEM_MINIMIZESTART/MINIMIZEEND
+        (0x8000, 0x8003),  # EVENT_OBJECT_CREATE/DESTROY/SHOW/HIDE
+        (0x800C, 0x800C),  # EVENT_OBJECT_NAMECHANGE
+    ]
+    WINEVENT_OUTOFCONTEXT = 0x0000
+    WINEVENT_SKIPOWNPROCESS = 0x0002
+    OBJID_WINDOW = 0
+    QS_ALLINPUT = 0x04FF
+    PM_REMOVE = 0x0001
+    WM_NULL = 0x0000
+
+    def __init__(self):
+        self._changed = set()
+        self._hooks = []
+        self._first = True
+
+    def start(self):
+        import ctypes
+        from ctypes import wintypes
+        self.ctypes = ctypes
+        self.user32 = ctypes.windll.user32
+        self.msg = wintypes.MSG()
+        self.thread_id = ctypes.windll.kernel32.GetCurrentThreadId()
+
+        win_event_proc = ctypes.WINFUNCTYPE(
+            None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+            wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD
+        )
+        self.user32.SetWinEventHook.restype = wintypes.HANDLE
+        # Hay que conservar la referencia al callback mientras los hooks existan
+        self._callback = win_event_proc(self.on_event)
+        flags = self.WINEVENT_OUTOFCONTEXT | self.WINEVENT_SKIPOWNPROCESS
+        for event_min, event_max in self.EVENT_RANGES:
+            hook = self.user32.SetWinEventHook(event_min, event_max, 0, self._callback, 0, 0, flags)
+            if not hook:
+                self.stop()
+                raise OSError("SetWinEventHook falló")
+            self._hooks.append(hook)
+
+    def on_event(self, hook, event, hwnd, id_object, id_child, thread_id, event_time):
+        if hwnd and id_object == self.OBJID_WINDOW and id_child == 0:
+            self._changed.add(hwnd)
+
+    def wait(self, timeout):
+        if self._first:
+            self._first = False
+            return None
+
+        if not self._changed:
+            self.user32.MsgWaitForMultipleObjects(0, None, False, int(timeout * 1000), self.QS_ALLINPUT)
+        # Los callbacks de los hooks se ejecutan al despachar los mensajes
+        msg_ref = self.ctypes.byref(self.msg)
+        while self.user32.PeekMessageW(msg_ref, None, 0, 0, self.PM_REMOVE):
+            self.user32.TranslateMessage(msg_ref)
+            self.user32.DispatchMessageW(msg_ref)
+
+        changed, self._changed = self._changed, set()
+        return changed
+
+    def wake(self):
+        # Un mensaje vacío a la cola del hilo hace volver a MsgWaitForMultipleObjects
+        self.user32.PostThreadMessageW(self.thread_id, self.WM_NULL, 0, 0)
+
+    def stop(self):
+        for hook in self._hooks:
+            self.user32.UnhookWinEvent(hook)
+        self._hooks = []
+
+class AliasConflict(ValueError):
+    """El nombre pedido ya lo muestra otra aplicación; `owner` es su id canónico."""
+
+    def __init__(self, name, owner):
+        super().__init__(f"El nombre {name!r} ya lo usa otra aplicación ({owner})")
+        self.name = name
+        self.owner = owner
+
+class AliasRegistry:
+    """Nombres personalizados de las aplicaciones, con índices en ambos sentidos.
+
+    Varios procesos con el mismo alias forman una app lógica (un grupo) cuyo
+    tiempo se suma. Cada grupo se identifica por su proceso canónico, el menor
+    de sus miembros, que no cambia al renombrar y sirve como id de fila. Dos
+    apps distintas no pueden mostrarse con el mismo nombre: para unirlas hay que
+    pedirlo explícitamente con `group=True`.
+    """
+
+    def __init__(self, aliases=None):
+        self.aliases = {}  # proceso -> alias
+        self.groups = {}  # alias -> conjunto de procesos
+        self.canonical_ids = {}  # alias -> proceso canónico del grupo
+        for process_name, alias in (aliases or {}).items():
+            self._set(process_name, alias)
+
+    def _set(self, process_name, alias):
+        self._discard(process_name)
+        self.aliases[process_name] = alias
+        members = self.groups.setdefault(alias, set())
+        members.add(process_name)
+        self.canonical_ids[alias] = min(members)
+
+    def _discard(self, process_name):
+        alias = self.aliases.pop(process_name, None)
+        if alias is None:
+            return
+        members = self.groups[alias]
+        members.discard(process_name)
+        if members:
+            self.canonical_ids[alias] = min(members)
+        else:
+            del self.groups[alias]
+            del self.canonical_ids[alias]
+
+    def display_name(self, process_name):
+        return self.aliases.get(process_name, process_name)
+
+    def canonical(self, process_name):
+        """Id del grupo al que pertenece el proceso (el mismo proceso si no tiene alias)."""
+        alias = self.aliases.get(process_name)
+        return process_name if alias is None else self.canonical_ids[alias]
+
+    def members(self, process_name):
+        """Procesos del grupo de `process_name`."""
+        alias = self.aliases.get(process_name)
+        return {process_name} if alias is None else set(self.groups[alias])
+
+    def owner(self, name, processes=()):
+        """Id canónico de la app que se muestra como `name`, o None.
+
+        `processes` son los nombres de proceso conocidos: uno sin alias se
+        muestra con su propio nombre.
+        """
+        if name in self.canonical_ids:
+            return self.canonical_ids[name]
+        if name in processes and name not in self.aliases:
+            return name
+        return None
+
+    def rename(self, process_name, name, processes=(), group=False):
+        """Pone `name` a todo el grupo de `process_name`; un nombre vacío quita el alias.
+
+        Si otra app ya se muestra como `name` lanza AliasConflict, salvo con
+        `group=True`, que une ambas apps en un grupo.
+        """
+        members = self.members(process_name)
+        if not name:
+            for member in members:
+                self._discard(member)
+            return
+        owner = self.owner(name, processes)
+        if owner is not None and owner not in members:
+            if not group:
+                raise AliasConflict(name, owner)
+            members |= self.members(owner)
+        if members == {name} and name not in self.groups:
+            # Renombrar un proceso con su propio nombre equivale a quitarle el alias
+            self._discard(name)
+            return
+        for member in members:
+            self._set(member, name)
+
+    def remove(self, process_name):
+        self._discard(process_name)
+
+    def resolve_conflicts(self, processes, groups=None):
+        """Une las apps que se muestran con el mismo nombre. Devuelve un aviso por cada grupo formado.
+
+        Las configuraciones anteriores permitían que dos procesos compartieran
+        un alias, o que un alias fuera el nombre de otro proceso sin alias
+        (`processes` son los conocidos). `groups` son los alias que ya eran
+        grupos pedidos con rename(group=True), ver group_names(); si es None
+        (configuración anterior) todo alias compartido se avisa.
+        """
+        warnings = []
+        for alias in sorted(self.groups):
+            joined = alias in processes and alias not in self.aliases
+            if joined:
+                self._set(alias, alias)
+            members = self.groups[alias]
+            if joined or (len(members) > 1 and alias not in (groups or ())):
+                warnings.append(f"{', '.join(sorted(members))} se mostraban como {alias!r}: ahora son una sola app")
+        return warnings
+
+    def group_names(self):
+        """Alias de los grupos con más de un proceso."""
+        return sorted(alias for alias, members in self.groups.items() if len(members) > 1)
+
+    def to_dict(self):
+        return dict(self.aliases)
+
+class AppNameIndex:
+    """Índice de búsqueda por subcadena para nombres de aplicaciones.
+
+    Guarda los n-gramas de 1 a 3 caracteres de cada nombre, en minúsculas. Una
+    búsqueda de hasta 3 caracteres es una consulta directa; una más larga
+    intersecta los conjuntos de sus trigramas y verifica los candidatos, o si
+    el texto contiene al de la búsqueda anterior (lo habitual mientras se
+    escribe) solo filtra los resultados previos.
+    """
+
+    def __init__(self):
+        self.names = {}  # nombre -> nombre en minúsculas
+        self.grams = defaultdict(set)  # n-grama -> nombres que lo contienen
+        self._last = None  # (texto, resultados) de la última búsqueda
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, names):
+        """Agrega nombres al índice. Devuelve True si alguno era nuevo."""
+        added = False
+        for name in names:
+            if name in self.names:
+                continue
+            lower = self.names[name] = name.lower()
+            for n in (1, 2, 3):
+                for i in range(len(lower) - n + 1):
+                    self.grams[lower[i:i + n]].add(name)
+            added = True
+        if added:
+            self._last = None
+        return added
+
+    def search(self, text):
+        """Devuelve el conjunto de nombres que contienen `text`, sin distinguir mayúsculas."""
+        text = text.lower()
+        if not text:
+            return set(self.names)
+        if len(text) <= 3:
+            # El n-grama completo es el texto buscado, no hace falta verificar
+            results = set(self.grams.get(text, ()))
+        else:
+            last = self._last
+            if last is not None and last[0] in text:
+                candidates = last[1]
+            else:
+                grams = sorted((self.grams.get(text[i:i + 3], set()) for i in range(len(text) - 2)), key=len)
+                candidates = grams[0].intersection(*grams[1:])
+            results = {name for name in candidates if text in self.names[name]}
+        self._last = (text, results)
+        return results
+
+class TreeRowModel:
+    """Filas de un Treeview identificadas por una clave estable.
+
+    sync() compara las filas nuevas con las que ya se muestran y solo inserta,
+    borra, actualiza las celdas modificadas o mueve las filas que cambiaron de
+    posición, así la selección y el scroll se mantienen sin parpadeo.
+    """
+
+    def __init__(self, tree, columns):
+        self.tree = tree
+        self.columns = columns
+        self.rows = {}  # iid -> (valores, tags)
+        self.order = []
+
+    def sync(self, rows):
+        """Aplica una lista ordenada de filas (iid, valores, tags)."""
+        new_ids = {iid for iid, _, _ in rows}
+        removed = [iid for iid in self.order if iid not in new_ids]
+        if removed:
+            self.tree.delete(*removed)
+            for iid in removed:
+                del self.rows[iid]
+            self.order = [iid for iid in self.order if iid in new_ids]
+
+        # Invariante: self.order[:index] ya coincide con las filas procesadas
+        for index, (iid, values, tags) in enumerate(rows):
+            current = self.rows.get(iid)
+            if current is None:
+                self.tree.insert("", index, iid=iid, values=values, tags=tags)
+                self.order.insert(index, iid)
+            else:
+                old_values, old_tags = current
+                for column, old_value, value in zip(self.columns, old_values, values):
+                    if old_value != value:
+                        self.tree.set(iid, column, value)
+                if old_tags != tags:
+                    self.tree.item(iid, tags=tags)
+                if self.order[index] != iid:
+                    self.tree.move(iid, "", index)
+                    self.order.remove(iid)
+                    self.order.insert(index, iid)
+            self.rows[iid] = (values, tags)
+
+class UsageExporter:
+    """Codifica registros de uso en streaming, con memoria constante.
+
+    Un registro es (fecha, proceso, app, ms, focus_ms), donde app es el nombre
+    mostrado. encode() es un generador de bloques de bytes que consume los
+    registros por tandas, así que nunca hay más de una tanda en memoria.
+
+    Formatos: 'csv' (con encabezado), 'ndjson' (un objeto por registro) y
+    'columnar': NDJSON de grupos de filas, cada línea un objeto {campo: [valores]}
+    con hasta `group_size` registros, que pandas o pyarrow cargan por columnas
+    sin recorrer fila por fila.
+    """
+
+    FIELDS = ('date', 'process', 'app', 'ms', 'focus_ms')
+    FORMATS = {  # formato -> (tipo MIME, extensión)
+        'csv': ('text/csv', '.csv'),
+        'ndjson': ('application/x-ndjson', '.ndjson'),
+        'columnar': ('application/x-ndjson', '.columns.ndjson'),
+    }
+
+    def __init__(self, fmt='csv', batch_size=1000, group_size=10000):
+        if fmt not in self.FORMATS:
+            raise ValueError(f"Formato de exportación desconocido: {fmt}")
+        self.fmt = fmt
+        self.batch_size = batch_size
+        self.group_size = group_size
+
+    @property
+    def content_type(self):
+        return self.FORMATS[self.fmt][0]
+
+    @property
+    def extension(self):
+        return self.FORMATS[self.fmt][1]
+
+    def encode(self, records):
+        return getattr(self, 'encode_' + self.fmt)(iter(records))
+
+    def encode_csv(self, records):
+        import csv
+        import io
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        writer.writerow(self.FIELDS)
+        for batch in iter(lambda: list(islice(records, self.batch_size)), []):
+            writer.writerows(batch)
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+
+    def encode_ndjson(self, records):
+        # Solo los nombres necesitan escaparse: la fecha es ISO y los tiempos son enteros.
+        # Armar la línea a mano es varias veces más rápido que json.dumps por registro.
+        from json.encoder import encode_basestring as quote
+
+        line = '{"date":"%s","process":%s,"app":%s,"ms":%d,"focus_ms":%d}\n'
+        for batch in iter(lambda: list(islice(records, self.batch_size)), []):
+            yield ''.join([
+                line % (date, quote(proc_name), quote(app), ms, focus_ms)
+                for date, proc_name, app, ms, focus_ms in batch
+            ]).encode('utf-8')
+
+    def encode_columnar(self, records):
+        dumps = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+        for group in iter(lambda: list(islice(records, self.group_size)), []):
+            columns = dict(zip(self.FIELDS, (list(column) for column in zip(*group))))
+            yield (dumps(columns) + '\n').encode('utf-8')
+
+class TraceRecorder:
+    """Graba lo que el muestreo acredita en cada tick, para reproducirlo con TrackerCore.replay_trace.
+
+    La traza es NDJSON comprimido con gzip, que a diferencia de lzma se puede
+    escribir línea a línea desde el hilo de muestreo sin frenarlo. La primera
+    línea es un encabezado con los relojes del inicio y las ventanas activas.
+    Cada tick es [ms del reloj monotónico desde el anterior, hora de pared,
+    app en primer plano], más {proceso: [títulos]} si las ventanas cambiaron.
+    Son las mismas lecturas que usó UsageAccountant, así que la reproducción
+    acredita exactamente los mismos milisegundos. La última línea guarda lo que
+    el almacenamiento sumó durante la grabación, para comparar con ella.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path, core):
+        self.path = Path(path)
+        self.core = core
+        self.file = None
+        self.ticks = 0
+
+    @staticmethod
+    def encode_apps(active_apps):
+        return {proc_name: sorted(titles) for proc_name, titles in active_apps.items()}
+
+    @staticmethod
+    def decode_apps(apps):
+        return {proc_name: set(titles) for proc_name, titles in apps.items()}
+
+    @staticmethod
+    def dates(start_wall, end_wall):
+        """Fechas ('AAAA-MM-DD') entre dos horas de pared, inclusive."""
+        day = datetime.fromtimestamp(start_wall).date()
+        end = datetime.fromtimestamp(end_wall).date()
+        dates = []
+        while day <= end:
+            dates.append(day.isoformat())
+            day += timedelta(days=1)
+        return dates
+
+    @staticmethod
+    def delta(before, after):
+        """Resta dos resultados de TrackerCore.usage_by_day, omitiendo lo que no cambió."""
+        result = {}
+        for date, apps in after.items():
+            base = before.get(date, {})
+            changed = {}
+            for proc_name, (ms, focus_ms) in apps.items():
+                old_ms, old_focus_ms = base.get(proc_name, (0, 0))
+                if ms != old_ms or focus_ms != old_focus_ms:
+                    changed[proc_name] = [ms - old_ms, focus_ms - old_focus_ms]
+            if changed:
+                result[date] = changed
+        return result
+
+    @staticmethod
+    def read(path):
+        """Generador de las líneas de una traza ya decodificadas.
+
+        Una traza cortada (el proceso terminó sin cerrarla) se lee hasta la
+        última línea completa.
+        """
+        import gzip
+
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            try:
+                for line in f:
+                    yield json.loads(line)
+            except (EOFError, json.JSONDecodeError):
+                return
+
+    def write(self, entry):
+        self.file.write(json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n')
+
+    def start(self, active_apps, focused):
+        """Abre la traza; se llama justo después de UsageAccountant.start()."""
+        import gzip
+
+        core = self.core
+        self.wall = core.wall_clock()
+        # Solo el día inicial puede tener datos previos a la grabación
+        self.baseline = core.usage_by_day(self.dates(self.wall, self.wall))
+        self.file = gzip.open(self.path, 'wt', encoding='utf-8')
+        self.last_ms = core.accountant.last_ms
+        self.apps = active_apps
+        self.write({
+            'version': self.VERSION, 'mono': self.last_ms, 'wall': self.wall,
+            'max_gap_ms': core.accountant.max_gap_ms,
+            'apps': self.encode_apps(active_apps), 'focused': focused,
+        })
+
+    def tick(self, active_apps, focused):
+        """Registra un tick ya acreditado; `active_apps` y `focused` son el estado nuevo."""
+        accountant = self.core.accountant
+        entry = [accountant.last_ms - self.last_ms, accountant.last_wall, focused]
+        self.last_ms = accountant.last_ms
+        if active_apps is not self.apps and active_apps != self.apps:
+            entry.append(self.encode_apps(active_apps))
+        self.apps = active_apps
+        self.write(entry)
+        self.ticks += 1
+
+    def finish(self):
+        """Agrega el uso que registró el almacenamiento y cierra la traza."""
+        end = self.core.accountant.last_wall or self.wall
+        usage = self.core.usage_by_day(self.dates(self.wall, end))
+        self.write({'end': end, 'ticks': self.ticks, 'expected': self.delta(self.baseline, usage)})
+        self.file.close()
+
+class TraceClock:
+    """Relojes que solo avanzan con las lecturas de una traza (ver TrackerCore.replay_trace)."""
+
+    def __init__(self, mono_ms, wall):
+        self.mono_ms = mono_ms
+        self.wall = wall
+
+    def advance(self, elapsed_ms, wall):
+        self.mono_ms += elapsed_ms
+        self.wall = wall
+
+    def monotonic(self):
+        # Medio milisegundo de margen para que int(segundos * 1000) dé exactamente mono_ms
+        return (self.mono_ms + 0.5) / 1000
+
+    def time(self):
+        return self.wall
+
+# Estado publicado por el hilo de muestreo para la interfaz. Se reemplaza
+# completo en cada tick y nunca se modifica, así que se puede leer sin bloqueo.
+UsageSnapshot = namedtuple('UsageSnapshot', ['date', 'totals', 'active_windows', 'focused'], defaults=(None,))
+
+DEFAULT_API_PORT = 47600
+
+class TrackerCore:
+    """Muestreo, almacenamiento y configuración del rastreador, sin interfaz gráfica.
+
+    Es la parte que corre siempre: la interfaz de Tk la usa en el mismo proceso
+    y el demonio sin interfaz (daemon_main) la expone con QueryServer. Las
+    funciones registradas con subscribe() se llaman desde el hilo de muestreo
+    cada vez que se publica un UsageSnapshot nuevo.
+    """
+
+    TRACKING_MODES = {'visible': "Ventanas visibles", 'focus': "Primer plano"}
+    STORAGE_BACKENDS = ('json', 'sqlite')
+    REPORT_ENGINES = ('rollups', 'columnar')
+
+    def __init__(self, window_source=None, event_source=None, read_only=False):
+        self.data_file = Path('app_usage_data.json')
+        self.config_file = Path('app_config.json')
+        self.read_only = read_only  # Solo para leer datos (exportación): sin persistencia ni retención
+        self.tracking = False
+        self.aliases = AliasRegistry()
+        self.tracked_apps = set()
+        self.removed_apps = set()
+        self.highlighted_apps = set()  # Nueva variable para apps destacadas
+        # Protege la configuración y el almacenamiento, compartidos por los hilos
+        # de muestreo, de Tk, del system tray y de la API
+        self.state_lock = threading.RLock()
+        self._lifecycle_lock = threading.Lock()
+        self._sampler_thread = None
+        self._events = None
+        # credit_pending() pide al hilo de muestreo que acredite ya el tramo en curso
+        self._credit_request = threading.Event()
+        self._credited = threading.Event()
+        self._listeners = []
+        self._columnar = ColumnarUsage()  # Días cerrados para report_engine 'columnar'
+        self._columnar_until = ''  # Último día cargado en _columnar
+        self._columnar_lock = threading.Lock()
+        self.snapshot = UsageSnapshot(datetime.now().strftime("%Y-%m-%d"), {}, {})
+        self.load_config()
+        self.store = self.create_store()
+        self.store.titles.set_rules(self.title_rules)
+        self.store.title_top_k = self.title_top_k
+        self.persistence = PersistenceScheduler(flush_interval=self.flush_interval, byte_budget=self.byte_budget)
+        self.persistence.register('data', self.flush_data)
+        self.persistence.register('config', self.write_config)
+        self.persistence.register('retention', self.apply_retention)
+        # Solo se carga el día actual; el resto del historial se lee bajo demanda
+        self.store.load(self.snapshot.date, read_only)
+        self.load_errors = self.store.load_errors
+        if not read_only:
+            # La retención corre en el hilo de persistencia, al arrancar y con cada cambio de día
+            self.persistence.mark_dirty('retention')
+            if self.config_warnings:
+                # Los grupos formados al cargar quedan guardados: se avisa una sola vez
+                self.save_config()
+            self.persistence.start()
+        self.sampler = WindowSampler(window_source or Win32WindowSource(), self.removed_apps)
+        self.event_source = event_source
+        self.ui_visible = True  # La interfaz lo apaga mientras su ventana está oculta
+        self.idle_tick_interval = 15  # Sin nadie mirando no hace falta publicar cada segundo
+        self.resync_interval = 60  # Enumeración completa periódica por si se perdió algún evento
+        # Los cambios de ventanas (títulos, aperturas) se acreditan como mucho una vez por intervalo
+        self.coalesce_interval = 1
+        # Relojes del muestreo; replay_trace los reemplaza por los de la traza (ver set_clocks)
+        self.clock = time.monotonic
+        self.wall_clock = time.time
+        self.accountant = UsageAccountant(max_gap=self.idle_tick_interval + 5)
+        self.trace_path = None  # Con una ruta, track_usage graba una traza (ver TraceRecorder)
+        self.stats = SamplerStats()
+        self.profiler = SamplerProfiler(Path('profiles'))
+
+    def subscribe(self, callback):
+        """Registra una función que recibe cada UsageSnapshot publicado."""
+        self._listeners.append(callback)
+
+    def load_config(self):
+        """Carga la configuración de aplicaciones."""
+        self.flush_interval = 5.0  # Segundos de datos que se pueden perder ante un cierre abrupto
+        self.byte_budget = 64 * 1024  # Bytes pendientes que adelantan la escritura agrupada
+        self.tracking_mode = 'visible'  # 'visible': toda ventana visible; 'focus': solo la del primer plano
+        self.idle_timeout = 300  # Segundos sin entrada tras los que se pausa el tiempo en primer plano
+        self.title_rules = [list(rule) for rule in TitleIndex.DEFAULT_RULES]
+        self.title_top_k = 50
+        self.api_port = DEFAULT_API_PORT
+        self.storage_backend = 'json'  # 'json' (UsageStore) o 'sqlite' (SqliteUsageStore)
+        self.report_engine = 'rollups'  # 'rollups' (resúmenes en disco) o 'columnar' (historial en columnas en memoria)
+        self.archive_after_days = 90  # Días tras los que un mes completo pasa al archivo comprimido (0: nunca)
+        self.title_retention_days = 0  # Días tras los que se descarta el detalle por título (0: nunca)
+        self.export_watermarks = {}  # Destino de exportación incremental -> último día exportado
+        self.config_warnings = []  # Cambios hechos al cargar una configuración anterior
+        if self.config_file.exists():
+            try:
+                with open(self.config_file, 'r') as f:
+                    config = json.load(f)
+                    self.flush_interval = config.get('flush_interval', self.flush_interval)
+                    self.byte_budget = config.get('byte_budget', self.byte_budget)
+                    if config.get('tracking_mode') in self.TRACKING_MODES:
+                        self.tracking_mode = config['tracking_mode']
+                    self.idle_timeout = config.get('idle_timeout', self.idle_timeout)
+                    self.title_rules = config.get('title_rules', self.title_rules)
+                    self.title_top_k = config.get('title_top_k', self.title_top_k)
+                    self.api_port = config.get('api_port', self.api_port)
+                    if config.get('storage_backend') in self.STORAGE_BACKENDS:
+                        self.storage_backend = config['storage_backend']
+                    if config.get('report_engine') in self.REPORT_ENGINES:
+                        self.report_engine = config['report_engine']
+                    self.archive_after_days = config.get('archive_after_days', self.archive_after_days)
+                    self.title_retention_days = config.get('title_retention_days', self.title_retention_days)
+                    self.export_watermarks = config.get('export_watermarks', self.export_watermarks)
+                    self.aliases = AliasRegistry(config.get('aliases', {}))
+                    self.tracked_apps = set(config.get('tracked_apps', []))
+                    self.removed_apps = set(config.get('removed_apps', []))
+                    self.highlighted_apps = set(config.get('highlighted_apps', []))  # Cargar apps destacadas
+                    self.config_warnings = self.aliases.resolve_conflicts(self.tracked_apps, config.get('alias_groups'))
+            except json.JSONDecodeError:
+                self.aliases = AliasRegistry()
+                self.tracked_apps = set()
+                self.removed_apps = set()
+                self.highlighted_apps = set()
+        else:
+            self.aliases = AliasRegistry()
+            self.tracked_apps = set()
+            self.removed_apps = set()
+            self.highlighted_apps = set()
+
+    def create_store(self):
+        """Crea el almacenamiento elegido en storage_backend; SQLite importa los datos JSON la primera vez.
+
+        En solo lectura, mientras no exista la base se leen los datos JSON.
+        """
+        if self.storage_backend == 'sqlite' and (Path('app_usage.sqlite3').exists() or not self.read_only):
+            return SqliteUsageStore(Path('app_usage.sqlite3'), import_dir=Path('app_usage_data'),
+                                    legacy_file=self.data_file)
+        return UsageStore(Path('app_usage_data'), legacy_file=self.data_file)
+
+    def save_config(self):
+        """Marca la configuración para guardarla en la próxima escritura agrupada."""
+        self.persistence.mark_dirty('config')
+
+    def write_config(self):
+        """Guarda la configuración de aplicaciones."""
+        with self.state_lock:
+            config = {
+                'aliases': self.aliases.to_dict(),
+                'alias_groups': self.aliases.group_names(),
+                'tracked_apps': list(self.tracked_apps),
+                'removed_apps': list(self.removed_apps),
+                'highlighted_apps': list(self.highlighted_apps),  # Guardar apps destacadas
+                'flush_interval': self.flush_interval,
+                'byte_budget': self.byte_budget,
+                'tracking_mode': self.tracking_mode,
+                'idle_timeout': self.idle_timeout,
+                'title_rules': self.title_rules,
+                'title_top_k': self.title_top_k,
+                'api_port': self.api_port,
+                'storage_backend': self.storage_backend,
+                'report_engine': self.report_engine,
+                'archive_after_days': self.archive_after_days,
+                'title_retention_days': self.title_retention_days,
+                'export_watermarks': self.export_watermarks
+            }
+            return atomic_write_json(self.config_file, config, indent=4)
+
+    def save_data(self):
+        """Marca los datos de uso para la próxima escritura agrupada."""
+        self.persistence.mark_dirty('data')
+
+    def flush_data(self):
+        """Escribe el diario pendiente (lo llama el hilo de persistencia)."""
+        with self.state_lock:
+            return self.store.flush()
+
+    def apply_retention(self):
+        """Archiva los meses viejos y descarta los títulos pasado su horizonte. Devuelve los bytes escritos.
+
+        Lo llama el hilo de persistencia. Cada mes se procesa con el lock tomado
+        por separado, para no frenar el muestreo durante la primera conversión
+        de un historial largo.
+        """
+        today = datetime.fromtimestamp(self.wall_clock()).date()
+        title_horizon = today - timedelta(days=self.title_retention_days) if self.title_retention_days else None
+        written = 0
+        if self.archive_after_days:
+            with self.state_lock:
+                months = self.store.archivable_months(today - timedelta(days=self.archive_after_days))
+            for month in months:
+                month_end = UsageRollups.month_end(datetime.strptime(month + '-01', "%Y-%m-%d").date())
+                with self.state_lock:
+                    written += self.store.archive_month(month, title_horizon is not None and month_end < title_horizon)
+        if title_horizon is not None:
+            with self.state_lock:
+                written += self.store.strip_titles(title_horizon.isoformat())
+        return written
+
+    def on_session_end(self):
+        """Windows está cerrando la sesión: se escribe todo antes de que termine el proceso.
+
+        El muestreo sigue corriendo, porque el usuario todavía puede cancelar el cierre.
+        """
+        self.credit_pending()
+        self.persistence.flush()
+
+    def credit_pending(self, timeout=2.0):
+        """Pide al hilo de muestreo que acredite ya el tramo en curso y espera hasta `timeout` segundos.
+
+        Devuelve False si no hay muestreo o no respondió a tiempo. No necesita
+        el hilo de Tk, así que se puede llamar desde él.
+        """
+        with self._lifecycle_lock:
+            events = self._events if self.tracking else None
+            if events is None:
+                return False
+            self._credited.clear()
+            self._credit_request.set()
+            events.wake()
+        return self._credited.wait(timeout)
+
+    def shutdown(self):
+        """Detiene el muestreo y escribe todo lo pendiente."""
+        self.stop_sampler(wait=True)
+        self.persistence.stop()
+        with self.state_lock:
+            self.store.close()
+
+    def get_display_name(self, process_name):
+        """Obtiene el nombre personalizado de la aplicación si existe."""
+        return self.aliases.display_name(process_name)
+
+    def config_state(self):
+        """Copia de la configuración de aplicaciones que necesitan los clientes."""
+        with self.state_lock:
+            return {
+                'aliases': self.aliases.to_dict(),
+                'tracked_apps': set(self.tracked_apps),
+                'removed_apps': set(self.removed_apps),
+                'highlighted_apps': set(self.highlighted_apps),
+                'tracking_mode': self.tracking_mode,
+            }
+
+    def known_apps(self):
+        """Nombres de las apps con datos en el historial, más las eliminadas."""
+        with self.state_lock:
+            return self.store.known_apps() | self.removed_apps
+
+    def rename_app(self, process_name, new_name, group=False):
+        """Renombra la app (todo su grupo); ver AliasRegistry.rename. Puede lanzar AliasConflict."""
+        with self.state_lock:
+            self.aliases.rename(process_name, new_name, self.tracked_apps, group)
+        self.save_config()
+
+    def add_apps(self, process_names):
+        with self.state_lock:
+            self.tracked_apps.update(process_names)
+        self.save_config()
+
+    def remove_app(self, process_name):
+        """Deja de rastrear una aplicación (todo su grupo) y la agrega a la lista de apps eliminadas."""
+        with self.state_lock:
+            for member in self.aliases.members(process_name):
+                self.tracked_apps.discard(member)
+                self.removed_apps.add(member)
+                self.aliases.remove(member)
+        self.save_config()
+
+    def toggle_highlight(self, process_name):
+        """Alterna el destacado de una app; en un grupo se aplica a todos sus procesos."""
+        with self.state_lock:
+            members = self.aliases.members(process_name)
+            if members & self.highlighted_apps:
+                self.highlighted_apps.difference_update(members)
+            else:
+                self.highlighted_apps.update(members)
+        self.save_config()
+
+    def usage_metric(self):
+        """Campo de los datos de uso que corresponde al modo de conteo actual."""
+        return 'focus_ms' if self.tracking_mode == 'focus' else 'ms'
+
+    def set_tracking_mode(self, mode):
+        """Cambia entre contar las ventanas visibles ('visible') o solo la del primer plano ('focus')."""
+        if mode not in self.TRACKING_MODES:
+            raise ValueError(f"Modo de conteo desconocido: {mode}")
+        with self.state_lock:
+            self.tracking_mode = mode
+        self.save_config()
+        # No hace falta volver a muestrear: ambos tiempos ya están registrados
+        snapshot = self.snapshot
+        self.publish_snapshot(snapshot.active_windows, snapshot.focused)
+
+    def day_totals(self, date):
+        """Devuelve {proceso: milisegundos} de un día según el modo de conteo actual."""
+        with self.state_lock:
+            return self.store.day_totals(date, self.usage_metric())
+
+    def report_totals(self, start, end, group_by_alias=False, top_n=0):
+        """Totales por aplicación entre dos fechas, ordenados de mayor a menor.
+
+        Devuelve una lista de (nombre, segundos). Con `group_by_alias` se suman
+        los procesos de cada grupo y se devuelve el nombre del grupo. Se usa el
+        tiempo del modo de conteo actual.
+        """
+        if self.report_engine == 'columnar':
+            totals = self.columnar_range_totals(start, end, self.usage_metric())
+        else:
+            with self.state_lock:
+                totals = self.store.range_totals(start, end, self.usage_metric())
+        with self.state_lock:
+            tracked_apps = set(self.tracked_apps)
+            aliases = AliasRegistry(self.aliases.to_dict())
+
+        grouped = {}
+        for proc_name, ms in totals.items():
+            if proc_name not in tracked_apps:
+                continue
+            name = aliases.display_name(proc_name) if group_by_alias else proc_name
+            grouped[name] = grouped.get(name, 0) + ms
+
+        report = sorted(((name, ms // 1000) for name, ms in grouped.items()), key=lambda x: x[1], reverse=True)
+        return report[:top_n] if top_n else report
+
+    def columnar_range_totals(self, start, end, metric='ms'):
+        """Como StorageBackend.range_totals, con los días cerrados sumados en un ColumnarUsage.
+
+        Ayer y hoy todavía reciben tiempo (un tick que cruza la medianoche
+        acredita el final de ayer), así que se leen del almacenamiento. El
+        resto se carga una sola vez, un día por vez con el lock tomado, y se
+        completa a medida que los días se cierran.
+        """
+        today = datetime.strptime(self.snapshot.date, "%Y-%m-%d").date()
+        live = today - timedelta(days=1)
+        with self._columnar_lock:
+            closed_until = (live - timedelta(days=1)).isoformat()
+            if self._columnar_until < closed_until:
+                with self.state_lock:
+                    dates = [date for date in self.store.days() if self._columnar_until < date <= closed_until]
+                for date in dates:
+                    with self.state_lock:
+                        rows = self.store.day_rows(date)
+                    self._columnar.append_rows(date, rows)
+                self._columnar_until = closed_until
+            totals = self._columnar.totals(start, min(end, live - timedelta(days=1)), metric) if start < live else {}
+
+        day = max(start, live)
+        while day <= end:
+            with self.state_lock:
+                for proc_name, ms in self.store.day_totals(day.isoformat(), metric).items():
+                    totals[proc_name] = totals.get(proc_name, 0) + ms
+            day += timedelta(days=1)
+        return totals
+
+    def title_breakdown(self, date, process_name):
+        """Devuelve [(título, segundos)] de una app (o de todo su grupo) en un día, de mayor a menor.
+
+        Como los totales, cuenta el tiempo visible o el de primer plano según el modo.
+        """
+        titles = {}
+        key = 'title_focus' if self.usage_metric() == 'focus_ms' else 'titles'
+        with self.state_lock:
+            day_data = self.store.get_day(date, create=False) or {}
+            for member in self.aliases.members(process_name):
+                for title, ms in day_data.get(member, {}).get(key, {}).items():
+                    titles[title] = titles.get(title, 0) + ms
+        return sorted(((title, ms // 1000) for title, ms in titles.items()), key=lambda x: x[1], reverse=True)
+
+    def get_active_windows(self):
+        return self.sampler.get_active_windows()
+
+    def iter_records(self, start, end):
+        """Genera (fecha, proceso, app, ms, focus_ms) entre dos fechas (datetime.date) inclusive.
+
+        Lee un día por vez y solo toma el lock mientras lo lee, así que exportar
+        años de historial no frena el muestreo ni ocupa más memoria que un día.
+        Se omiten las apps eliminadas y app es el nombre mostrado.
+        """
+        first, last = start.isoformat(), end.isoformat()
+        with self.state_lock:
+            dates = [date for date in self.store.days() if first <= date <= last]
+            aliases = AliasRegistry(self.aliases.to_dict())
+            removed_apps = set(self.removed_apps)
+        for date in dates:
+            with self.state_lock:
+                rows = self.store.day_rows(date)
+            for proc_name, ms, focus_ms in rows:
+                if proc_name not in removed_apps:
+                    yield date, proc_name, aliases.display_name(proc_name), ms, focus_ms
+
+    def export_chunks(self, fmt='csv', start=None, end=None, incremental=None):
+        """Prepara una exportación en streaming. Devuelve (inicio, fin, generador de bytes).
+
+        Sin fechas se exporta todo el historial hasta hoy. Con `incremental`, el
+        nombre de un destino, se exporta desde el día siguiente a su marca de
+        agua hasta ayer (solo días completos, para no repetir datos) y la marca
+        avanza recién cuando el generador se consumió entero. Lanza ValueError
+        si el formato no existe.
+        """
+        exporter = UsageExporter(fmt)
+        today = datetime.now().date()
+        with self.state_lock:
+            days = self.store.days()
+            watermark = self.export_watermarks.get(incremental) if incremental else None
+        first_day = datetime.strptime(days[0], "%Y-%m-%d").date() if days else today
+        if incremental:
+            start = datetime.strptime(watermark, "%Y-%m-%d").date() + timedelta(days=1) if watermark else first_day
+            end = today - timedelta(days=1)
+        else:
+            start = start or first_day
+            end = end or today
+
+        def chunks():
+            yield from exporter.encode(self.iter_records(start, end))
+            if incremental and start <= end:
+                with self.state_lock:
+                    self.export_watermarks[incremental] = end.isoformat()
+                self.save_config()
+
+        return start, end, chunks()
+
+    def export_usage(self, out, fmt='csv', start=None, end=None, incremental=None):
+        """Escribe una exportación en `out` (un archivo binario). Devuelve (inicio, fin, bytes escritos)."""
+        start, end, chunks = self.export_chunks(fmt, start, end, incremental)
+        written = 0
+        for chunk in chunks:
+            out.write(chunk)
+            written += len(chunk)
+        return start, end, written
+
+    def is_profiling(self):
+        return self.profiler.enabled
+
+    def set_profiling(self, enabled):
+        """Pide encender o apagar cProfile en el hilo de muestreo; se aplica en la próxima vuelta."""
+        self.profiler.enabled = bool(enabled)
+        with self._lifecycle_lock:
+            if self._events is not None:
+                self._events.wake()
+
+    def diagnostics(self):
+        """Métricas de rendimiento del muestreo y de las escrituras, serializables como JSON."""
+        with self.state_lock:
+            store = self.store.stats()
+        return {
+            'generated': datetime.now().isoformat(timespec='seconds'),
+            'tracking': self.tracking,
+            'tracking_mode': self.tracking_mode,
+            'ui_visible': self.ui_visible,
+            'sampler': self.stats.to_dict(),
+            'process_cache': self.sampler.process_cache.stats(),
+            'persistence': self.persistence.stats(),
+            'store': store,
+            'profiler': self.profiler.to_dict(),
+        }
+
+    def set_clocks(self, clock, wall_clock):
+        """Cambia el reloj monotónico y el de pared del muestreo y de la contabilidad."""
+        self.clock = self.accountant.clock = clock
+        self.wall_clock = self.accountant.wall_clock = wall_clock
+
+    def usage_by_day(self, dates):
+        """Devuelve {fecha: {proceso: (ms, focus_ms)}} de las fechas indicadas."""
+        with self.state_lock:
+            return {
+                date: {proc_name: (ms, focus_ms) for proc_name, ms, focus_ms in self.store.day_rows(date)}
+                for date in dates
+            }
+
+    def open_trace(self, active_apps, focused):
+        """Empieza a grabar en trace_path, si hay una. Devuelve el TraceRecorder o None.
+
+        Cada inicio del muestreo reescribe la traza.
+        """
+        if self.trace_path is None:
+            return None
+        trace = TraceRecorder(self.trace_path, self)
+        try:
+            trace.start(active_apps, focused)
+        except OSError as e:
+            print(f"No se pudo grabar la traza {self.trace_path}: {e}", file=sys.stderr)
+            return None
+        return trace
+
+    def replay_trace(self, path):
+        """Reproduce una traza de TraceRecorder por la contabilidad, el almacenamiento y la publicación.
+
+        Cada tick se acredita con credit_usage y se publica con publish_snapshot
+        (los suscriptores, como update_tree, reciben cada snapshot) usando los
+        relojes grabados, sin esperar entre ticks. El muestreo tiene que estar
+        detenido; conviene usar un directorio de datos aparte. Devuelve
+        {'ticks', 'simulated', 'elapsed', 'expected', 'actual', 'matches'}, donde
+        'actual' es el uso que sumó la reproducción y 'matches' indica si es
+        igual al de la ejecución grabada (None si la grabación no se cerró).
+        """
+        entries = TraceRecorder.read(path)
+        header = next(entries, None)
+        if not isinstance(header, dict) or header.get('version') != TraceRecorder.VERSION:
+            raise ValueError(f"Traza inválida o de otra versión: {path}")
+        clock = TraceClock(header['mono'], header['wall'])
+        max_gap_ms = self.accountant.max_gap_ms
+        self.set_clocks(clock.monotonic, clock.time)
+        self.accountant.max_gap_ms = header['max_gap_ms']
+        baseline = self.usage_by_day(TraceRecorder.dates(header['wall'], header['wall']))
+        active_apps = TraceRecorder.decode_apps(header['apps'])
+        focused = header['focused']
+        ticks = 0
+        footer = None
+        start = time.perf_counter()
+        try:
+            self.accountant.start()
+            self.publish_snapshot(active_apps, focused)
+            for entry in entries:
+                if isinstance(entry, dict):
+                    footer = entry
+                    break
+                clock.advance(entry[0], entry[1])
+                # Como en track_usage: se acredita el estado anterior y se publica el nuevo
+                self.credit_usage(active_apps, focused)
+                focused = entry[2]
+                if len(entry) > 3:
+                    active_apps = TraceRecorder.decode_apps(entry[3])
+                self.publish_snapshot(active_apps, focused)
+                ticks += 1
+        finally:
+            self.set_clocks(time.monotonic, time.time)
+            self.accountant.max_gap_ms = max_gap_ms
+        elapsed = time.perf_counter() - start
+        usage = self.usage_by_day(TraceRecorder.dates(header['wall'], clock.wall))
+        actual = TraceRecorder.delta(baseline, usage)
+        expected = footer['expected'] if footer else None
+        return {
+            'ticks': ticks,
+            'simulated': (clock.mono_ms - header['mono']) / 1000,
+            'elapsed': elapsed,
+            'expected': expected,
+            'actual': actual,
+            'matches': None if expected is None else expected == actual,
+        }
+
+    def create_event_source(self):
+        """Elige el origen de eventos: hooks de Windows si están disponibles, si no sondeo."""
+        if self.event_source is not None:
+            return self.event_source
+        if isinstance(self.sampler.source, Win32WindowSource):
+            return Win32EventSource()
+        if isinstance(self.sampler.source, SimulatedWindowSource):
+            return SimulatedEventSource(self.sampler.source)
+        return PollingEventSource()
+
+    def credit_usage(self, active_windows, focused=None, focused_title=None):
+        """Acredita el tiempo transcurrido a las ventanas activas y agrega las apps nuevas.
+
+        `focused` es la app en primer plano, que recibe además el tiempo de foco,
+        igual que `focused_title`, el título de su ventana en primer plano.
+        """
+        with self.state_lock:
+            # Agregar automáticamente las nuevas aplicaciones activas
+            for proc_name in active_windows:
+                if proc_name not in self.tracked_apps and proc_name not in self.removed_apps:
+                    self.tracked_apps.add(proc_name)
+                    self.save_config()
+
+            # Actualizar tiempos de uso (solo se escribe el delta, repartido por fecha)
+            for date, ms in self.accountant.advance():
+                written = self.store.record_presence(date, active_windows, ms, self.accountant.last_wall,
+                                                     focused, focused_title)
+                self.persistence.mark_dirty('data', written)
+
+    def publish_snapshot(self, active_windows, focused=None):
+        """Publica una copia inmutable de los totales de hoy y avisa a los suscriptores."""
+        today = datetime.fromtimestamp(self.wall_clock()).strftime("%Y-%m-%d")
+        if today != self.snapshot.date:
+            self.persistence.mark_dirty('retention')
+        with self.state_lock:
+            totals = self.store.day_totals(today, self.usage_metric())
+        self.snapshot = UsageSnapshot(today, totals, active_windows, focused)
+        for callback in self._listeners:
+            callback(self.snapshot)
+
+    def track_usage(self):
+        """Tracking guiado por eventos: solo se revalidan las ventanas que cambiaron.
+
+        El hilo duerme hasta que llega un evento o vence el temporizador. Los
+        eventos se aplican al modelo en el momento, pero el tiempo transcurrido
+        se acredita (con el estado publicado la vez anterior) solo al vencer el
+        temporizador, al cambiar la app en primer plano o, si cambiaron las
+        ventanas o el título en primer plano, una vez por coalesce_interval: una
+        ventana que cambia de título cada pocos milisegundos no genera un
+        registro por evento. En la misma pasada se obtiene la ventana en primer
+        plano, de modo que el tiempo visible y el de foco (por app y por título)
+        se registran juntos sin muestrear dos veces. Cada vuelta se mide por fases en self.stats y, con trace_path, cada tick
+        acreditado se graba en una traza.
+        """
+        perf = time.perf_counter
+        stats = self.stats
+        events = self.create_event_source()
+        try:
+            events.start()
+        except (OSError, AttributeError):
+            events = PollingEventSource()
+        self._events = events
+        model = ActiveWindowModel(self.sampler)
+        model.resync()
+        focus = model.focused_window(self.idle_timeout)  # (proceso, título) o None
+        focused = focus[0] if focus else None
+        self.accountant.start()
+        # Estado publicado: es el que se acredita hasta la próxima publicación
+        published = model.active_apps()
+        published_focus = focus
+        trace = self.open_trace(published, focused)
+        self.publish_snapshot(published, focused)
+        next_tick = last_resync = last_credit = self.clock()
+
+        try:
+            while self.tracking:
+                self.profiler.apply()
+                interval = 1 if self.ui_visible else self.idle_tick_interval
+                deadline = next_tick
+                if model.active_apps() is not published or focus != published_focus:
+                    deadline = min(deadline, last_credit + self.coalesce_interval)
+                changed = events.wait(max(0, deadline - self.clock()))
+                now = self.clock()
+                due = now >= next_tick
+                start = perf()
+                timings = {}
+
+                previous_focused = focused
+                if changed is None or now - last_resync >= self.resync_interval:
+                    model.resync()
+                    last_resync = now
+                    timings['resync'] = perf() - start
+                elif changed:
+                    model.update(changed)
+                    timings['update'] = perf() - start
+                current = model.active_apps()
+                mark = perf()
+                focus = model.focused_window(self.idle_timeout)
+                focused = focus[0] if focus else None
+                timings['focus'] = perf() - mark
+
+                pending = current is not published or focus != published_focus
+                requested = self._credit_request.is_set()
+                if (due or requested or focused != previous_focused
+                        or (pending and now - last_credit >= self.coalesce_interval)):
+                    mark = perf()
+                    self.credit_usage(published, *(published_focus or (None, None)))
+                    timings['accounting'] = perf() - mark
+                    mark = perf()
+                    self.publish_snapshot(current, focused)
+                    timings['publish'] = perf() - mark
+                    if trace:
+                        trace.tick(current, focused)
+                    published = current
+                    published_focus = focus
+                    last_credit = now
+                    if requested:
+                        self._credit_request.clear()
+                        self._credited.set()
+                timings['loop'] = perf() - start
+                stats.record_loop(timings, len(model.windows), due, now - next_tick)
+                if due:
+                    next_tick = now + interval
+
+            # Acreditar el tramo final hasta la detención
+            self.credit_usage(published, *(published_focus or (None, None)))
+            if trace:
+                trace.tick(model.active_apps(), focused)
+        finally:
+            events.stop()
+            self._events = None
+            self.profiler.finish()
+            if trace:
+                trace.finish()
+
+    def toggle_tracking(self):
+        """Alterna el estado del tracking. Se puede llamar desde cualquier hilo."""
+        with self._lifecycle_lock:
+            running = self.tracking
+        if running:
+            self.stop_sampler()
+        else:
+            self.start_sampler()
+
+    def start_sampler(self):
+        """Inicia el hilo de muestreo si no hay otro en ejecución. Seguro desde cualquier hilo."""
+        with self._lifecycle_lock:
+            thread = self._sampler_thread
+            if thread is not None and thread.is_alive():
+                if self.tracking:
+                    return False
+                # Se está deteniendo: esperar a que acredite el tramo final
+                thread.join()
+            self.tracking = True
+            self._sampler_thread = threading.Thread(target=self.track_usage, name="sampler", daemon=True)
+            self._sampler_thread.start()
+            return True
+
+    def stop_sampler(self, wait=False):
+        """Detiene el hilo de muestreo; con `wait` espera a que termine."""
+        with self._lifecycle_lock:
+            self.tracking = False
+            events = self._events
+            if events is not None:
+                events.wake()
+            thread = self._sampler_thread
+        if wait and thread is not None:
+            thread.join()
+
+class QueryServer:
+    """API HTTP local sobre un TrackerCore; las respuestas son JSON.
+
+    Solo escucha en 127.0.0.1. Para que una página web abierta en el navegador
+    no pueda usarla (DNS rebinding, formularios contra localhost) se rechazan
+    los pedidos cuyo Host no sea local y los POST que no sean application/json.
+
+    GET: /status, /today, /active, /config, /apps/known, /day?date=, /titles?date=&app=,
+    /range?start=&end=[&group_by_alias=1][&top=N], /diagnostics
+    POST: /tracking {"enabled"}, /mode {"mode"}, /apps/add {"apps"},
+    /apps/rename {"app", "name"[, "group"]}, /apps/remove {"app"}, /apps/highlight {"app"},
+    /profiling {"enabled"}, /export {"format"[, "start", "end" | "incremental"]}
+
+    /export responde en streaming con el archivo exportado; las fechas usadas
+    van en las cabeceras X-Export-Start y X-Export-End.
+    """
+
+    GET_ROUTES = {
+        '/status': 'get_status',
+        '/today': 'get_today',
+        '/active': 'get_active',
+        '/config': 'get_config',
+        '/apps/known': 'get_known_apps',
+        '/day': 'get_day',
+        '/range': 'get_range',
+        '/titles': 'get_titles',
+        '/diagnostics': 'get_diagnostics',
+    }
+    POST_ROUTES = {
+        '/tracking': 'post_tracking',
+        '/mode': 'post_mode',
+        '/apps/add': 'post_add',
+        '/apps/rename': 'post_rename',
+        '/apps/remove': 'post_remove',
+        '/apps/highlight': 'post_highlight',
+        '/profiling': 'post_profiling',
+        '/export': 'post_export',
+    }
+
+    def __init__(self, core, port=DEFAULT_API_PORT, host='127.0.0.1'):
+        self.core = core
+        self.host = host
+        self.port = port
+        self.httpd = None
+
+    def start(self):
+        """Empieza a atender pedidos en un hilo. Lanza OSError si el puerto está ocupado."""
+        # http.server arrastra varios módulos; solo se cargan si se usa la API
+        from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.handle(self, 'GET')
+
+            def do_POST(self):
+                server.handle(self, 'POST')
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        threading.Thread(target=self.httpd.serve_forever, name="api", daemon=True).start()
+
+    def stop(self):
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+    def handle(self, request, method):
+        from urllib.parse import urlsplit, parse_qsl
+
+        url = urlsplit(request.path)
+        host = request.headers.get('Host', '').rsplit(':', 1)[0]
+        if host not in ('127.0.0.1', 'localhost'):
+            return self.reply(request, 403, {'error': "Host no permitido"})
+        routes = self.POST_ROUTES if method == 'POST' else self.GET_ROUTES
+        route = routes.get(url.path)
+        if route is None:
+            return self.reply(request, 404, {'error': f"Ruta desconocida: {url.path}"})
+
+        try:
+            if method == 'POST':
+                if request.headers.get('Content-Type', '').split(';')[0].strip() != 'application/json':
+                    return self.reply(request, 415, {'error': "Se espera application/json"})
+                length = int(request.headers.get('Content-Length') or 0)
+                argument = json.loads(request.rfile.read(length) or b'{}')
+            else:
+                argument = dict(parse_qsl(url.query))
+            result = getattr(self, route)(argument)
+        except AliasConflict as e:
+            return self.reply(request, 409, {'error': str(e), 'name': e.name, 'owner': e.owner})
+        except (KeyError, ValueError, TypeError) as e:
+            return self.reply(request, 400, {'error': f"Pedido inválido: {e}"})
+        if isinstance(result, dict):
+            self.reply(request, 200, result)
+        else:
+            self.stream(request, *result)
+
+    def reply(self, request, status, data):
+        body = json.dumps(data).encode('utf-8')
+        request.send_response(status)
+        request.send_header('Content-Type', 'application/json')
+        request.send_header('Content-Length', str(len(body)))
+        request.end_headers()
+        request.wfile.write(body)
+
+    def stream(self, request, content_type, headers, chunks):
+        """Envía una respuesta por partes, sin Content-Length (HTTP/1.0 cierra la conexión al final)."""
+        request.send_response(200)
+        request.send_header('Content-Type', content_type)
+        for name, value in headers.items():
+            request.send_header(name, value)
+        request.end_headers()
+        try:
+            for chunk in chunks:
+                request.wfile.write(chunk)
+        except OSError:
+            # El cliente cortó la conexión: el generador se cierra sin mover la marca de agua
+            chunks.close()
+
+    @staticmethod
+    def parse_date(value):
+        return datetime.strptime(value, "%Y-%m-%d").date()
+
+    def get_status(self, params):
+        return {
+            'tracking': self.core.tracking,
+            'tracking_mode': self.core.tracking_mode,
+            'profiling': self.core.is_profiling(),
+            'date': self.core.snapshot.date,
+        }
+
+    def get_today(self, params):
+        snapshot = self.core.snapshot
+        return {
+            'date': snapshot.date,
+            'metric': self.core.usage_metric(),
+            'totals': snapshot.totals,
+            'active_windows': {p: sorted(titles) for p, titles in snapshot.active_windows.items()},
+            'focused': snapshot.focused,
+        }
+
+    def get_active(self, params):
+        snapshot = self.core.snapshot
+        return {
+            'active_windows': {p: sorted(titles) for p, titles in snapshot.active_windows.items()},
+            'focused': snapshot.focused,
+        }
+
+    def get_config(self, params):
+        config = self.core.config_state()
+        return {key: sorted(value) if isinstance(value, set) else value for key, value in config.items()}
+
+    def get_known_apps(self, params):
+        return {'apps': sorted(self.core.known_apps())}
+
+    def get_day(self, params):
+        date = self.parse_date(params['date']).isoformat()
+        return {'date': date, 'totals': self.core.day_totals(date)}
+
+    def get_range(self, params):
+        report = self.core.report_totals(
+            self.parse_date(params['start']), self.parse_date(params['end']),
+            params.get('group_by_alias') in ('1', 'true'), int(params.get('top', 0))
+        )
+        return {'report': report}
+
+    def get_titles(self, params):
+        date = self.parse_date(params['date']).isoformat()
+        return {'titles': self.core.title_breakdown(date, params['app'])}
+
+    def get_diagnostics(self, params):
+        return self.core.diagnostics()
+
+    def post_tracking(self, body):
+        if body['enabled']:
+            self.core.start_sampler()
+        else:
+            self.core.stop_sampler()
+        return {'tracking': self.core.tracking}
+
+    def post_mode(self, body):
+        self.core.set_tracking_mode(body['mode'])
+        return {'tracking_mode': self.core.tracking_mode}
+
+    def post_add(self, body):
+        self.core.add_apps([str(name) for name in body['apps']])
+        return {}
+
+    def post_rename(self, body):
+        self.core.rename_app(body['app'], str(body['name']), bool(body.get('group', False)))
+        return {}
+
+    def post_remove(self, body):
+        self.core.remove_app(body['app'])
+        return {}
+
+    def post_highlight(self, body):
+        self.core.toggle_highlight(body['app'])
+        return {}
+
+    def post_profiling(self, body):
+        self.core.set_profiling(body['enabled'])
+        return {'profiling': self.core.is_profiling()}
+
+    def post_export(self, body):
+        """Devuelve (tipo MIME, cabeceras, bloques) para stream()."""
+        fmt = body.get('format', 'csv')
+        start = self.parse_date(body['start']) if body.get('start') else None
+        end = self.parse_date(body['end']) if body.get('end') else None
+        start, end, chunks = self.core.export_chunks(fmt, start, end, body.get('incremental'))
+        headers = {'X-Export-Start': start.isoformat(), 'X-Export-End': end.isoformat()}
+        return UsageExporter.FORMATS[fmt][0], headers, chunks
+
+class TrackerClient:
+    """Cliente de QueryServer con la misma interfaz de TrackerCore que usa la interfaz de Tk.
+
+    Permite que la interfaz (u otra herramienta) muestre los datos de un demonio
+    que corre en otro proceso. subscribe() inicia un hilo que consulta el estado
+    cada `poll_interval` segundos y avisa cuando cambia.
+    """
+
+    TRACKING_MODES = TrackerCore.TRACKING_MODES
+
+    def __init__(self, port=DEFAULT_API_PORT, host='127.0.0.1', poll_interval=1.0, timeout=2.0):
+        self.host = host
+        self.port = port
+        self.base_url = f"http://{host}:{port}"
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.ui_visible = True
+        self.load_errors = []
+        self.config_warnings = []  # Los avisa el demonio al arrancar
+        self.snapshot = UsageSnapshot(datetime.now().strftime("%Y-%m-%d"), {}, {})
+        self.tracking = False
+        self.tracking_mode = 'visible'
+        self.profiling = False
+        self.aliases = AliasRegistry()
+        self._listeners = []
+        self._poller = None
+        self._stop = threading.Event()
+
+    def request(self, path, body=None, **params):
+        """Hace un pedido a la API. Lanza OSError si el demonio no responde."""
+        import urllib.request
+        from urllib.parse import urlencode
+
+        url = self.base_url + path
+        if params:
+            url += '?' + urlencode(params)
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        request = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.load(response)
+
+    def ping(self):
+        """Devuelve True si hay un demonio escuchando.
+
+        Devuelve False también si en el puerto responde otro programa: una
+        respuesta que no es JSON o no tiene los campos del rastreador.
+        """
+        import socket
+
+        # Una conexión rechazada se detecta sin cargar urllib, que demora el arranque
+        try:
+            socket.create_connection((self.host, self.port), timeout=self.timeout).close()
+            self.refresh()
+            return True
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return False
+
+    def refresh(self):
+        """Actualiza el snapshot y el estado del tracking. Devuelve True si cambiaron."""
+        status = self.request('/status')
+        today = self.request('/today')
+        snapshot = UsageSnapshot(
+            today['date'], today['totals'],
+            {p: set(titles) for p, titles in today['active_windows'].items()}, today['focused']
+        )
+        changed = (snapshot != self.snapshot or status['tracking'] != self.tracking
+                   or status['tracking_mode'] != self.tracking_mode)
+        self.snapshot = snapshot
+        self.tracking = status['tracking']
+        self.tracking_mode = status['tracking_mode']
+        self.profiling = status['profiling']
+        return changed
+
+    def subscribe(self, callback):
+        self._listeners.append(callback)
+        if self._poller is None:
+            self._poller = threading.Thread(target=self._poll, name="api-client", daemon=True)
+            self._poller.start()
+
+    def _poll(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                changed = self.refresh()
+            except OSError:
+                # El demonio puede estar reiniciándose; se reintenta en el próximo ciclo
+                continue
+            if changed:
+                for callback in self._listeners:
+                    callback(self.snapshot)
+
+    def shutdown(self):
+        """Deja de consultar; el demonio sigue corriendo."""
+        self._stop.set()
+
+    def on_session_end(self):
+        # El demonio recibe su propio aviso de cierre de sesión
+        pass
+
+    def get_display_name(self, process_name):
+        return self.aliases.display_name(process_name)
+
+    def config_state(self):
+        config = self.request('/config')
+        self.aliases = AliasRegistry(config['aliases'])
+        for key in ('tracked_apps', 'removed_apps', 'highlighted_apps'):
+            config[key] = set(config[key])
+        return config
+
+    def usage_metric(self):
+        return 'focus_ms' if self.tracking_mode == 'focus' else 'ms'
+
+    def set_tracking_mode(self, mode):
+        self.tracking_mode = self.request('/mode', {'mode': mode})['tracking_mode']
+        self.refresh()
+
+    def day_totals(self, date):
+        return self.request('/day', date=date)['totals']
+
+    def report_totals(self, start, end, group_by_alias=False, top_n=0):
+        report = self.request('/range', start=start.isoformat(), end=end.isoformat(),
+                              group_by_alias=int(group_by_alias), top=top_n)['report']
+        return [tuple(row) for row in report]
+
+    def title_breakdown(self, date, process_name):
+        return [tuple(row) for row in self.request('/titles', date=date, app=process_name)['titles']]
+
+    def known_apps(self):
+        return set(self.request('/apps/known')['apps'])
+
+    def is_profiling(self):
+        return self.profiling
+
+    def set_profiling(self, enabled):
+        self.profiling = self.request('/profiling', {'enabled': bool(enabled)})['profiling']
+
+    def diagnostics(self):
+        return self.request('/diagnostics')
+
+    def export_usage(self, out, fmt='csv', start=None, end=None, incremental=None):
+        """Copia en `out` la exportación que genera el demonio. Devuelve (inicio, fin, bytes escritos)."""
+        import urllib.request
+
+        body = {
+            'format': fmt,
+            'start': start.isoformat() if start else None,
+            'end': end.isoformat() if end else None,
+            'incremental': incremental,
+        }
+        request = urllib.request.Request(self.base_url + '/export', data=json.dumps(body).encode('utf-8'),
+                                         headers={'Content-Type': 'application/json'})
+        written = 0
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            start = QueryServer.parse_date(response.headers['X-Export-Start'])
+            end = QueryServer.parse_date(response.headers['X-Export-End'])
+            for chunk in iter(lambda: response.read(64 * 1024), b''):
+                out.write(chunk)
+                written += len(chunk)
+        return start, end, written
+
+    def rename_app(self, process_name, new_name, group=False):
+        from urllib.error import HTTPError
+
+        try:
+            self.request('/apps/rename', {'app': process_name, 'name': new_name, 'group': group})
+        except HTTPError as e:
+            if e.code != 409:
+                raise
+            raise AliasConflict(new_name, json.load(e)['owner']) from None
+
+    def add_apps(self, process_names):
+        self.request('/apps/add', {'apps': list(process_names)})
+
+    def remove_app(self, process_name):
+        self.request('/apps/remove', {'app': process_name})
+
+    def toggle_highlight(self, process_name):
+        self.request('/apps/highlight', {'app': process_name})
+
+    def toggle_tracking(self):
+        self.tracking = self.request('/tracking', {'enabled': not self.tracking})['tracking']
+
+    def start_sampler(self):
+        self.tracking = self.request('/tracking', {'enabled': True})['tracking']
+
+    def stop_sampler(self, wait=False):
+        self.tracking = self.request('/tracking', {'enabled': False})['tracking']
+
+tk = ttk = simpledialog = messagebox = None
+
+def load_tk():
+    """Importa tkinter la primera vez que se crea la interfaz; el demonio no lo necesita."""
+    global tk, ttk, simpledialog, messagebox
+    if tk is None:
+        import tkinter
+        from tkinter import ttk as tk_ttk, simpledialog as tk_simpledialog, messagebox as tk_messagebox
+        tk, ttk, simpledialog, messagebox = tkinter, tk_ttk, tk_simpledialog, tk_messagebox
 
 class AppUsageTracker:
-    def __init__(self):
-        self.usage_data = {}
-        self.data_file = Path('app_usage_data.json')
-        self.config_file = Path('app_config.json')
-        self.tracking = False
-        self.active_windows = {}
-        self.app_aliases = {}
-        self.tracked_apps = set()
-        self.removed_apps = set()
-        self.highlighted_apps = set()  # Nueva variable para apps destacadas
+    """Interfaz de Tk y system tray.
+
+    Es cliente de `core`: un TrackerCore en el mismo proceso (el valor por
+    defecto) o un TrackerClient conectado al demonio.
+
+    El arranque está ordenado para que el muestreo empiece antes que nada: la
+    ventana principal se arma después (con `background` recién cuando se
+    muestra por primera vez) y el tray, pystray/PIL y el registro de inicio
+    automático se dejan para cuando el bucle de Tk ya está corriendo.
+    """
+
+    UI_POLL_MS = 100  # Cada cuánto el hilo de Tk revisa si el muestreo publicó datos nuevos
+
+    def __init__(self, window_source=None, event_source=None, core=None, background=False):
+        self.core = core or TrackerCore(window_source, event_source)
+        # Iniciar tracking automáticamente, antes de cargar Tk
+        self.core.start_sampler()
+        load_tk()
         self.selected_items = set()
         self.current_date = datetime.now().strftime("%Y-%m-%d")  # Nueva variable para la fecha actual
-        self.load_config()
-        self.load_existing_data()
+        # El hilo de muestreo nunca llama a Tk: una llamada de Tcl desde otro hilo
+        # espera al de Tk, que puede estar esperando al muestreo en un join()
+        self._ui_updates = queue.Queue(maxsize=1)
+        self._alias_config = None
+        self._alias_registry = AliasRegistry()
+        self.gui_built = False
         self.create_gui()
+        if background:
+            self.hide_window()
+        else:
+            self.build_main_window()
+        self.core.subscribe(lambda snapshot: self.request_ui_update())
+        self.root.after(self.UI_POLL_MS, self.poll_ui_updates)
+        self.root.after_idle(self.finish_startup)
+
+    def finish_startup(self):
+        """Último paso del arranque, con el bucle de Tk ya corriendo."""
+        self.create_system_tray()
+        if self.core.load_errors:
+            messagebox.showerror(
+                "Error",
+                "Algunos datos no se pudieron cargar y fueron apartados:\n" + "\n".join(self.core.load_errors)
+            )
+        if self.core.config_warnings:
+            messagebox.showwarning(
+                "Aviso",
+                "Había apps con el mismo nombre:\n" + "\n".join(self.core.config_warnings)
+            )
         self.setup_autostart()
-        
-        # Iniciar tracking automáticamente
-        self.root.after(1000, self.start_tracking)
 
     def setup_autostart(self):
-        """Configura el inicio automático del programa."""
+        """Configura el inicio automático del programa; solo escribe si el valor cambió."""
+        if sys.platform != 'win32':
+            return False
         key_path = r"Software\Microsoft\Windows\CurrentVersion\Run"
         app_name = "AppUsageTracker"
-        
+
         try:
+            import winreg
+
+            # Al iniciar sesión la ventana no hace falta: queda en el tray
             if getattr(sys, 'frozen', False):
-                app_path = f'"{sys.executable}"'
+                app_path = f'"{sys.executable}" --background'
             else:
-                app_path = f'"{sys.executable}" "{os.path.abspath(__file__)}"'
-            
-            key = winreg.OpenKey(winreg.HKEY_CURRENT_USER, key_path, 0, 
-                               winreg.KEY_ALL_ACCESS)
-            winreg.SetValueEx(key, app_name, 0, winreg.REG_SZ, app_path)
-            winreg.CloseKey(key)
+                app_path = f'"{sys.executable}" "{os.path.abspath(__file__)}" --background'
+
+            with winreg.OpenKey(winreg.HKEY_CURRENT_USER, key_path, 0,
+                                winreg.KEY_QUERY_VALUE | winreg.KEY_SET_VALUE) as key:
+                try:
+                    current, _ = winreg.QueryValueEx(key, app_name)
+                except FileNotFoundError:
+                    current = None
+                if current == app_path:
+                    return False
+                winreg.SetValueEx(key, app_name, 0, winreg.REG_SZ, app_path)
+                return True
         except Exception as e:
             messagebox.showerror("Error", f"No se pudo configurar el inicio automático: {str(e)}")
+            return False
 
     def create_system_tray(self):
         """Crea el icono del system tray usando pystray."""
+        # pystray necesita un entorno gráfico al importarse; se carga aquí para que
+        # el muestreo pueda ejecutarse sin él (por ejemplo en los benchmarks)
+        import pystray
+        from PIL import Image
+
         # Crear una imagen para el icono (16x16 pixels, color negro)
         icon_image = Image.new('RGB', (16, 16), 'black')
-        
+
         # Definir el menú del system tray
         def create_menu():
             return pystray.Menu(
                 pystray.MenuItem("Mostrar", self.show_window),
-                pystray.MenuItem("Tracking", self.toggle_tracking, checked=lambda item: self.tracking),
-                pystray.MenuItem("Salir", self.quit_app)
+                pystray.MenuItem("Tracking", self.toggle_tracking, checked=lambda item: self.core.tracking),
+                pystray.MenuItem("Exportar...", self.on_tray_export),
+                pystray.MenuItem("Diagnóstico", self.on_tray_diagnostics),
+                pystray.MenuItem("Perfilado", self.toggle_profiling, checked=lambda item: self.core.is_profiling()),
+                pystray.MenuItem("Salir", self.on_tray_quit)
             )
 
         # Crear el icono del system tray
@@ -79,8 +3719,10 @@ class AppUsageTracker:
         threading.Thread(target=self.tray_icon.run, daemon=True).start()
 
     def show_window(self, icon=None):
-        """Muestra la ventana principal."""
+        """Muestra la ventana principal, armándola la primera vez."""
+        self.core.ui_visible = True
         self.root.after(0, lambda: (
+            self.build_main_window(),
             self.root.deiconify(),
             self.root.state('normal'),
             self.root.focus_force()
@@ -88,17 +3730,39 @@ class AppUsageTracker:
 
     def hide_window(self):
         """Oculta la ventana principal."""
+        self.core.ui_visible = False
         self.root.withdraw()
 
     def toggle_tracking(self, icon=None):
-        """Alterna el estado del tracking."""
-        if self.tracking:
-            self.stop_tracking()
-        else:
-            self.start_tracking()
-        
-        # Actualizar la interfaz
-        if self.tracking:
+        """Alterna el estado del tracking. Se puede llamar desde el hilo del tray."""
+        self.core.toggle_tracking()
+
+        # Los widgets solo se tocan desde el hilo de Tk
+        self.root.after(0, self.refresh_tracking_controls)
+
+    def toggle_profiling(self, icon=None):
+        """Enciende o apaga cProfile en el hilo de muestreo. Se puede llamar desde el hilo del tray."""
+        self.core.set_profiling(not self.core.is_profiling())
+
+    def on_tray_diagnostics(self, icon=None):
+        self.root.after(0, self.open_diagnostics)
+
+    def on_tray_export(self, icon=None):
+        self.root.after(0, self.open_export)
+
+    def start_tracking(self):
+        self.core.start_sampler()
+        self.refresh_tracking_controls()
+
+    def stop_tracking(self):
+        self.core.stop_sampler()
+        self.refresh_tracking_controls()
+
+    def refresh_tracking_controls(self):
+        """Actualiza los botones y la etiqueta de estado según el tracking."""
+        if not self.gui_built:
+            return
+        if self.core.tracking:
             self.start_button.config(state=tk.DISABLED)
             self.stop_button.config(state=tk.NORMAL)
             self.status_label.config(text="Estado: Rastreando...")
@@ -106,55 +3770,10 @@ class AppUsageTracker:
             self.start_button.config(state=tk.NORMAL)
             self.stop_button.config(state=tk.DISABLED)
             self.status_label.config(text="Estado: Detenido")
-        
-    def load_config(self):
-        """Carga la configuración de aplicaciones."""
-        if self.config_file.exists():
-            try:
-                with open(self.config_file, 'r') as f:
-                    config = json.load(f)
-                    self.app_aliases = config.get('aliases', {})
-                    self.tracked_apps = set(config.get('tracked_apps', []))
-                    self.removed_apps = set(config.get('removed_apps', []))
-                    self.highlighted_apps = set(config.get('highlighted_apps', []))  # Cargar apps destacadas
-            except json.JSONDecodeError:
-                self.app_aliases = {}
-                self.tracked_apps = set()
-                self.removed_apps = set()
-                self.highlighted_apps = set()
-        else:
-            self.app_aliases = {}
-            self.tracked_apps = set()
-            self.removed_apps = set()
-            self.highlighted_apps = set()
-
-    def save_config(self):
-        """Guarda la configuración de aplicaciones."""
-        config = {
-            'aliases': self.app_aliases,
-            'tracked_apps': list(self.tracked_apps),
-            'removed_apps': list(self.removed_apps),
-            'highlighted_apps': list(self.highlighted_apps)  # Guardar apps destacadas
-        }
-        with open(self.config_file, 'w') as f:
-            json.dump(config, f, indent=4)
-
-    def load_existing_data(self):
-        if self.data_file.exists():
-            try:
-                with open(self.data_file, 'r') as f:
-                    self.usage_data = json.load(f)
-            except json.JSONDecodeError:
-                messagebox.showerror("Error", "Error al cargar datos existentes. Iniciando con datos vacíos.")
-                self.usage_data = {}
-
-    def save_data(self):
-        with open(self.data_file, 'w') as f:
-            json.dump(self.usage_data, f, indent=4)
 
     def get_display_name(self, process_name):
         """Obtiene el nombre personalizado de la aplicación si existe."""
-        return self.app_aliases.get(process_name, process_name)
+        return self.core.get_display_name(process_name)
 
     def rename_app(self):
         """Permite renombrar una aplicación seleccionada."""
@@ -163,44 +3782,42 @@ class AppUsageTracker:
             messagebox.showwarning("Aviso", "Por favor, selecciona una aplicación para renombrar.")
             return
 
-        item = self.tree.item(selection[0])
-        process_name = item['values'][0]
-        
-        # Obtener el nombre original (sin alias)
-        original_name = next((k for k, v in self.app_aliases.items() if v == process_name), process_name)
-        
+        # Las filas se identifican por el proceso canónico de la app
+        process_name = selection[0]
+
         new_name = simpledialog.askstring(
             "Renombrar Aplicación",
-            f"Nuevo nombre para {process_name}:",
-            initialvalue=self.get_display_name(original_name)
+            f"Nuevo nombre para {self.get_display_name(process_name)}:",
+            initialvalue=self.get_display_name(process_name)
         )
-        
-        if new_name:
-            self.app_aliases[original_name] = new_name
-            self.save_config()
-            self.update_tree()
 
-    def filter_apps(self, event, tree, active_processes):
-        """Filtra las aplicaciones basado en el texto de búsqueda."""
-        search_text = self.search_var.get().lower()
-        
-        # Limpiar el árbol
-        for item in tree.get_children():
-            tree.delete(item)
-        
-        # Filtrar y mostrar las aplicaciones que coinciden
-        for proc in sorted(active_processes):
-            if proc not in self.tracked_apps and search_text in proc.lower():
-                tree.insert("", tk.END, values=(proc,))
+        if new_name is None:
+            return
+        # Un nombre vacío quita el nombre personalizado
+        new_name = new_name.strip()
+        try:
+            self.core.rename_app(process_name, new_name)
+        except AliasConflict as e:
+            if not messagebox.askyesno(
+                "Nombre en uso",
+                f"{e.owner} ya se muestra como {new_name}. ¿Agrupar ambas aplicaciones bajo ese nombre?"
+            ):
+                return
+            self.core.rename_app(process_name, new_name, group=True)
+        self.update_tree()
 
     def add_app(self):
-        """Añade una aplicación a la lista de rastreo."""
-        active_processes = set()
-        for proc in psutil.process_iter(['name']):
-            try:
-                active_processes.add(proc.info['name'])
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                continue
+        """Añade una aplicación a la lista de rastreo.
+
+        Los procesos se recorren en un hilo aparte y llegan a la lista por tandas,
+        junto con las apps del historial que no se rastrean. La búsqueda usa un
+        AppNameIndex, espera una pausa en el tipeo y solo toca las filas que cambian.
+        """
+        running, history = "En ejecución", "Historial"
+        tracked_apps = self.core.config_state()['tracked_apps']
+        index = AppNameIndex()
+        origins = {}  # nombre -> origen que se muestra
+        state = {'closed': False, 'pending': None, 'scanning': True}
 
         # Crear una ventana de selección
         dialog = tk.Toplevel(self.root)
@@ -214,45 +3831,107 @@ class AppUsageTracker:
         search_label = ttk.Label(search_frame, text="Buscar:")
         search_label.pack(side=tk.LEFT, padx=5)
 
-        self.search_var = tk.StringVar()
-        search_entry = ttk.Entry(search_frame, textvariable=self.search_var)
+        search_var = tk.StringVar()
+        search_entry = ttk.Entry(search_frame, textvariable=search_var)
         search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        search_entry.focus_set()
 
         label = ttk.Label(dialog, text="Selecciona las aplicaciones a rastrear:")
         label.pack(pady=5)
 
         # Crear un Treeview para mostrar las aplicaciones
-        tree = ttk.Treeview(dialog, columns=("Aplicación",), show="headings")
+        columns = ("Aplicación", "Origen")
+        tree = ttk.Treeview(dialog, columns=columns, show="headings")
         tree.heading("Aplicación", text="Aplicación")
+        tree.heading("Origen", text="Origen")
+        tree.column("Origen", width=100, stretch=False)
         tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        rows = TreeRowModel(tree, columns)
 
         # Agregar scrollbar
         scrollbar = ttk.Scrollbar(dialog, orient=tk.VERTICAL, command=tree.yview)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         tree.configure(yscrollcommand=scrollbar.set)
 
-        # Llenar el Treeview inicialmente con todas las aplicaciones no rastreadas
-        for proc in sorted(active_processes):
-            if proc not in self.tracked_apps:
-                tree.insert("", tk.END, values=(proc,))
+        status = ttk.Label(dialog, text="Buscando aplicaciones...")
+        status.pack()
 
-        # Vincular el evento de cambio en el campo de búsqueda
-        search_entry.bind('<KeyRelease>', lambda e: self.filter_apps(e, tree, active_processes))
+        def refresh():
+            state['pending'] = None
+            names = sorted(index.search(search_var.get()), key=str.lower)
+            rows.sync([(name, (name, origins[name]), ()) for name in names])
+            suffix = " (buscando...)" if state['scanning'] else ""
+            status.config(text=f"{len(names)} de {len(index)} aplicaciones{suffix}")
 
-        def add_selected():
-            selected = tree.selection()
-            for item in selected:
-                proc_name = tree.item(item)['values'][0]
-                self.tracked_apps.add(proc_name)
-            self.save_config()
+        def schedule_refresh(event=None, delay=150):
+            # Con cada tecla se posterga la búsqueda hasta que el tipeo se detiene
+            if state['closed']:
+                return
+            if state['pending'] is not None:
+                dialog.after_cancel(state['pending'])
+            state['pending'] = dialog.after(delay, refresh)
+
+        def add_names(names, origin, done=False):
+            # Se ejecuta en el hilo de Tk con cada tanda que envía el hilo de búsqueda
+            if state['closed']:
+                return
+            added = []
+            changed = False
+            for name in names:
+                if not name or name in tracked_apps or origins.get(name) in (origin, running):
+                    continue
+                if name not in origins:
+                    added.append(name)
+                # Una app del historial que también está en ejecución se muestra como tal
+                origins[name] = origin
+                changed = True
+            index.add(added)
+            if done:
+                state['scanning'] = False
+            if changed or done:
+                schedule_refresh(delay=50)
+
+        def scan():
+            import psutil
+
+            try:
+                known = self.core.known_apps()
+            except OSError:
+                known = set()
+            self.root.after(0, lambda: add_names(known, history))
+            batch = []
+            last_sent = time.monotonic()
+            for proc in psutil.process_iter(['name']):
+                if state['closed']:
+                    return
+                batch.append(proc.info['name'])
+                if len(batch) >= 200 or time.monotonic() - last_sent > 0.05:
+                    self.root.after(0, lambda names=batch: add_names(names, running))
+                    batch = []
+                    last_sent = time.monotonic()
+            self.root.after(0, lambda: add_names(batch, running, done=True))
+
+        def close():
+            state['closed'] = True
+            if state['pending'] is not None:
+                dialog.after_cancel(state['pending'])
             dialog.destroy()
+
+        search_entry.bind('<KeyRelease>', schedule_refresh)
+        dialog.protocol("WM_DELETE_WINDOW", close)
+        threading.Thread(target=scan, name="process-scan", daemon=True).start()
+
+        def add_selected():
+            # Las filas se identifican por el nombre de la aplicación
+            self.core.add_apps(tree.selection())
+            close()
             self.update_tree()
 
         button_frame = ttk.Frame(dialog)
         button_frame.pack(fill=tk.X, pady=5)
 
         ttk.Button(button_frame, text="Agregar Seleccionadas", command=add_selected).pack(side=tk.LEFT, padx=5)
-        ttk.Button(button_frame, text="Cancelar", command=dialog.destroy).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Cancelar", command=close).pack(side=tk.LEFT, padx=5)
 
     def remove_app(self):
         """Elimina una aplicación de la lista de rastreo y la agrega a la lista de apps eliminadas."""
@@ -261,29 +3940,25 @@ class AppUsageTracker:
             messagebox.showwarning("Aviso", "Por favor, selecciona una aplicación para eliminar.")
             return
 
-        item = self.tree.item(selection[0])
-        process_name = item['values'][0]
-        
-        # Obtener el nombre original
-        original_name = next((k for k, v in self.app_aliases.items() if v == process_name), process_name)
-        
-        if messagebox.askyesno("Confirmar", f"¿Estás seguro de querer dejar de rastrear {process_name}?"):
-            self.tracked_apps.discard(original_name)
-            self.removed_apps.add(original_name)  # Agregar a la lista de apps eliminadas
-            if original_name in self.app_aliases:
-                del self.app_aliases[original_name]
-            self.save_config()
+        process_name = selection[0]
+
+        members = self._alias_registry.members(process_name)
+        group_note = f" (agrupa {len(members)} procesos)" if len(members) > 1 else ""
+        if messagebox.askyesno("Confirmar", f"¿Estás seguro de querer dejar de rastrear {self.get_display_name(process_name)}{group_note}?"):
+            self.core.remove_app(process_name)
             self.update_tree()
-            
+
+    def on_tray_quit(self, icon=None):
+        """Opción Salir del tray: el cierre se hace en el hilo de Tk."""
+        self.root.after(0, self.quit_app)
+
     def quit_app(self, icon=None):
         """Cierra completamente la aplicación."""
-        if self.tracking:
-            self.stop_tracking()
-        self.save_data()
+        self.core.shutdown()
         if hasattr(self, 'tray_icon'):
             self.tray_icon.stop()
-        self.root.quit()  
-            
+        self.root.quit()
+
     def toggle_highlight(self):
         """Alterna el estado destacado de una aplicación."""
         selection = self.tree.selection()
@@ -291,30 +3966,25 @@ class AppUsageTracker:
             messagebox.showwarning("Aviso", "Por favor, selecciona una aplicación para destacar.")
             return
 
-        item = self.tree.item(selection[0])
-        process_name = item['values'][0]
-        
-        # Obtener el nombre original
-        original_name = next((k for k, v in self.app_aliases.items() if v == process_name), process_name)
-        
-        if original_name in self.highlighted_apps:
-            self.highlighted_apps.remove(original_name)
-        else:
-            self.highlighted_apps.add(original_name)
-            
-        self.save_config()
+        self.core.toggle_highlight(selection[0])
         self.update_tree()
-            
+
     def create_gui(self):
+        """Crea la ventana raíz de Tk; los widgets se arman en build_main_window."""
         self.root = tk.Tk()
         self.root.title("Rastreador de Uso de Aplicaciones")
         self.root.geometry("1000x600")
 
-        # Configurar el system tray
-        self.create_system_tray()
-        
         # Cambiar el comportamiento al cerrar la ventana
         self.root.protocol("WM_DELETE_WINDOW", self.hide_window)
+        # Tk traduce WM_QUERYENDSESSION de Windows a este protocolo
+        self.root.protocol("WM_SAVE_YOURSELF", self.core.on_session_end)
+
+    def build_main_window(self):
+        """Arma los widgets de la ventana principal, solo la primera vez que se llama."""
+        if self.gui_built:
+            return
+        self.gui_built = True
 
         style = ttk.Style()
         style.theme_use('clam')
@@ -336,6 +4006,14 @@ class AppUsageTracker:
         self.stop_button = ttk.Button(control_frame, text="Detener", command=self.stop_tracking, state=tk.DISABLED)
         self.stop_button.pack(side=tk.LEFT, padx=5)
 
+        # Modo de conteo: ambos tiempos se registran siempre, el modo elige cuál se muestra
+        ttk.Label(control_frame, text="Modo:").pack(side=tk.LEFT, padx=(20, 5))
+        self.mode_var = tk.StringVar(value=self.core.TRACKING_MODES[self.core.tracking_mode])
+        mode_box = ttk.Combobox(control_frame, textvariable=self.mode_var, state="readonly", width=14,
+                                values=list(self.core.TRACKING_MODES.values()))
+        mode_box.pack(side=tk.LEFT)
+        mode_box.bind("<<ComboboxSelected>>", self.on_mode_selected)
+
         # Frame para los botones de gestión de aplicaciones
         app_control_frame = ttk.Frame(main_frame)
         app_control_frame.pack(fill=tk.X, pady=5)
@@ -344,6 +4022,9 @@ class AppUsageTracker:
         ttk.Button(app_control_frame, text="Eliminar Aplicación", command=self.remove_app).pack(side=tk.LEFT, padx=5)
         ttk.Button(app_control_frame, text="Renombrar Aplicación", command=self.rename_app).pack(side=tk.LEFT, padx=5)
         ttk.Button(app_control_frame, text="Destacar Aplicación", command=self.toggle_highlight).pack(side=tk.LEFT, padx=5)
+        ttk.Button(app_control_frame, text="Reportes", command=self.open_reports).pack(side=tk.LEFT, padx=5)
+        ttk.Button(app_control_frame, text="Exportar", command=self.open_export).pack(side=tk.LEFT, padx=5)
+        ttk.Button(app_control_frame, text="Diagnóstico", command=self.open_diagnostics).pack(side=tk.LEFT, padx=5)
 
         # Frame para selección de fecha
         date_frame = ttk.Frame(main_frame)
@@ -363,7 +4044,10 @@ class AppUsageTracker:
         self.tree.column("Aplicación", width=200)
         self.tree.column("Tiempo de uso", width=150)
         self.tree.column("Ventanas activas", width=500)
+        self.tree.tag_configure('highlighted', background='light yellow')
         self.tree.pack(fill=tk.BOTH, expand=True, pady=10)
+        self.row_model = TreeRowModel(self.tree, ("Aplicación", "Tiempo de uso", "Ventanas activas"))
+        self.tree.bind("<Double-1>", self.show_title_breakdown)
 
         scrollbar = ttk.Scrollbar(main_frame, orient=tk.VERTICAL, command=self.tree.yview)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
@@ -371,6 +4055,272 @@ class AppUsageTracker:
 
         self.status_label = ttk.Label(main_frame, text="Estado: Detenido")
         self.status_label.pack(pady=5)
+        self.refresh_tracking_controls()
+        self.update_tree()
+
+    def on_mode_selected(self, event=None):
+        labels = {label: mode for mode, label in self.core.TRACKING_MODES.items()}
+        self.core.set_tracking_mode(labels[self.mode_var.get()])
+
+    def report_period(self, period):
+        """Devuelve (inicio, fin) de un período predefinido del diálogo de reportes."""
+        today = datetime.now().date()
+        if period == "Esta semana":
+            return today - timedelta(days=today.weekday()), today
+        if period == "Semana pasada":
+            start = today - timedelta(days=today.weekday() + 7)
+            return start, start + timedelta(days=6)
+        if period == "Este mes":
+            return today.replace(day=1), today
+        if period == "Mes pasado":
+            end = today.replace(day=1) - timedelta(days=1)
+            return end.replace(day=1), end
+        if period == "Este año":
+            return today.replace(month=1, day=1), today
+        return today - timedelta(days=29), today
+
+    def open_reports(self):
+        """Abre la vista de reportes por rango de fechas."""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Reportes")
+        dialog.geometry("600x500")
+
+        controls = ttk.Frame(dialog)
+        controls.pack(fill=tk.X, padx=5, pady=5)
+
+        period_var = tk.StringVar(value="Esta semana")
+        periods = ["Esta semana", "Semana pasada", "Este mes", "Mes pasado", "Últimos 30 días", "Este año"]
+        period_box = ttk.Combobox(controls, textvariable=period_var, values=periods, state="readonly", width=16)
+        period_box.pack(side=tk.LEFT, padx=5)
+
+        start_var = tk.StringVar()
+        end_var = tk.StringVar()
+        ttk.Label(controls, text="Desde:").pack(side=tk.LEFT)
+        ttk.Entry(controls, textvariable=start_var, width=11).pack(side=tk.LEFT, padx=2)
+        ttk.Label(controls, text="Hasta:").pack(side=tk.LEFT)
+        ttk.Entry(controls, textvariable=end_var, width=11).pack(side=tk.LEFT, padx=2)
+
+        options = ttk.Frame(dialog)
+        options.pack(fill=tk.X, padx=5)
+        top_var = tk.IntVar(value=0)
+        ttk.Label(options, text="Top (0 = todas):").pack(side=tk.LEFT, padx=5)
+        ttk.Spinbox(options, from_=0, to=1000, textvariable=top_var, width=5).pack(side=tk.LEFT)
+        group_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(options, text="Agrupar por alias", variable=group_var).pack(side=tk.LEFT, padx=10)
+
+        tree = ttk.Treeview(dialog, columns=("Aplicación", "Tiempo de uso", "Porcentaje"), show="headings")
+        for column in ("Aplicación", "Tiempo de uso", "Porcentaje"):
+            tree.heading(column, text=column)
+        tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        total_label = ttk.Label(dialog, text="")
+        total_label.pack(pady=5)
+
+        def fill_period(event=None):
+            start, end = self.report_period(period_var.get())
+            start_var.set(start.isoformat())
+            end_var.set(end.isoformat())
+            refresh()
+
+        def refresh():
+            try:
+                start = datetime.strptime(start_var.get(), "%Y-%m-%d").date()
+                end = datetime.strptime(end_var.get(), "%Y-%m-%d").date()
+                top_n = top_var.get()
+            except (ValueError, tk.TclError):
+                messagebox.showwarning("Aviso", "Las fechas deben tener el formato AAAA-MM-DD.", parent=dialog)
+                return
+            report = self.core.report_totals(start, end, group_var.get(), top_n)
+            total = sum(seconds for _, seconds in report)
+            tree.delete(*tree.get_children())
+            for name, seconds in report:
+                name = name if group_var.get() else self.get_display_name(name)
+                share = f"{seconds * 100 / total:.1f}%" if total else "0%"
+                tree.insert("", tk.END, values=(name, self.format_time(seconds), share))
+            total_label.config(text=f"Total: {self.format_time(total)}")
+
+        period_box.bind("<<ComboboxSelected>>", fill_period)
+        ttk.Button(options, text="Actualizar", command=refresh).pack(side=tk.LEFT, padx=5)
+        fill_period()
+
+    def open_export(self):
+        """Diálogo de exportación; el archivo se escribe en un hilo aparte."""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Exportar uso")
+        dialog.resizable(False, False)
+
+        form = ttk.Frame(dialog, padding=10)
+        form.pack(fill=tk.BOTH, expand=True)
+        format_var = tk.StringVar(value='csv')
+        ttk.Label(form, text="Formato:").grid(row=0, column=0, sticky=tk.W, pady=2)
+        ttk.Combobox(form, textvariable=format_var, values=sorted(UsageExporter.FORMATS),
+                     state="readonly", width=12).grid(row=0, column=1, sticky=tk.W)
+
+        start, end = self.report_period("Este mes")
+        start_var = tk.StringVar(value=start.isoformat())
+        end_var = tk.StringVar(value=end.isoformat())
+        ttk.Label(form, text="Desde:").grid(row=1, column=0, sticky=tk.W, pady=2)
+        start_entry = ttk.Entry(form, textvariable=start_var, width=12)
+        start_entry.grid(row=1, column=1, sticky=tk.W)
+        ttk.Label(form, text="Hasta:").grid(row=2, column=0, sticky=tk.W, pady=2)
+        end_entry = ttk.Entry(form, textvariable=end_var, width=12)
+        end_entry.grid(row=2, column=1, sticky=tk.W)
+
+        incremental_var = tk.BooleanVar(value=False)
+        target_var = tk.StringVar(value="dashboard")
+        target_entry = ttk.Entry(form, textvariable=target_var, width=16, state=tk.DISABLED)
+
+        def toggle_incremental():
+            incremental = incremental_var.get()
+            target_entry.config(state=tk.NORMAL if incremental else tk.DISABLED)
+            for entry in (start_entry, end_entry):
+                entry.config(state=tk.DISABLED if incremental else tk.NORMAL)
+
+        ttk.Checkbutton(form, text="Solo lo nuevo desde la última exportación a:", variable=incremental_var,
+                        command=toggle_incremental).grid(row=3, column=0, columnspan=2, sticky=tk.W, pady=(8, 2))
+        target_entry.grid(row=4, column=1, sticky=tk.W)
+        status_label = ttk.Label(form, text="")
+        status_label.grid(row=5, column=0, columnspan=2, sticky=tk.W, pady=5)
+
+        def finished(result):
+            if not dialog.winfo_exists():
+                return
+            if isinstance(result, Exception):
+                status_label.config(text="")
+                messagebox.showerror("Error", f"No se pudo exportar: {result}", parent=dialog)
+                return
+            first, last, written = result
+            if first > last:
+                status_label.config(text="No había días nuevos para exportar.")
+            else:
+                status_label.config(text=f"Exportado {first} a {last} ({written / 1024:.0f} KiB).")
+
+        def export():
+            from tkinter import filedialog
+
+            incremental = target_var.get().strip() if incremental_var.get() else None
+            try:
+                first = None if incremental else datetime.strptime(start_var.get(), "%Y-%m-%d").date()
+                last = None if incremental else datetime.strptime(end_var.get(), "%Y-%m-%d").date()
+            except ValueError:
+                messagebox.showwarning("Aviso", "Las fechas deben tener el formato AAAA-MM-DD.", parent=dialog)
+                return
+            fmt = format_var.get()
+            path = filedialog.asksaveasfilename(
+                parent=dialog, defaultextension=UsageExporter.FORMATS[fmt][1],
+                initialfile=f"uso-{datetime.now():%Y%m%d}{UsageExporter.FORMATS[fmt][1]}"
+            )
+            if not path:
+                return
+            status_label.config(text="Exportando...")
+
+            def run():
+                try:
+                    with open(path, 'wb') as out:
+                        result = self.core.export_usage(out, fmt, first, last, incremental)
+                except (OSError, ValueError) as e:
+                    result = e
+                self.root.after(0, lambda: finished(result))
+
+            threading.Thread(target=run, name="export", daemon=True).start()
+
+        buttons = ttk.Frame(form)
+        buttons.grid(row=6, column=0, columnspan=2, pady=(5, 0))
+        ttk.Button(buttons, text="Exportar...", command=export).pack(side=tk.LEFT, padx=5)
+        ttk.Button(buttons, text="Cerrar", command=dialog.destroy).pack(side=tk.LEFT, padx=5)
+
+    def open_diagnostics(self):
+        """Panel con las métricas del muestreo; se actualiza cada segundo y se puede exportar como JSON."""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Diagnóstico")
+        dialog.geometry("700x450")
+
+        summary_label = ttk.Label(dialog, text="", justify=tk.LEFT)
+        summary_label.pack(fill=tk.X, padx=5, pady=5)
+
+        columns = ("Fase", "Muestras", "p50", "p95", "p99", "Máximo")
+        tree = ttk.Treeview(dialog, columns=columns, show="headings")
+        for column in columns:
+            tree.heading(column, text=column)
+            tree.column(column, width=100)
+        tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        rows = TreeRowModel(tree, columns)
+
+        profile_label = ttk.Label(dialog, text="")
+        profile_label.pack(fill=tk.X, padx=5)
+
+        def export():
+            from tkinter import filedialog
+
+            path = filedialog.asksaveasfilename(
+                parent=dialog, defaultextension=".json", filetypes=[("JSON", "*.json")],
+                initialfile=f"diagnostico-{datetime.now():%Y%m%d-%H%M%S}.json"
+            )
+            if path:
+                atomic_write_json(path, self.core.diagnostics(), indent=2)
+
+        def refresh():
+            if not dialog.winfo_exists():
+                return
+            data = self.core.diagnostics()
+            sampler = data['sampler']
+            cache = data['process_cache']
+            persistence = data['persistence']
+            windows = sampler['windows']
+            summary_label.config(text=(
+                f"Vueltas: {sampler['loops']}   Ticks: {sampler['ticks']}   "
+                f"Ticks de más de {sampler['overrun_threshold_s']:g} s: {sampler['overruns']}\n"
+                f"Ventanas por vuelta: {windows['last']} (media {windows['mean']:.1f}, máx. {windows['max']})   "
+                f"Caché de procesos: {cache['hits']} aciertos, {cache['misses']} fallos\n"
+                f"Escrito a disco: {persistence['bytes_written'] / 1024:.1f} KiB   "
+                f"Pendiente: {persistence['pending_bytes']} bytes"
+            ))
+            histograms = list(sampler['phases'].items())
+            histograms.append(("retraso del tick", sampler['wake_lag']))
+            histograms.append(("consulta de procesos", cache['lookup']))
+            histograms += [(f"escritura {name}", target['latency']) for name, target in persistence['targets'].items()]
+            rows.sync([
+                (name, (name, h['count'], f"{h['p50_ms']:.3f} ms", f"{h['p95_ms']:.3f} ms",
+                        f"{h['p99_ms']:.3f} ms", f"{h['max_ms']:.3f} ms"), ())
+                for name, h in histograms
+            ])
+            profiler = data['profiler']
+            if profiler['error']:
+                profile_text = f"Perfilado: no disponible ({profiler['error']})"
+            elif profiler['enabled']:
+                profile_text = "Perfilado: activo"
+            else:
+                profile_text = "Perfilado: apagado"
+            if profiler['last_profile']:
+                profile_text += f"   Último perfil: {profiler['last_profile']}"
+            profile_label.config(text=profile_text)
+            profile_var.set(profiler['enabled'])
+            dialog.after(1000, refresh)
+
+        buttons = ttk.Frame(dialog)
+        buttons.pack(fill=tk.X, padx=5, pady=5)
+        profile_var = tk.BooleanVar(value=self.core.is_profiling())
+        ttk.Checkbutton(buttons, text="Perfilar el muestreo (cProfile)", variable=profile_var,
+                        command=lambda: self.core.set_profiling(profile_var.get())).pack(side=tk.LEFT, padx=5)
+        ttk.Button(buttons, text="Exportar JSON...", command=export).pack(side=tk.RIGHT, padx=5)
+        refresh()
+
+    def show_title_breakdown(self, event=None):
+        """Muestra el tiempo por título de ventana de la app seleccionada."""
+        selection = self.tree.selection()
+        if not selection:
+            return
+        process_name = selection[0]
+        dialog = tk.Toplevel(self.root)
+        dialog.title(f"{self.get_display_name(process_name)} - {self.current_date}")
+        dialog.geometry("600x400")
+
+        tree = ttk.Treeview(dialog, columns=("Ventana", "Tiempo de uso"), show="headings")
+        tree.heading("Ventana", text="Ventana")
+        tree.heading("Tiempo de uso", text="Tiempo de uso")
+        tree.column("Ventana", width=450)
+        tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        for title, seconds in self.core.title_breakdown(self.current_date, process_name):
+            tree.insert("", tk.END, values=(title, self.format_time(seconds)))
 
     def format_time(self, seconds):
         """Formato de tiempo que incluye segundos."""
@@ -393,168 +4343,76 @@ class AppUsageTracker:
         self.date_label.config(text=self.current_date)
         self.update_tree()
 
-    def update_tree(self):
-        """Actualización del árbol manteniendo las selecciones y mostrando apps destacadas primero."""
-        # Guardar las selecciones actuales
-        selected = self.tree.selection()
-        selected_values = [self.tree.item(item)['values'][0] for item in selected]
-
-        # Limpiar el árbol
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        if self.current_date in self.usage_data:
-            filtered_apps = {
-                k: v for k, v in self.usage_data[self.current_date].items()
-                if k in self.tracked_apps
-            }
-            
-            # Separar apps destacadas y no destacadas
-            highlighted = []
-            normal = []
-            
-            for proc_name, data in filtered_apps.items():
-                display_name = self.get_display_name(proc_name)
-                current_windows = self.active_windows.get(proc_name, set()) if self.current_date == datetime.now().strftime("%Y-%m-%d") else set()
-                windows_str = " | ".join(current_windows) if current_windows else "No hay ventanas activas"
-                
-                app_data = (proc_name, display_name, data['time'], windows_str)
-                if proc_name in self.highlighted_apps:
-                    highlighted.append(app_data)
-                else:
-                    normal.append(app_data)
-            
-            # Ordenar cada lista por tiempo de uso
-            highlighted.sort(key=lambda x: x[2], reverse=True)
-            normal.sort(key=lambda x: x[2], reverse=True)
-            
-            # Insertar primero las apps destacadas
-            for proc_name, display_name, time_used, windows_str in highlighted:
-                item = self.tree.insert("", tk.END, values=(
-                    display_name,
-                    self.format_time(time_used),
-                    windows_str
-                ))
-                self.tree.tag_configure('highlighted', background='light yellow')
-                self.tree.item(item, tags=('highlighted',))
-                
-                if display_name in selected_values:
-                    self.tree.selection_add(item)
-            
-            # Luego insertar las apps normales
-            for proc_name, display_name, time_used, windows_str in normal:
-                item = self.tree.insert("", tk.END, values=(
-                    display_name,
-                    self.format_time(time_used),
-                    windows_str
-                ))
-                
-                if display_name in selected_values:
-                    self.tree.selection_add(item)
-
-
-    def get_process_name(self, hwnd):
-        try:
-            _, pid = win32process.GetWindowThreadProcessId(hwnd)
-            process = psutil.Process(pid)
-            return process.name()
-        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-            return None
+    def build_rows(self):
+        """Arma las filas del día actual: destacadas primero, luego por tiempo de uso."""
+        snapshot = self.core.snapshot
+        if snapshot.date == self.current_date:
+            totals = snapshot.totals
+            active_windows = snapshot.active_windows
+        else:
+            # Los días distintos de hoy se cargan bajo demanda desde su snapshot
+            totals = self.core.day_totals(self.current_date)
+            active_windows = {}
+        config = self.core.config_state()
+        tracked_apps = config['tracked_apps']
+        highlighted_apps = config['highlighted_apps']
+        if config['aliases'] != self._alias_config:
+            self._alias_config = config['aliases']
+            self._alias_registry = AliasRegistry(config['aliases'])
+        aliases = self._alias_registry
 
-    def get_window_title(self, hwnd):
-        return win32gui.GetWindowText(hwnd)
+        # Una fila por app lógica: los procesos de un grupo suman su tiempo
+        apps = {}
+        for proc_name, ms in totals.items():
+            if proc_name not in tracked_apps:
+                continue
+            app_id = aliases.canonical(proc_name)
+            app = apps.get(app_id)
+            if app is None:
+                app = apps[app_id] = [False, 0, set()]
+            app[0] = app[0] or proc_name in highlighted_apps
+            app[1] += ms
+            app[2].update(active_windows.get(proc_name, ()))
 
-    def is_valid_window(self, hwnd):
-        if not win32gui.IsWindowVisible(hwnd):
-            return False
-        
-        title = self.get_window_title(hwnd)
-        if not title:
-            return False
-            
-        process_name = self.get_process_name(hwnd)
-        if not process_name:
-            return False
-            
-        # Modificar esta condición para incluir todas las ventanas excepto las de apps eliminadas
-        if process_name in self.removed_apps:
-            return False
-            
-        rect = win32gui.GetWindowRect(hwnd)
-        width = rect[2] - rect[0]
-        height = rect[3] - rect[1]
-        if width < 100 or height < 100:
-            return False
-            
-        return True
+        rows = []
+        for app_id, (highlighted, ms, current_windows) in apps.items():
+            windows_str = " | ".join(sorted(current_windows)) if current_windows else "No hay ventanas activas"
+            rows.append((highlighted, ms // 1000, app_id, windows_str))
 
-    def enum_windows_callback(self, hwnd, active_apps):
-        if self.is_valid_window(hwnd):
-            process_name = self.get_process_name(hwnd)
-            window_title = self.get_window_title(hwnd)
-            if process_name and window_title:
-                if process_name not in active_apps:
-                    active_apps[process_name] = set()
-                active_apps[process_name].add(window_title)
+        # Apps destacadas primero y cada grupo ordenado por tiempo de uso
+        rows.sort(key=lambda row: (row[0], row[1]), reverse=True)
+        return [
+            (app_id,
+             (aliases.display_name(app_id), self.format_time(seconds), windows_str),
+             ('highlighted',) if highlighted else ())
+            for highlighted, seconds, app_id, windows_str in rows
+        ]
 
-    def get_active_windows(self):
-        active_apps = {}
-        win32gui.EnumWindows(self.enum_windows_callback, active_apps)
-        return active_apps
+    def update_tree(self):
+        """Actualiza solo las filas que cambiaron; la selección se conserva por id de fila."""
+        self.row_model.sync(self.build_rows())
 
-    def track_usage(self):
-        """Versión modificada del tracking que evita el bloqueo de la interfaz."""
-        last_update = time.time()
-        
-        while self.tracking:
-            current_time = time.time()
-            
-            # Actualizar solo si ha pasado 1 segundo
-            if current_time - last_update >= 1:
-                current_date = datetime.now().strftime("%Y-%m-%d")
-                if current_date not in self.usage_data:
-                    self.usage_data[current_date] = {}
-
-                # Obtener ventanas activas
-                active_windows = self.get_active_windows()
-                self.active_windows = active_windows
-                
-                # Agregar automáticamente las nuevas aplicaciones activas
-                for proc_name in active_windows:
-                    if proc_name not in self.tracked_apps and proc_name not in self.removed_apps:
-                        self.tracked_apps.add(proc_name)
-                        self.save_config()
-                
-                # Actualizar tiempos de uso
-                for proc_name in active_windows:
-                    if proc_name not in self.usage_data[current_date]:
-                        self.usage_data[current_date][proc_name] = {
-                            'time': 0,
-                            'last_seen': time.time()
-                        }
-                    else:
-                        self.usage_data[current_date][proc_name]['time'] += 1
+    def request_ui_update(self):
+        """Pide un update_tree sin tocar Tk; se puede llamar desde cualquier hilo.
 
-                self.save_data()
-                self.root.after(0, self.update_tree)
-                last_update = current_time
-            
-            # Pequeña pausa para no sobrecargar el CPU
-            time.sleep(0.1)
-            
-            
-    def start_tracking(self):
-        self.tracking = True
-        self.start_button.config(state=tk.DISABLED)
-        self.stop_button.config(state=tk.NORMAL)
-        self.status_label.config(text="Estado: Rastreando...")
-        threading.Thread(target=self.track_usage, daemon=True).start()
+        Los avisos no se acumulan: varios snapshots entre dos sondeos generan
+        una sola actualización.
+        """
+        try:
+            self._ui_updates.put_nowait(True)
+        except queue.Full:
+            pass
 
-    def stop_tracking(self):
-        self.tracking = False
-        self.start_button.config(state=tk.NORMAL)
-        self.stop_button.config(state=tk.DISABLED)
-        self.status_label.config(text="Estado: Detenido")
+    def poll_ui_updates(self):
+        """Aplica en el hilo de Tk los avisos de request_ui_update."""
+        try:
+            self._ui_updates.get_nowait()
+        except queue.Empty:
+            pass
+        else:
+            if self.gui_built:
+                self.update_tree()
+        self.root.after(self.UI_POLL_MS, self.poll_ui_updates)
 
     def on_closing(self):
         """Modificado para manejar el cierre de la aplicación."""
@@ -562,9 +4420,186 @@ class AppUsageTracker:
             self.quit_app()
         else:
             self.hide_window()
-def main():
-    tracker = AppUsageTracker()
+def parse_args(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Rastreador de uso de aplicaciones")
+    parser.add_argument('--daemon', action='store_true',
+                        help="solo muestreo, almacenamiento y API local, sin interfaz gráfica")
+    parser.add_argument('--port', type=int, default=None,
+                        help=f"puerto de la API local (por defecto api_port de la configuración, o {DEFAULT_API_PORT})")
+    parser.add_argument('--background', action='store_true',
+                        help="inicia con la ventana oculta, solo en el tray (lo usa el inicio automático)")
+    parser.add_argument('--simulate', action='store_true',
+                        help="usa ventanas simuladas en lugar de las de Windows (para pruebas)")
+    export = parser.add_argument_group("exportación")
+    export.add_argument('--export', choices=sorted(UsageExporter.FORMATS), metavar='FORMATO',
+                        help="exporta el uso y termina: " + ", ".join(sorted(UsageExporter.FORMATS)))
+    export.add_argument('--output', default='-', help="archivo de salida (por defecto la salida estándar)")
+    export.add_argument('--since', type=date_argument, help="primer día a exportar (AAAA-MM-DD)")
+    export.add_argument('--until', type=date_argument, help="último día a exportar (AAAA-MM-DD)")
+    export.add_argument('--incremental', metavar='DESTINO',
+                        help="solo los días completos posteriores a la última exportación a DESTINO")
+    trace = parser.add_argument_group("trazas")
+    trace.add_argument('--record-trace', metavar='TRAZA',
+                       help="graba lo que acredita el muestreo en TRAZA (NDJSON con gzip) para reproducirlo")
+    trace.add_argument('--replay', metavar='TRAZA',
+                       help="reproduce TRAZA sin esperar, compara el resultado con el grabado y termina")
+    trace.add_argument('--replay-dir', metavar='DIR',
+                       help="directorio de datos de la reproducción (por defecto uno temporal)")
+    return parser.parse_args(argv)
+
+def date_argument(value):
+    import argparse
+
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"fecha inválida: {value} (se espera AAAA-MM-DD)")
+
+def configured_api_port(config_file=Path('app_config.json')):
+    """Puerto de la API según la configuración, leído sin crear un TrackerCore."""
+    try:
+        with open(config_file, 'r') as f:
+            return int(json.load(f).get('api_port', DEFAULT_API_PORT))
+    except (OSError, ValueError, TypeError, AttributeError):
+        return DEFAULT_API_PORT
+
+def create_window_source(args):
+    """Con --simulate, una fuente simulada que cambia sola cada segundo; si no, None (Windows)."""
+    if not args.simulate:
+        return None
+    source = SimulatedWindowSource(windows=20, processes=8, churn=0.05)
+
+    def advance():
+        while True:
+            time.sleep(1)
+            source.advance()
+
+    threading.Thread(target=advance, name="simulation", daemon=True).start()
+    return source
+
+def daemon_main(args):
+    """Corre solo el muestreo y el almacenamiento, con la API local de consulta.
+
+    No importa tkinter ni pystray. Termina con Ctrl+C o SIGTERM escribiendo
+    todo lo pendiente.
+    """
+    import signal
+
+    core = TrackerCore(create_window_source(args))
+    core.trace_path = args.record_trace
+    for warning in core.config_warnings:
+        print(f"Aviso: {warning}", file=sys.stderr)
+    server = QueryServer(core, args.port if args.port is not None else configured_api_port())
+    try:
+        server.start()
+    except OSError as e:
+        core.shutdown()
+        sys.exit(f"No se pudo abrir la API en el puerto {server.port}: {e}")
+    print(f"Escuchando en http://127.0.0.1:{server.port}", flush=True)
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    core.start_sampler()
+    try:
+        # Esperas cortas para que Ctrl+C se atienda también en Windows
+        while not stop.wait(1.0):
+            pass
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        core.shutdown()
+
+def export_main(args):
+    """Exporta sin interfaz: a través del rastreador en ejecución si responde, si no leyendo los datos."""
+    port = args.port if args.port is not None else configured_api_port()
+    client = TrackerClient(port, timeout=30.0)
+    if client.ping():
+        core = client
+    else:
+        # Sin muestreo (la fuente de ventanas base no se consulta nunca) ni escrituras:
+        # puede haber una interfaz sin API escribiendo los mismos datos
+        core = TrackerCore(WindowSource(), read_only=True)
+    out = sys.stdout.buffer if args.output == '-' else open(args.output, 'wb')
+    try:
+        start, end, written = core.export_usage(out, args.export, args.since, args.until, args.incremental)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+        core.shutdown()
+    print(f"Exportado {start} a {end}: {written} bytes", file=sys.stderr)
+
+def replay_main(args):
+    """Reproduce una traza en un directorio de datos aparte; termina con código 1 si no coincide."""
+    import tempfile
+
+    trace = Path(args.replay).resolve()
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(args.replay_dir or tmp)
+        data_dir.mkdir(parents=True, exist_ok=True)
+        os.chdir(data_dir)
+        try:
+            # Sin muestreo: la fuente de ventanas base no se consulta nunca
+            core = TrackerCore(WindowSource())
+            try:
+                result = core.replay_trace(trace)
+            finally:
+                core.shutdown()
+        finally:
+            os.chdir(cwd)
+
+    simulated, elapsed = result['simulated'], result['elapsed']
+    print(f"{result['ticks']} ticks, {timedelta(seconds=round(simulated))} simulados en {elapsed:.2f} s"
+          f" ({simulated / max(elapsed, 1e-9):,.0f}x tiempo real)")
+    if result['matches'] is None:
+        print("La traza no se cerró: no hay resultado grabado con el que comparar")
+    elif result['matches']:
+        print("El uso reproducido coincide con el de la ejecución grabada")
+    else:
+        expected, actual = result['expected'], result['actual']
+        for date in sorted(set(expected) | set(actual)):
+            apps = expected.get(date, {})
+            replayed = actual.get(date, {})
+            for proc_name in sorted(set(apps) | set(replayed)):
+                if apps.get(proc_name) != replayed.get(proc_name):
+                    print(f"  {date} {proc_name}: grabado {apps.get(proc_name)}, reproducido {replayed.get(proc_name)}")
+        sys.exit("El uso reproducido no coincide con el de la ejecución grabada")
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.export:
+        return export_main(args)
+    if args.replay:
+        return replay_main(args)
+    if args.daemon:
+        return daemon_main(args)
+
+    # Si ya corre el demonio, la interfaz es solo un cliente de su API
+    port = args.port if args.port is not None else configured_api_port()
+    server = None
+    client = TrackerClient(port)
+    if client.ping():
+        core = client
+        if args.record_trace:
+            print("El muestreo corre en el demonio: --record-trace se pasa al iniciarlo", file=sys.stderr)
+    else:
+        core = TrackerCore(create_window_source(args))
+        core.trace_path = args.record_trace
+        core.start_sampler()
+        server = QueryServer(core, port)
+        try:
+            server.start()
+        except OSError:
+            # Otro programa usa el puerto: la interfaz funciona igual, sin API
+            server = None
+
+    tracker = AppUsageTracker(core=core, background=args.background)
     tracker.root.mainloop()
+    if server is not None:
+        server.stop()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
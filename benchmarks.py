@@ -0,0 +1,873 @@
+"""Benchmarks del rastreador de uso.
+
+Uso: python benchmarks.py [nombre ...]
+Sin argumentos ejecuta todos los benchmarks.
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from TimeTracker import (
+    UsageStore, SimulatedWindowSource, WindowSampler, ActiveWindowModel, SimulatedEventSource,
+    TreeRowModel, AppUsageTracker, ColumnarUsage, TrackerClient, AppNameIndex,
+    AliasRegistry, SamplerStats, SqliteUsageStore
+)
+import TimeTracker
+
+
+def synthetic_history(days, apps, per_day=40, seed=0):
+    """Genera un historial con el formato de usage_data: {fecha: {proceso: datos}}."""
+    rng = random.Random(seed)
+    names = [f"app{i:04d}.exe" for i in range(apps)]
+    start = datetime(2020, 1, 1)
+    history = {}
+    for offset in range(days):
+        date = (start + timedelta(days=offset)).strftime("%Y-%m-%d")
+        history[date] = {
+            name: {'ms': rng.randint(1, 8 * 3600) * 1000, 'last_seen': 0.0}
+            for name in rng.sample(names, min(apps, per_day))
+        }
+    return history
+
+
+def measure(func):
+    """Devuelve (segundos, pico de memoria en KiB) de ejecutar func()."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024
+
+
+def timed(func):
+    """Devuelve los segundos que tarda func(), sin la sobrecarga de tracemalloc."""
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def percentiles(samples):
+    """Devuelve (mediana, p95) de una lista de tiempos."""
+    ordered = sorted(samples)
+    return ordered[len(ordered) // 2], ordered[int(len(ordered) * 0.95)]
+
+
+def bench_storage_startup():
+    """Arranque del almacenamiento por día frente al JSON único, según años de historial."""
+    print("Arranque del almacenamiento (días de historial / JSON único / por día)")
+    for days in (30, 365, 3 * 365):
+        history = synthetic_history(days, apps=200)
+        today = max(history)
+        with tempfile.TemporaryDirectory() as tmp:
+            legacy_file = Path(tmp) / 'app_usage_data.json'
+            with open(legacy_file, 'w') as f:
+                json.dump(history, f, indent=4)
+
+            def load_legacy():
+                with open(legacy_file, 'r') as f:
+                    json.load(f)
+
+            legacy_time, legacy_mem = measure(load_legacy)
+
+            # La migración se hace una sola vez y no forma parte del arranque medido
+            UsageStore(Path(tmp) / 'data', legacy_file=legacy_file).load(today)
+            store_time, store_mem = measure(lambda: UsageStore(Path(tmp) / 'data').load(today))
+
+        print(f"  {days:5d} días  JSON: {legacy_time * 1000:8.1f} ms {legacy_mem:9.0f} KiB"
+              f"  por día: {store_time * 1000:6.1f} ms {store_mem:6.0f} KiB")
+
+
+def bench_sampling(ticks=200):
+    """Latencia del muestreo, asignaciones y costo completo del tick con ventanas simuladas."""
+    print("Muestreo por tick (ventanas / mediana / p95 / bloques asignados / tick completo / aciertos de caché PID)")
+    for windows in (10, 100, 1000):
+        source = SimulatedWindowSource(windows=windows, processes=max(2, windows // 5), churn=0.05)
+        sampler = WindowSampler(source, removed_apps=set())
+
+        samples = []
+        for _ in range(ticks):
+            source.advance()
+            start = time.perf_counter()
+            sampler.get_active_windows()
+            samples.append(time.perf_counter() - start)
+        median, p95 = percentiles(samples)
+
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        active = sampler.get_active_windows()
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename'))
+        del active
+
+        with tempfile.TemporaryDirectory() as tmp:
+            store = UsageStore(Path(tmp))
+            store.load("2024-01-01")
+            tick_samples = []
+            for _ in range(ticks):
+                source.advance()
+                start = time.perf_counter()
+                store.record_presence("2024-01-01", sampler.get_active_windows(), 1000)
+                tick_samples.append(time.perf_counter() - start)
+            store.close()
+        tick_median, _ = percentiles(tick_samples)
+
+        cache = sampler.process_cache.stats()
+        hit_rate = cache['hits'] / max(1, cache['hits'] + cache['misses'])
+        print(f"  {windows:5d}  {median * 1e6:8.0f} us  {p95 * 1e6:8.0f} us"
+              f"  {blocks:6d}  {tick_median * 1e6:8.0f} us  {hit_rate:6.1%}")
+
+
+def bench_events(ticks=200):
+    """Costo por tick del modelo guiado por eventos frente a enumerar todas las ventanas.
+
+    La última columna es lo que agrega obtener la app en primer plano en la misma pasada.
+    """
+    print("Eventos frente a sondeo (ventanas / sondeo / eventos / + primer plano), 1% de cambios por tick")
+    for windows in (10, 100, 1000):
+        source = SimulatedWindowSource(windows=windows, processes=max(2, windows // 5), churn=0.01)
+        sampler = WindowSampler(source, removed_apps=set())
+        events = SimulatedEventSource(source, realtime=False)
+        model = ActiveWindowModel(sampler)
+        model.resync()
+        events.wait(0)
+
+        polling, evented, focus = [], [], []
+        for _ in range(ticks):
+            source.advance()
+            start = time.perf_counter()
+            model.update(events.wait(0))
+            model.active_apps()
+            evented.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            model.focused_app(idle_timeout=300)
+            focus.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            sampler.get_active_windows()
+            polling.append(time.perf_counter() - start)
+
+        print(f"  {windows:5d}  {percentiles(polling)[0] * 1e6:8.0f} us  {percentiles(evented)[0] * 1e6:8.0f} us"
+              f"  {percentiles(focus)[0] * 1e6:8.1f} us")
+
+
+def bench_tree(updates=20):
+    """Actualización del Treeview: reconstrucción completa frente a TreeRowModel."""
+    import tkinter as tk
+    from tkinter import ttk
+
+    print("Actualización del árbol (filas / reconstrucción completa / diferencial)")
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        print("  sin entorno gráfico, se omite")
+        return
+    root.withdraw()
+    columns = ("Aplicación", "Tiempo de uso", "Ventanas activas")
+    rng = random.Random(0)
+
+    for count in (50, 500, 5000):
+        times = {f"app{i:04d}.exe": rng.randint(0, 36000) for i in range(count)}
+
+        def next_rows():
+            # Cada segundo avanza el tiempo de unas pocas apps, como con pocas ventanas activas
+            for name in rng.sample(list(times), max(1, count // 100)):
+                times[name] += 1
+            ordered = sorted(times.items(), key=lambda item: item[1], reverse=True)
+            return [(name, (name, f"{secs}s", "Documento"), ()) for name, secs in ordered]
+
+        full_tree = ttk.Treeview(root, columns=columns, show="headings")
+        diff_tree = ttk.Treeview(root, columns=columns, show="headings")
+        row_model = TreeRowModel(diff_tree, columns)
+        row_model.sync(next_rows())
+        for name, values, tags in next_rows():
+            full_tree.insert("", tk.END, values=values, tags=tags)
+
+        full, diff = [], []
+        for _ in range(updates):
+            rows = next_rows()
+            start = time.perf_counter()
+            full_tree.delete(*full_tree.get_children())
+            for name, values, tags in rows:
+                full_tree.insert("", tk.END, values=values, tags=tags)
+            root.update_idletasks()
+            full.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            row_model.sync(rows)
+            root.update_idletasks()
+            diff.append(time.perf_counter() - start)
+
+        full_tree.destroy()
+        diff_tree.destroy()
+        print(f"  {count:5d}  {percentiles(full)[0] * 1000:8.2f} ms  {percentiles(diff)[0] * 1000:8.2f} ms")
+    root.destroy()
+
+
+def bench_stress(duration=5.0):
+    """Prueba de estrés: la interfaz y el tray operan mientras el muestreo corre.
+
+    Un hilo cambia las ventanas simuladas, otro alterna el tracking como lo hace
+    el menú del tray y el hilo de Tk actualiza el árbol, alterna el tracking,
+    cambia de fecha y guarda la configuración sin pausa. Falla si aparece una excepción en cualquier hilo
+    o si en algún momento hay más de un hilo de muestreo vivo.
+    """
+    import tkinter as tk
+
+    print("Estrés de concurrencia (interfaz + tray + muestreo)")
+    try:
+        tk.Tk().destroy()
+    except tk.TclError:
+        print("  sin entorno gráfico, se omite")
+        return
+
+    errors = []
+    max_samplers = 0
+    previous_hook = threading.excepthook
+    threading.excepthook = lambda args: errors.append(args.exc_value)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            source = SimulatedWindowSource(windows=200, processes=40, churn=0.05)
+            tracker = AppUsageTracker(window_source=source)
+            tracker.root.report_callback_exception = lambda exc, value, tb: errors.append(value)
+            tracker.hide_window()
+            stop = threading.Event()
+            counts = {'toggles': 0, 'ui': 0}
+
+            def churn():
+                while not stop.is_set():
+                    source.advance()
+                    time.sleep(0.005)
+
+            def tray():
+                while not stop.is_set():
+                    tracker.toggle_tracking()
+                    counts['toggles'] += 1
+                    time.sleep(0.002)
+
+            def monitor():
+                nonlocal max_samplers
+                while not stop.is_set():
+                    alive = sum(1 for t in threading.enumerate() if t.name == "sampler")
+                    max_samplers = max(max_samplers, alive)
+                    time.sleep(0.001)
+
+            def ui():
+                if stop.is_set():
+                    tracker.root.quit()
+                    return
+                tracker.update_tree()
+                # También desde el hilo de Tk, que espera al muestreo al reiniciarlo
+                tracker.toggle_tracking()
+                tracker.core.save_config()
+                tracker.change_date(random.choice((-1, 1)))
+                tracker.go_to_today()
+                counts['ui'] += 1
+                tracker.root.after(1, ui)
+
+            workers = [threading.Thread(target=f, daemon=True) for f in (churn, tray, monitor)]
+            for worker in workers:
+                worker.start()
+            tracker.root.after(1, ui)
+            tracker.root.after(int(duration * 1000), stop.set)
+            tracker.root.mainloop()
+            for worker in workers:
+                worker.join()
+            tracker.quit_app()
+            tracker.root.destroy()
+        finally:
+            os.chdir(cwd)
+            threading.excepthook = previous_hook
+
+    print(f"  {counts['toggles']} cambios desde el tray, {counts['ui']} ciclos de interfaz,"
+          f" máximo de hilos de muestreo: {max_samplers}, errores: {len(errors)}")
+    for error in errors[:5]:
+        print(f"    {type(error).__name__}: {error}")
+    if errors or max_samplers > 1:
+        raise SystemExit(1)
+
+
+def bench_reports():
+    """Consultas de rangos con rollups frente a recorrer cada día, sobre 3 años y 500 apps."""
+    print("Reportes por rango (días del rango / recorrer días en memoria / rollups)")
+    history = synthetic_history(3 * 365, apps=500, per_day=150)
+    dates = sorted(history)
+    end = datetime.strptime(dates[-1], "%Y-%m-%d").date()
+
+    def naive(start):
+        totals = {}
+        for date in dates:
+            if date >= start.isoformat():
+                for proc_name, data in history[date].items():
+                    totals[proc_name] = totals.get(proc_name, 0) + data['ms']
+        return totals
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_file = Path(tmp) / 'app_usage_data.json'
+        with open(legacy_file, 'w') as f:
+            json.dump(history, f)
+        store = UsageStore(Path(tmp) / 'data', legacy_file=legacy_file)
+        store.load(dates[-1])
+
+        # La primera consulta construye y guarda los rollups de cada mes
+        build_time = timed(lambda: store.rollups.range_totals(end - timedelta(days=len(dates) - 1), end))
+        store.rollups.write_dirty()
+        print(f"  construcción inicial de rollups: {build_time * 1000:.0f} ms")
+
+        store.rollups.cache_size = 64
+        for days in (7, 30, 365, len(dates)):
+            start = end - timedelta(days=days - 1)
+            naive_time = timed(lambda: naive(start))
+            store.rollups.range_totals(start, end)  # calienta la caché de meses
+            rollup_time = timed(lambda: store.rollups.range_totals(start, end))
+            assert store.rollups.range_totals(start, end) == naive(start)
+            print(f"  {days:5d}  {naive_time * 1000:8.2f} ms  {rollup_time * 1000:8.2f} ms"
+                  f"  ({len(store.rollups.range_buckets(start, end))} buckets)")
+        store.close()
+
+
+def bench_columnar():
+    """Memoria por registro y sumas por rango: diccionarios frente a columnas."""
+    print("Almacenamiento en columnas (3 años, 500 apps)")
+    text = json.dumps(synthetic_history(3 * 365, apps=500, per_day=150))
+    holder = {}
+
+    _, dict_kib = measure(lambda: holder.__setitem__('dicts', json.loads(text)))
+    history = holder['dicts']
+    _, columnar_kib = measure(lambda: holder.__setitem__('columnar', ColumnarUsage.from_legacy(history)))
+    columnar = holder['columnar']
+    assert columnar.to_legacy().keys() == history.keys()
+    records = len(columnar)
+    print(f"  {records} registros: diccionarios {dict_kib * 1024 / records:6.0f} B/registro,"
+          f" columnas {columnar_kib * 1024 / records:5.1f} B/registro")
+
+    dates = sorted(history)
+    end = datetime.strptime(dates[-1], "%Y-%m-%d").date()
+
+    def dict_totals(start):
+        totals = {}
+        first = start.isoformat()
+        for date in dates:
+            if date >= first:
+                for proc_name, data in history[date].items():
+                    totals[proc_name] = totals.get(proc_name, 0) + data['ms']
+        return totals
+
+    print("  (días del rango / diccionarios / columnas con NumPy / columnas sin NumPy)")
+    for days in (30, 365, len(dates)):
+        start = end - timedelta(days=days - 1)
+        dict_time = timed(lambda: dict_totals(start))
+        numpy_time = timed(lambda: columnar.totals(start, end)) if TimeTracker.optional_numpy() else float('nan')
+        saved, TimeTracker._numpy = TimeTracker._numpy, False
+        python_time = timed(lambda: columnar.totals(start, end))
+        TimeTracker._numpy = saved
+        assert columnar.totals(start, end) == dict_totals(start)
+        print(f"  {days:5d}  {dict_time * 1000:8.2f} ms  {numpy_time * 1000:8.2f} ms  {python_time * 1000:8.2f} ms")
+
+
+def directory_size(path):
+    return sum(entry.stat().st_size for entry in Path(path).rglob('*') if entry.is_file())
+
+
+def bench_retention(years=3, apps=200, per_day=40, titles=10):
+    """Espacio en disco y carga de un historial de varios años: JSON único, snapshots y archivos comprimidos."""
+    history = synthetic_history(years * 365, apps=apps, per_day=per_day)
+    rng = random.Random(1)
+    for day in history.values():
+        for data in day.values():
+            data['titles'] = {f"Documento {rng.randrange(1000)}": data['ms'] // titles for _ in range(titles)}
+    dates = sorted(history)
+    today = dates[-1]
+    end = datetime.strptime(today, "%Y-%m-%d").date()
+    old_day = dates[len(dates) // 3]
+    print(f"Retención ({years} años, {per_day} apps por día, {titles} títulos por app)")
+    print("  (formato / tamaño en disco / arranque / leer un día viejo)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_file = Path(tmp) / 'app_usage_data.json'
+        with open(legacy_file, 'w') as f:
+            json.dump(history, f, indent=4)
+        legacy_size = legacy_file.stat().st_size
+
+        def load_legacy():
+            with open(legacy_file, 'r') as f:
+                json.load(f)
+
+        print(f"  {'JSON único con sangría':28s} {legacy_size / 2**20:7.1f} MiB  {timed(load_legacy) * 1000:8.1f} ms")
+
+        data_dir = Path(tmp) / 'data'
+        store = UsageStore(data_dir, legacy_file=legacy_file)
+        store.load(today)
+        store.rollups.range_totals(datetime.strptime(dates[0], "%Y-%m-%d").date(), end)
+        store.close()
+
+        def report(label):
+            store = UsageStore(data_dir)
+            load_time = timed(lambda: store.load(today))
+            read_time = timed(lambda: store.get_day(old_day, create=False))
+            print(f"  {label:28s} {directory_size(data_dir) / 2**20:7.1f} MiB  {load_time * 1000:8.1f} ms"
+                  f"  {read_time * 1000:8.2f} ms")
+            return store
+
+        report("snapshots por día")
+        store = UsageStore(data_dir)
+        store.load(today)
+        expected = store.rollups.range_totals(end - timedelta(days=len(dates) - 1), end)
+        months = store.archivable_months(end - timedelta(days=90))
+        archive_time = timed(lambda: [store.archive_month(month) for month in months])
+        print(f"  archivado de {len(months)} meses: {archive_time:.1f} s")
+        store = report("archivado (lzma) con títulos")
+        assert store.rollups.range_totals(end - timedelta(days=len(dates) - 1), end) == expected
+        store.strip_titles((end - timedelta(days=365)).isoformat())
+        report("sin títulos pasado 1 año")
+
+
+def bench_sqlite(ticks=500):
+    """UsageStore (JSON) frente a SqliteUsageStore: importación, tick, totales del día y rangos."""
+    history = synthetic_history(3 * 365, apps=500, per_day=150)
+    dates = sorted(history)
+    today = dates[-1]
+    end = datetime.strptime(today, "%Y-%m-%d").date()
+    source = SimulatedWindowSource(windows=40, processes=20, churn=0.05)
+    sampler = WindowSampler(source, set())
+    recorded = []
+    for _ in range(ticks):
+        source.advance()
+        recorded.append(sampler.get_active_windows())
+    print("JSON frente a SQLite (3 años, 500 apps, 150 por día)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_file = Path(tmp) / 'app_usage_data.json'
+        with open(legacy_file, 'w') as f:
+            json.dump(history, f)
+        json_store = UsageStore(Path(tmp) / 'data', legacy_file=legacy_file)
+        json_store.load(today)
+        json_store.rollups.range_totals(end - timedelta(days=len(dates) - 1), end)
+        json_store.flush()
+
+        sqlite_store = SqliteUsageStore(Path(tmp) / 'usage.sqlite3')
+        sqlite_store.load(today)
+        import_time = timed(lambda: sqlite_store.import_store(json_store))
+        json_size = directory_size(Path(tmp) / 'data')
+        sqlite_store.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        sqlite_size = (Path(tmp) / 'usage.sqlite3').stat().st_size
+        print(f"  importación: {import_time * 1000:.0f} ms; en disco: JSON {json_size / 2**20:.1f} MiB,"
+              f" SQLite {sqlite_size / 2**20:.1f} MiB")
+
+        print("  (operación / JSON / SQLite)")
+        for name, store in (('json', json_store), ('sqlite', sqlite_store)):
+            samples = []
+            for active in recorded:
+                start = time.perf_counter()
+                store.record_presence(today, active, 1000)
+                samples.append(time.perf_counter() - start)
+            flush = timed(store.flush)
+            day = timed(lambda: store.day_totals(today))
+            results = [percentiles(samples)[0] * 1e6, flush * 1000, day * 1000]
+            for days in (30, 365, len(dates)):
+                start_date = end - timedelta(days=days - 1)
+                store.range_totals(start_date, end)
+                results.append(timed(lambda: store.range_totals(start_date, end)) * 1000)
+            if name == 'json':
+                json_results = results
+            else:
+                sqlite_results = results
+        assert json_store.range_totals(end - timedelta(days=364), end) == sqlite_store.range_totals(end - timedelta(days=364), end)
+        labels = ["tick (mediana, us)", "flush (ms)", "totales del día (ms)",
+                  "rango 30 días (ms)", "rango 365 días (ms)", f"rango {len(dates)} días (ms)"]
+        for label, json_value, sqlite_value in zip(labels, json_results, sqlite_results):
+            print(f"  {label:22s} {json_value:10.2f} {sqlite_value:10.2f}")
+        json_store.close()
+        sqlite_store.close()
+
+
+class ByteCounter:
+    """Destino de exportación que solo cuenta los bytes recibidos."""
+
+    def __init__(self):
+        self.bytes = 0
+
+    def write(self, data):
+        self.bytes += len(data)
+
+
+def bench_export(days=730, per_day=1500):
+    """Exportación en streaming de más de un millón de registros: velocidad por formato y memoria."""
+    removed = 50
+    records = days * (per_day - removed)
+    names = [f"app{i:05d}.exe" for i in range(per_day)]
+    print(f"Exportación ({records} registros, {days} días)")
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            store = UsageStore(Path('app_usage_data'))
+            store.load("2020-01-01")
+            start = datetime(2020, 1, 1).date()
+            rng = random.Random(0)
+            for offset in range(days):
+                date = (start + timedelta(days=offset)).isoformat()
+                store.write_snapshot(date, {
+                    name: {'ms': rng.randint(1, 8 * 3600) * 1000, 'last_seen': 0.0, 'focus_ms': rng.randint(0, 3600) * 1000}
+                    for name in names
+                }, 0)
+            store.close()
+            with open('app_config.json', 'w') as f:
+                json.dump({'aliases': {name: name.upper() for name in names[::10]},
+                           'removed_apps': names[:removed], 'archive_after_days': 0}, f)
+            end = start + timedelta(days=days - 1)
+
+            core = TimeTracker.TrackerCore(TimeTracker.WindowSource())
+            print("  (formato / registros por segundo / MB/s)")
+            for fmt in sorted(TimeTracker.UsageExporter.FORMATS):
+                sink = ByteCounter()
+                elapsed = timed(lambda: core.export_usage(sink, fmt, start, end))
+                print(f"  {fmt:10s} {records / elapsed:12,.0f} {sink.bytes / elapsed / 2**20:8.1f}")
+
+            # La memoria no depende del largo del rango: se lee un día por vez
+            for span in (days // 10, days):
+                _, peak = measure(lambda: core.export_usage(ByteCounter(), 'csv', start, start + timedelta(days=span - 1)))
+                print(f"  memoria pico exportando {span:4d} días a CSV: {peak:8.0f} KiB")
+            core.shutdown()
+        finally:
+            os.chdir(cwd)
+
+
+class VirtualClock:
+    """Reloj monotónico y de pared que solo avanza cuando se lo pide."""
+
+    def __init__(self, epoch):
+        self.epoch = epoch
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.epoch + self.now
+
+
+class FastForwardEvents(SimulatedEventSource):
+    """Eventos simulados sobre un VirtualClock: cada espera avanza el reloj en lugar de dormir.
+
+    Detiene el muestreo después de `ticks` esperas.
+    """
+
+    def __init__(self, source, core, clock, ticks, seed=0):
+        super().__init__(source, realtime=False)
+        self.core = core
+        self.clock = clock
+        self.ticks = ticks
+        self.rng = random.Random(seed)
+
+    def wait(self, timeout):
+        # Unos ms de retraso, como los de un hilo real, ejercitan el redondeo de la contabilidad
+        self.clock.now += timeout + self.rng.random() * 0.004
+        self.source.advance()
+        self.ticks -= 1
+        if self.ticks <= 0:
+            self.core.stop_sampler()
+        return super().wait(0)
+
+
+def replay_in(directory, trace, backend, ui=False):
+    """Reproduce `trace` con un TrackerCore nuevo en `directory`; con `ui`, actualiza el árbol en cada tick."""
+    directory.mkdir()
+    os.chdir(directory)
+    with open('app_config.json', 'w') as f:
+        json.dump({'storage_backend': backend}, f)
+    if not ui:
+        core = TimeTracker.TrackerCore(TimeTracker.WindowSource())
+        result = core.replay_trace(trace)
+        core.shutdown()
+        return result
+    # La interfaz inicia el muestreo al crearse: sin ventanas no acredita nada
+    core = TimeTracker.TrackerCore(SimulatedWindowSource(windows=0))
+    tracker = AppUsageTracker(core=core)
+    core.stop_sampler(wait=True)
+    tracker.hide_window()
+
+    def update(snapshot):
+        tracker.current_date = snapshot.date
+        tracker.update_tree()
+
+    core.subscribe(update)
+    result = core.replay_trace(trace)
+    tracker.quit_app()
+    tracker.root.destroy()
+    return result
+
+
+def bench_replay(ticks=86400):
+    """Graba un día de muestreo simulado y lo reproduce más rápido que el tiempo real.
+
+    La grabación corre el bucle real de track_usage sobre un reloj virtual; la
+    reproducción pasa por la contabilidad, el almacenamiento (JSON y SQLite) y,
+    si hay entorno gráfico, update_tree. Falla si el uso reproducido difiere
+    del grabado.
+    """
+    import tkinter as tk
+
+    print(f"Grabación y reproducción de trazas ({ticks} ticks de 1 s)")
+    cwd = os.getcwd()
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        (tmp / 'live').mkdir()
+        os.chdir(tmp / 'live')
+        try:
+            # Empieza al mediodía para que la traza cruce la medianoche
+            clock = VirtualClock(datetime(2024, 3, 10, 12, 0).timestamp())
+            source = SimulatedWindowSource(windows=40, processes=15, churn=0.02, clock=clock.monotonic)
+            core = TimeTracker.TrackerCore(source)
+            core.event_source = FastForwardEvents(source, core, clock, ticks)
+            core.set_clocks(clock.monotonic, clock.time)
+            core.trace_path = tmp / 'day.trace.gz'
+            start = time.perf_counter()
+            core.start_sampler()
+            core._sampler_thread.join()
+            recorded = time.perf_counter() - start
+            core.shutdown()
+            size = core.trace_path.stat().st_size
+            print(f"  grabación: {recorded:.1f} s, traza de {size / 1024:.0f} KiB ({size / ticks:.1f} bytes por tick)")
+
+            runs = [('json', False), ('sqlite', False)]
+            try:
+                tk.Tk().destroy()
+                runs.append(('json', True))
+            except tk.TclError:
+                print("  sin entorno gráfico, se omite la reproducción con interfaz")
+            print("  (almacenamiento / segundos / veces el tiempo real / coincide)")
+            for backend, ui in runs:
+                result = replay_in(tmp / f"{backend}{'-ui' if ui else ''}", core.trace_path, backend, ui)
+                label = backend + (" + árbol" if ui else "")
+                print(f"  {label:14s} {result['elapsed']:8.2f} {result['simulated'] / result['elapsed']:10,.0f}x"
+                      f"  {'sí' if result['matches'] else 'NO'}")
+                failed = failed or not result['matches']
+        finally:
+            os.chdir(cwd)
+    if failed:
+        raise SystemExit(1)
+
+
+# Costo extra por tick que se acepta por registrar el tiempo por título con 100
+# ventanas: medio milisegundo, un 0,05 % del intervalo de muestreo de 1 s
+TITLE_BUDGET_US = 500
+
+
+def bench_titles(ticks=300):
+    """Costo por tick de acreditar tiempo por título frente a solo por app."""
+    print(f"Tiempo por título (ventanas / solo apps / con títulos / extra), presupuesto {TITLE_BUDGET_US} us con 100 ventanas")
+    for windows in (10, 100, 1000):
+        source = SimulatedWindowSource(windows=windows, processes=max(2, windows // 5), churn=0.05)
+        sampler = WindowSampler(source, removed_apps=set())
+        with tempfile.TemporaryDirectory() as tmp:
+            store = UsageStore(Path(tmp))
+            store.load("2024-01-01")
+            apps_only, with_titles = [], []
+            for _ in range(ticks):
+                source.advance()
+                active = sampler.get_active_windows()
+                start = time.perf_counter()
+                store.record("2024-01-01", {proc_name: (1000, 0.0) for proc_name in active})
+                apps_only.append(time.perf_counter() - start)
+                start = time.perf_counter()
+                store.record_presence("2024-01-01", active, 1000, 0.0)
+                with_titles.append(time.perf_counter() - start)
+            store.close()
+
+        base, titled = percentiles(apps_only)[0] * 1e6, percentiles(with_titles)[0] * 1e6
+        print(f"  {windows:5d}  {base:8.0f} us  {titled:8.0f} us  {titled - base:8.0f} us")
+        if windows == 100 and titled - base > TITLE_BUDGET_US:
+            raise SystemExit(f"El registro por título supera el presupuesto de {TITLE_BUDGET_US} us")
+
+
+def bench_daemon(requests=200):
+    """Demonio sin interfaz: arranque hasta la primera respuesta, memoria residente y latencia de la API."""
+    import psutil
+    import subprocess
+
+    script = str(Path(TimeTracker.__file__).resolve())
+    print("Demonio sin interfaz (--daemon --simulate)")
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        daemon = subprocess.Popen(
+            [sys.executable, script, '--daemon', '--simulate', '--port', '0'],
+            cwd=tmp, stdout=subprocess.PIPE, text=True
+        )
+        try:
+            port = int(daemon.stdout.readline().rsplit(':', 1)[1])
+            client = TrackerClient(port)
+            while not client.ping():
+                time.sleep(0.01)
+            startup = time.perf_counter() - start
+            time.sleep(2)
+            rss = psutil.Process(daemon.pid).memory_info().rss
+
+            today = datetime.now().date()
+            latencies = {'/today': [], '/range (30 días)': []}
+            for _ in range(requests):
+                latencies['/today'].append(timed(lambda: client.request('/today')))
+                latencies['/range (30 días)'].append(
+                    timed(lambda: client.report_totals(today - timedelta(days=29), today)))
+        finally:
+            daemon.terminate()
+            daemon.wait()
+
+    print(f"  arranque hasta la primera respuesta: {startup * 1000:.0f} ms")
+    print(f"  memoria residente: {rss / 2**20:.1f} MiB")
+    for path, samples in latencies.items():
+        median, p95 = percentiles(samples)
+        print(f"  {path}: mediana {median * 1000:.2f} ms, p95 {p95 * 1000:.2f} ms")
+
+
+# Límites del arranque en frío: importar el módulo y llegar al primer snapshot publicado
+IMPORT_BUDGET_MS = 50
+FIRST_SAMPLE_BUDGET_MS = 150
+# Módulos pesados que solo se cargan cuando se usan (interfaz, tray, API, Windows)
+LAZY_MODULES = ('psutil', 'tkinter', 'PIL', 'pystray', 'win32gui', 'http.server', 'urllib.request', 'argparse')
+
+FIRST_SAMPLE_SCRIPT = """
+import time
+start = time.perf_counter()
+import sys, threading
+import TimeTracker
+core = TimeTracker.TrackerCore(TimeTracker.SimulatedWindowSource(windows=50, processes=10))
+published = threading.Event()
+core.subscribe(lambda snapshot: published.set())
+core.start_sampler()
+published.wait()
+elapsed = time.perf_counter() - start
+print(elapsed * 1000, *[m for m in LAZY_MODULES if m in sys.modules])
+core.shutdown()
+"""
+
+
+def bench_startup(runs=5):
+    """Arranque en frío medido con -X importtime, con límites para detectar regresiones."""
+    import subprocess
+
+    print(f"Arranque (mediana de {runs}), límites: importar {IMPORT_BUDGET_MS} ms, "
+          f"primer snapshot {FIRST_SAMPLE_BUDGET_MS} ms")
+    package_dir = str(Path(TimeTracker.__file__).resolve().parent)
+    env = dict(os.environ, PYTHONPATH=package_dir)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    with tempfile.TemporaryDirectory() as tmp:
+        # Los .pyc van a un directorio temporal y la primera corrida los genera,
+        # así se mide un arranque con caché de bytecode como el de una instalación
+        command = [sys.executable, '-X', f'pycache_prefix={tmp}/pyc']
+        subprocess.run(command + ['-c', 'import TimeTracker'], cwd=tmp, env=env, check=True)
+
+        import_times, first_samples = [], []
+        for _ in range(runs):
+            output = subprocess.run(command + ['-X', 'importtime', '-c', 'import TimeTracker'],
+                                    cwd=tmp, env=env, capture_output=True, text=True, check=True).stderr
+            lines = [line.split('|') for line in output.splitlines() if line.startswith('import time:')]
+            lines = [(int(line[0].split(':')[1]), int(line[1]), line[2].rstrip()) for line in lines[1:]]
+            import_times.append(next(cumulative for _, cumulative, name in lines if name == ' TimeTracker') / 1000)
+
+            script = f"LAZY_MODULES = {LAZY_MODULES!r}\n" + FIRST_SAMPLE_SCRIPT
+            result = subprocess.run(command + ['-c', script], cwd=tmp, env=env,
+                                    capture_output=True, text=True, check=True).stdout.split()
+            first_samples.append(float(result[0]))
+            loaded = result[1:]
+
+    # Imports directos más costosos del módulo, de la última corrida: están entre
+    # la línea de TimeTracker (la última) y el import de primer nivel anterior
+    def depth(name):
+        return len(name) - len(name.lstrip())
+    first = max((i for i, (_, _, name) in enumerate(lines[:-1]) if depth(name) == 1), default=-1) + 1
+    direct = [(cumulative, name.strip()) for _, cumulative, name in lines[first:-1] if depth(name) == 3]
+    import_ms = percentiles(import_times)[0]
+    first_sample_ms = percentiles(first_samples)[0]
+    print(f"  importar TimeTracker: {import_ms:.1f} ms  "
+          f"(más costosos: {', '.join(f'{name} {us / 1000:.1f} ms' for us, name in sorted(direct)[-3:][::-1])})")
+    print(f"  hasta el primer snapshot: {first_sample_ms:.1f} ms")
+    if loaded:
+        raise SystemExit(f"Módulos que deberían cargarse bajo demanda: {', '.join(loaded)}")
+    if import_ms > IMPORT_BUDGET_MS or first_sample_ms > FIRST_SAMPLE_BUDGET_MS:
+        raise SystemExit("El arranque supera el límite")
+
+
+def bench_picker(names=5000):
+    """Búsqueda del diálogo de agregar aplicación: AppNameIndex frente a recorrer todos los nombres."""
+    rng = random.Random(0)
+    words = ["chrome", "code", "explorer", "teams", "svchost", "runtime", "broker", "update", "helper", "service"]
+    processes = [f"{rng.choice(words)}{rng.choice(words)}{i}.exe" for i in range(names)]
+    index = AppNameIndex()
+    build = timed(lambda: index.add(processes))
+
+    # Cada búsqueda es una tecla: se escribe una palabra, se borra y se escribe otra
+    keystrokes = []
+    for word in ("chrome", "svchost", "helper1", "xyz"):
+        keystrokes += [word[:n] for n in range(1, len(word) + 1)] + [word[:n] for n in range(len(word) - 1, 0, -1)]
+
+    indexed = [timed(lambda: index.search(text)) for text in keystrokes]
+    linear = [timed(lambda: [p for p in processes if text in p.lower()]) for text in keystrokes]
+    print(f"Buscador de aplicaciones ({names} nombres), índice construido en {build * 1000:.1f} ms")
+    print(f"  por tecla: recorrido lineal {percentiles(linear)[0] * 1e6:8.0f} us (p95 {percentiles(linear)[1] * 1e6:.0f}),"
+          f" índice {percentiles(indexed)[0] * 1e6:8.0f} us (p95 {percentiles(indexed)[1] * 1e6:.0f})")
+
+def bench_aliases(apps=2000, lookups=2000):
+    """Nombre mostrado -> proceso: búsqueda lineal en el dict de alias frente a AliasRegistry."""
+    aliases = {f"app{i:05d}.exe": f"Aplicación {i}" for i in range(apps)}
+    registry = AliasRegistry(aliases)
+    names = [f"Aplicación {i * 7919 % apps}" for i in range(lookups)]
+
+    linear = timed(lambda: [next(k for k, v in aliases.items() if v == name) for name in names])
+    indexed = timed(lambda: [registry.owner(name) for name in names])
+    print(f"Alias ({apps} apps, {lookups} búsquedas inversas)")
+    print(f"  lineal {linear / lookups * 1e6:8.2f} us/búsqueda, registro {indexed / lookups * 1e6:8.2f} us/búsqueda")
+
+def bench_instrumentation(loops=20000):
+    """Costo de SamplerStats.record_loop frente al presupuesto de un tick de 1 s."""
+    stats = SamplerStats()
+    timings = {'update': 0.0001, 'focus': 0.00002, 'accounting': 0.0003, 'publish': 0.00005, 'loop': 0.0005}
+    elapsed = timed(lambda: [stats.record_loop(timings, 40, True, 0.001) for _ in range(loops)])
+    export = timed(stats.to_dict)
+    per_loop = elapsed / loops
+    print("Instrumentación del muestreo")
+    print(f"  record_loop: {per_loop * 1e6:.2f} us por vuelta ({per_loop * 100:.4f} % de un tick de 1 s),"
+          f" to_dict: {export * 1000:.2f} ms")
+
+
+BENCHMARKS = {
+    'storage': bench_storage_startup,
+    'sampling': bench_sampling,
+    'events': bench_events,
+    'tree': bench_tree,
+    'stress': bench_stress,
+    'reports': bench_reports,
+    'columnar': bench_columnar,
+    'titles': bench_titles,
+    'daemon': bench_daemon,
+    'startup': bench_startup,
+    'picker': bench_picker,
+    'retention': bench_retention,
+    'sqlite': bench_sqlite,
+    'export': bench_export,
+    'replay': bench_replay,
+    'aliases': bench_aliases,
+    'instrumentation': bench_instrumentation,
+}
+
+
+def main(names):
+    for name in names or BENCHMARKS:
+        BENCHMARKS[name]()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1 @@
+# Hace importable TimeTracker desde tests/ al correr pytest en la raíz del repositorio
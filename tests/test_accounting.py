@@ -0,0 +1,95 @@
+"""Pruebas de UsageAccountant con relojes falsos: sin esperas ni dependencia de la hora real."""
+from datetime import datetime
+
+from TimeTracker import UsageAccountant
+
+
+class FakeClock:
+    """Reloj monotónico y de pared que solo avanza con advance()."""
+
+    def __init__(self, wall):
+        self.now = 1000.0
+        self.wall = wall
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.wall
+
+    def advance(self, seconds, wall_seconds=None):
+        self.now += seconds
+        self.wall += seconds if wall_seconds is None else wall_seconds
+
+
+def accountant(start, max_gap=20.0):
+    clock = FakeClock(start.timestamp())
+    accountant = UsageAccountant(max_gap=max_gap, clock=clock.monotonic, wall_clock=clock.time)
+    accountant.start()
+    return accountant, clock
+
+
+def test_advance_credits_elapsed_milliseconds():
+    acc, clock = accountant(datetime(2024, 3, 12, 10, 0))
+    clock.advance(1.0)
+    assert acc.advance() == [("2024-03-12", 1000)]
+
+
+def test_sub_second_deltas_do_not_drift():
+    acc, clock = accountant(datetime(2024, 3, 12, 10, 0))
+    total = 0
+    for _ in range(1000):
+        clock.advance(0.2503)
+        total += sum(ms for _, ms in acc.advance())
+    # Se mide contra el reloj: truncar cada tick por separado habría dado 250000
+    assert total == int(clock.now * 1000) - 1000000
+    assert total >= 250299
+
+
+def test_no_time_elapsed_credits_nothing():
+    acc, clock = accountant(datetime(2024, 3, 12, 10, 0))
+    assert acc.advance() == []
+    clock.advance(0.0004)
+    assert acc.advance() == []
+
+
+def test_gap_is_capped_at_max_gap():
+    acc, clock = accountant(datetime(2024, 3, 12, 10, 0), max_gap=20.0)
+    clock.advance(3600.0)  # Suspensión de una hora
+    assert acc.advance() == [("2024-03-12", 20000)]
+    clock.advance(1.0)
+    assert acc.advance() == [("2024-03-12", 1000)]
+
+
+def test_wall_clock_jump_does_not_change_duration():
+    acc, clock = accountant(datetime(2024, 3, 12, 10, 0))
+    clock.advance(2.0, wall_seconds=-3600.0)  # El usuario atrasa el reloj del sistema
+    assert acc.advance() == [("2024-03-12", 2000)]
+
+
+def test_interval_across_midnight_is_split():
+    acc, clock = accountant(datetime(2024, 3, 12, 23, 59, 59, 250000))
+    clock.advance(2.0)
+    assert acc.advance() == [("2024-03-12", 750), ("2024-03-13", 1250)]
+
+
+def test_capped_gap_across_midnight_is_split_at_the_end():
+    acc, clock = accountant(datetime(2024, 3, 12, 23, 0))
+    clock.advance(3600.0 + 5.0)
+    # Solo se acreditan los últimos max_gap segundos, terminando a las 00:00:05
+    assert acc.advance() == [("2024-03-12", 15000), ("2024-03-13", 5000)]
+
+
+def test_tick_ending_exactly_at_midnight_has_no_empty_tail():
+    acc, clock = accountant(datetime(2024, 3, 12, 23, 59, 59))
+    clock.advance(1.0)
+    assert acc.advance() == [("2024-03-12", 1000)]
+
+
+def test_split_by_day_spanning_several_days():
+    end = datetime(2024, 3, 14, 0, 0, 1).timestamp()
+    intervals = UsageAccountant.split_by_day(end, (2 * 86400 + 2) * 1000)
+    assert intervals == [
+        ("2024-03-11", 1000), ("2024-03-12", 86400000), ("2024-03-13", 86400000), ("2024-03-14", 1000)
+    ]
+    assert sum(ms for _, ms in intervals) == (2 * 86400 + 2) * 1000
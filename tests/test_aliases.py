@@ -0,0 +1,71 @@
+"""Alias de aplicaciones: nombres únicos, grupos y configuraciones anteriores."""
+import json
+
+import pytest
+
+from TimeTracker import AliasConflict, AliasRegistry, SimulatedWindowSource, TrackerCore
+
+PROCESSES = {'chrome.exe', 'firefox.exe', 'code.exe'}
+
+
+def test_name_of_another_app_is_rejected():
+    aliases = AliasRegistry({'chrome.exe': 'Navegador'})
+    with pytest.raises(AliasConflict) as conflict:
+        aliases.rename('firefox.exe', 'Navegador', PROCESSES)
+    assert conflict.value.owner == 'chrome.exe'
+    # El nombre de un proceso sin alias también está ocupado
+    with pytest.raises(AliasConflict):
+        aliases.rename('code.exe', 'firefox.exe', PROCESSES)
+    assert aliases.to_dict() == {'chrome.exe': 'Navegador'}
+
+
+def test_group_joins_both_apps():
+    aliases = AliasRegistry({'firefox.exe': 'Navegador'})
+    aliases.rename('chrome.exe', 'Navegador', PROCESSES, group=True)
+    assert aliases.members('firefox.exe') == {'chrome.exe', 'firefox.exe'}
+    assert aliases.canonical('firefox.exe') == aliases.canonical('chrome.exe') == 'chrome.exe'
+    assert aliases.owner('Navegador', PROCESSES) == 'chrome.exe'
+    # Renombrar una app del grupo renombra a todo el grupo
+    aliases.rename('firefox.exe', 'Web', PROCESSES)
+    assert aliases.to_dict() == {'chrome.exe': 'Web', 'firefox.exe': 'Web'}
+    assert aliases.group_names() == ['Web']
+
+
+def test_empty_name_or_own_name_removes_the_alias():
+    aliases = AliasRegistry({'chrome.exe': 'Web', 'firefox.exe': 'Web', 'code.exe': 'Editor'})
+    aliases.rename('chrome.exe', '', PROCESSES)
+    assert aliases.to_dict() == {'code.exe': 'Editor'}
+    assert aliases.members('firefox.exe') == {'firefox.exe'}
+    aliases.rename('code.exe', 'code.exe', PROCESSES)
+    assert aliases.to_dict() == {}
+    assert aliases.display_name('code.exe') == 'code.exe'
+
+
+def test_old_config_conflicts_are_grouped_and_reported():
+    aliases = AliasRegistry({'chrome.exe': 'Web', 'edge.exe': 'Web', 'code.exe': 'firefox.exe'})
+    warnings = aliases.resolve_conflicts(PROCESSES | {'edge.exe'})
+    assert len(warnings) == 2
+    assert aliases.members('chrome.exe') == {'chrome.exe', 'edge.exe'}
+    # El alias igual al nombre de otro proceso ya no muestra dos filas con el mismo nombre
+    assert aliases.members('firefox.exe') == {'code.exe', 'firefox.exe'}
+    assert aliases.display_name('firefox.exe') == 'firefox.exe'
+
+    # Un grupo guardado por la versión actual no se avisa
+    aliases = AliasRegistry({'chrome.exe': 'Web', 'edge.exe': 'Web'})
+    assert aliases.resolve_conflicts(PROCESSES, groups=['Web']) == []
+
+
+def test_core_reports_old_config_conflicts_once(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with open('app_config.json', 'w') as f:
+        json.dump({'aliases': {'chrome.exe': 'Web', 'edge.exe': 'Web'}, 'tracked_apps': ['chrome.exe', 'edge.exe']}, f)
+    core = TrackerCore(SimulatedWindowSource())
+    core.shutdown()
+    assert len(core.config_warnings) == 1
+    with open('app_config.json') as f:
+        assert json.load(f)['alias_groups'] == ['Web']
+
+    core = TrackerCore(SimulatedWindowSource())
+    core.shutdown()
+    assert core.config_warnings == []
+    assert core.aliases.members('edge.exe') == {'chrome.exe', 'edge.exe'}
@@ -0,0 +1,68 @@
+"""Arranque y detención del muestreo desde varios hilos, sin interfaz (ver bench_stress)."""
+import threading
+import time
+
+from TimeTracker import SimulatedWindowSource, TrackerCore
+
+
+def test_concurrent_start_stop_toggle_keeps_one_sampler(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    source = SimulatedWindowSource(windows=50, processes=10, churn=0.05)
+    core = TrackerCore(source)
+    errors = []
+    samplers = []  # Cada hilo que llegó a ejecutar track_usage
+    alive = [0, 0]  # Hilos de muestreo vivos ahora y el máximo visto
+    lock = threading.Lock()
+    track_usage = core.track_usage
+
+    def counted_track_usage():
+        with lock:
+            samplers.append(threading.current_thread())
+            alive[0] += 1
+            alive[1] = max(alive)
+        try:
+            track_usage()
+        finally:
+            with lock:
+                alive[0] -= 1
+
+    monkeypatch.setattr(core, 'track_usage', counted_track_usage)
+    previous_hook = threading.excepthook
+    threading.excepthook = lambda args: errors.append(args.exc_value)
+    stop = threading.Event()
+
+    def repeat(action):
+        def run():
+            while not stop.is_set():
+                try:
+                    action()
+                except Exception as e:
+                    errors.append(e)
+                time.sleep(0.001)
+        return run
+
+    def publish():
+        snapshot = core.snapshot
+        core.publish_snapshot(snapshot.active_windows, snapshot.focused)
+
+    actions = [
+        source.advance, core.start_sampler, core.stop_sampler, core.toggle_tracking, core.toggle_tracking,
+        lambda: core.stop_sampler(wait=True), core.save_config, core.write_config, publish,
+    ]
+    workers = [threading.Thread(target=repeat(action)) for action in actions]
+    try:
+        for worker in workers:
+            worker.start()
+        time.sleep(1.5)
+    finally:
+        stop.set()
+        for worker in workers:
+            worker.join(5)
+        core.shutdown()
+        threading.excepthook = previous_hook
+
+    assert not any(worker.is_alive() for worker in workers)
+    assert errors == []
+    assert len(samplers) > 10
+    assert alive[1] == 1
+    assert not any(thread.is_alive() for thread in samplers)
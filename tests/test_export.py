@@ -0,0 +1,105 @@
+"""Exportación sin demonio: lee los datos sin modificarlos."""
+import csv
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+
+import pytest
+
+from TimeTracker import SqliteUsageStore, TrackerClient, UsageStore, main
+
+TODAY = '2024-03-12'
+
+
+def snapshot_tree(root):
+    """{ruta relativa: (tamaño, mtime)} de todos los archivos bajo `root`."""
+    return {
+        str(path.relative_to(root)): (path.stat().st_size, path.stat().st_mtime_ns)
+        for path in Path(root).rglob('*') if path.is_file()
+    }
+
+
+def test_export_without_daemon_is_read_only(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    store = UsageStore(Path('app_usage_data'))
+    store.load(TODAY)
+    store.record_presence('2023-01-05', {'viejo.exe': {'Hoja'}}, 5000)
+    store.close()
+    # Registros que siguen en el diario, como con una interfaz abierta
+    store = UsageStore(Path('app_usage_data'))
+    store.load(TODAY)
+    store.record_presence(TODAY, {'a.exe': {'Editor'}}, 60000)
+    store.flush()
+    store._journal.close()
+    with open('app_usage_data.json', 'w') as f:
+        json.dump({'2022-06-01': {'legado.exe': {'time': 30, 'last_seen': 0.0}}}, f)
+    with open('app_config.json', 'w') as f:
+        json.dump({'archive_after_days': 1, 'api_port': 1}, f)
+    before = snapshot_tree(tmp_path)
+
+    output = tmp_path.parent / f"{tmp_path.name}-export.csv"
+    main(['--export', 'csv', '--output', str(output), '--since', '2022-01-01', '--until', TODAY])
+
+    assert snapshot_tree(tmp_path) == before
+    with open(output, newline='') as f:
+        rows = {(row['date'], row['process']): int(row['ms']) for row in csv.DictReader(f)}
+    os.remove(output)
+    assert rows == {('2022-06-01', 'legado.exe'): 30000, ('2023-01-05', 'viejo.exe'): 5000, (TODAY, 'a.exe'): 60000}
+
+
+def test_export_without_daemon_opens_sqlite_read_only(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    store = SqliteUsageStore(Path('app_usage.sqlite3'))
+    store.load(TODAY)
+    store.record_presence(TODAY, {'a.exe': {'Editor'}}, 5000)
+    store.close()
+    with open('app_config.json', 'w') as f:
+        json.dump({'storage_backend': 'sqlite', 'archive_after_days': 1, 'api_port': 1}, f)
+    # Los archivos -wal y -shm los crea SQLite para leer; la base no se toca
+    before = snapshot_tree(tmp_path)
+
+    output = tmp_path.parent / f"{tmp_path.name}-export.ndjson"
+    main(['--export', 'ndjson', '--output', str(output), '--since', '2022-01-01', '--until', TODAY])
+
+    after = snapshot_tree(tmp_path)
+    assert after['app_usage.sqlite3'] == before['app_usage.sqlite3']
+    assert after['app_config.json'] == before['app_config.json']
+    assert not Path('app_usage_data').exists()
+    with open(output) as f:
+        rows = [json.loads(line) for line in f]
+    os.remove(output)
+    assert [(row['date'], row['app'], row['ms']) for row in rows] == [(TODAY, 'a.exe', 5000)]
+
+
+@pytest.mark.parametrize('body', [b'<html>hola</html>', b'{"version": 2}'])
+def test_other_program_on_the_port_is_not_a_tracker(tmp_path, monkeypatch, body):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = HTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    try:
+        port = httpd.server_address[1]
+        assert not TrackerClient(port).ping()
+
+        # La exportación lee entonces los datos sin pasar por la API
+        monkeypatch.chdir(tmp_path)
+        store = UsageStore(Path('app_usage_data'))
+        store.load(TODAY)
+        store.record_presence(TODAY, {'a.exe': {'Editor'}}, 5000)
+        store.close()
+        output = tmp_path / 'export.csv'
+        main(['--export', 'csv', '--output', str(output), '--port', str(port), '--since', TODAY, '--until', TODAY])
+        with open(output, newline='') as f:
+            assert [(row['process'], row['ms']) for row in csv.DictReader(f)] == [('a.exe', '5000')]
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
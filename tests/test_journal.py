@@ -0,0 +1,64 @@
+"""Diario de UsageStore: reproducción tras un cierre abrupto."""
+from TimeTracker import UsageStore
+
+DAY = '2024-03-12'
+
+
+def test_torn_last_line_is_cut_before_appending(tmp_path):
+    store = UsageStore(tmp_path / 'data')
+    store.load(DAY)
+    store.record_presence(DAY, {'a.exe': {'Editor'}}, 1000)
+    store.close()
+    # Cierre abrupto a mitad de una línea: solo queda la cabecera y un registro incompleto
+    with open(store.journal_file, 'a', encoding='utf-8') as f:
+        f.write('{"s":2,"d":"2024-03-12","m":{"a.ex')
+
+    store = UsageStore(tmp_path / 'data')
+    store.load(DAY)
+    store.record_presence(DAY, {'a.exe': {'Documento'}}, 2000)
+    store.flush()
+    store._journal.close()
+    assert store.journal_file.read_text(encoding='utf-8').endswith('\n')
+
+    reopened = UsageStore(tmp_path / 'data')
+    day = reopened.load(DAY)
+    assert day['a.exe']['ms'] == 3000
+    assert day['a.exe']['titles'] == {'Editor': 1000, 'Documento': 2000}
+    reopened.close()
+
+
+def test_unknown_title_id_keeps_app_totals(tmp_path):
+    store = UsageStore(tmp_path / 'data')
+    store.load(DAY)
+    for _ in range(3):
+        store.record_presence(DAY, {'a.exe': {'Editor'}}, 1000, focused='a.exe')
+        store.flush()
+    store._journal.close()
+    # Se daña la primera línea del tramo, la que declara el id de "Editor"
+    lines = store.journal_file.read_text(encoding='utf-8').splitlines(keepends=True)
+    lines[0] = '{"s":' + '\n'
+    store.journal_file.write_text(''.join(lines), encoding='utf-8')
+
+    reopened = UsageStore(tmp_path / 'data')
+    day = reopened.load(DAY)
+    assert day['a.exe']['ms'] == 2000
+    assert day['a.exe']['focus_ms'] == 2000
+    assert day['a.exe']['titles'] == {UsageStore.OTHER_TITLES: 2000}
+    reopened.close()
+
+
+def test_focused_title_is_replayed(tmp_path):
+    store = UsageStore(tmp_path / 'data')
+    store.load(DAY)
+    store.record_presence(DAY, {'a.exe': {'Editor', 'Hoja'}}, 1000, focused='a.exe', focused_title='Hoja')
+    store.record_presence(DAY, {'a.exe': {'Editor', 'Hoja'}}, 1000, focused='a.exe', focused_title='Editor')
+    store.flush()
+    store._journal.close()
+
+    reopened = UsageStore(tmp_path / 'data')
+    data = reopened.load(DAY)['a.exe']
+    assert data['focus_ms'] == 2000
+    assert data['title_focus'] == {'Hoja': 1000, 'Editor': 1000}
+    reopened.close()
+    # Y tras compactar, desde el snapshot
+    assert UsageStore(tmp_path / 'data').load(DAY)['a.exe']['title_focus'] == {'Hoja': 1000, 'Editor': 1000}
@@ -0,0 +1,42 @@
+"""Escrituras agrupadas y cierre de sesión de TrackerCore."""
+import json
+import time
+
+from TimeTracker import SimulatedWindowSource, TrackerCore
+
+
+def test_session_end_writes_without_stopping_the_sampler(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with open('app_config.json', 'w') as f:
+        json.dump({'flush_interval': 3600}, f)
+    source = SimulatedWindowSource(windows=5, processes=2, churn=0)
+    core = TrackerCore(source)
+    core.idle_tick_interval = 3600  # Sin un tick que acredite antes de tiempo
+    core.ui_visible = False
+    try:
+        core.start_sampler()
+        time.sleep(0.3)
+        core.on_session_end()
+        # El usuario puede cancelar el cierre: el muestreo sigue corriendo
+        assert core.tracking
+        assert core._sampler_thread.is_alive()
+        journal = core.store.journal_file.read_text(encoding='utf-8')
+        credited = sum(update[0] for line in journal.splitlines() for update in json.loads(line)['m'].values())
+        assert credited >= 200 * len(source.process_names)
+    finally:
+        core.shutdown()
+    assert not core._sampler_thread.is_alive()
+
+
+def test_byte_budget_is_configurable(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with open('app_config.json', 'w') as f:
+        json.dump({'byte_budget': 4096}, f)
+    core = TrackerCore(SimulatedWindowSource())
+    try:
+        assert core.persistence.byte_budget == 4096
+        core.write_config()
+    finally:
+        core.shutdown()
+    with open('app_config.json') as f:
+        assert json.load(f)['byte_budget'] == 4096
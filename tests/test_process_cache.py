@@ -0,0 +1,55 @@
+"""Caché PID -> nombre de proceso de WindowSampler."""
+from TimeTracker import ActiveWindowModel, ProcessNameCache, SimulatedWindowSource, WindowSampler
+
+
+class CountingSource(SimulatedWindowSource):
+    """Cuenta las consultas de identidad; el nombre no se pide por separado."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.identity_calls = 0
+
+    def get_process_identity(self, pid):
+        self.identity_calls += 1
+        return super().get_process_identity(pid)
+
+    def get_process_name(self, pid):
+        if self.identity_calls == 0:
+            raise AssertionError("el nombre se consulta junto con la hora de creación")
+        return super().get_process_name(pid)
+
+
+def test_miss_reads_name_and_create_time_together():
+    source = CountingSource(windows=1, processes=1)
+    cache = ProcessNameCache(source)
+    assert cache.get(1) == 'proc0001.exe'
+    assert cache.get(1) == 'proc0001.exe'
+    assert source.identity_calls == 1
+    assert (cache.misses, cache.hits) == (1, 1)
+
+
+def test_reused_pid_in_a_new_window_gets_the_new_name():
+    source = SimulatedWindowSource(windows=1, processes=1, churn=0)
+    window = source.windows[1]
+    window[0] = 1
+    window[2:] = [(0, 0, 800, 800), True]
+    model = ActiveWindowModel(WindowSampler(source, removed_apps=set()))
+    model.resync()
+    source.pop_changes()
+    assert set(model.active_apps()) == {'proc0001.exe'}
+
+    # El proceso termina y, segundos después, el sistema da su PID a otro
+    source.close_window(1)
+    source.process_names[1] = 'otro.exe'
+    source.create_times[1] = 42.0
+    hwnd = source.open_window()
+    source.windows[hwnd][0] = 1
+    source.windows[hwnd][2:] = [(0, 0, 800, 800), True]
+    model.update(source.pop_changes())
+    assert set(model.active_apps()) == {'otro.exe'}
+
+    # Una ventana ya conocida sigue usando la caché
+    revalidations = model.sampler.process_cache.revalidations
+    source.set_title(hwnd, "Otro título")
+    model.update(source.pop_changes())
+    assert model.sampler.process_cache.revalidations == revalidations
@@ -0,0 +1,62 @@
+"""Reportes por rango: el motor en columnas coincide con los resúmenes por semana y mes."""
+import json
+import random
+from datetime import date, timedelta
+from pathlib import Path
+
+from TimeTracker import ColumnarUsage, TrackerCore, UsageStore, WindowSource
+
+
+def write_history(days, apps=30):
+    """Escribe `days` días terminando hoy y devuelve la fecha del primero."""
+    rng = random.Random(0)
+    names = [f"app{i:02d}.exe" for i in range(apps)]
+    store = UsageStore(Path('app_usage_data'))
+    store.load(date.today().isoformat())
+    first = date.today() - timedelta(days=days - 1)
+    for offset in range(days):
+        store.write_snapshot((first + timedelta(days=offset)).isoformat(), {
+            name: {'ms': rng.randint(1, 3600) * 1000, 'last_seen': 0.0, 'focus_ms': rng.randint(0, 600) * 1000}
+            for name in rng.sample(names, 10)
+        }, 0)
+    store.close()
+    with open('app_config.json', 'w') as f:
+        json.dump({'tracked_apps': names, 'archive_after_days': 0}, f)
+    return first
+
+
+def report(engine, first, metric_mode='visible'):
+    with open('app_config.json') as f:
+        config = json.load(f)
+    config.update(report_engine=engine, tracking_mode=metric_mode)
+    with open('app_config.json', 'w') as f:
+        json.dump(config, f)
+    core = TrackerCore(WindowSource())
+    try:
+        today = date.today()
+        return [core.report_totals(start, end) for start, end in (
+            (first, today), (first, today - timedelta(days=2)), (today - timedelta(days=1), today),
+            (first + timedelta(days=10), first + timedelta(days=40)), (today, today),
+        )]
+    finally:
+        core.shutdown()
+
+
+def test_columnar_engine_matches_rollups(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    first = write_history(120)
+    for mode in ('visible', 'focus'):
+        reports = report('columnar', first, mode)
+        assert all(reports)
+        assert reports == report('rollups', first, mode)
+
+
+def test_columnar_round_trips_legacy_shape():
+    history = {
+        '2024-01-01': {'a.exe': {'ms': 5000, 'last_seen': None, 'focus_ms': 2000}},
+        '2024-01-02': {'a.exe': {'ms': 1000, 'last_seen': None}, 'b.exe': {'ms': 7000, 'last_seen': None}},
+    }
+    columnar = ColumnarUsage.from_legacy(history)
+    assert columnar.to_legacy() == history
+    assert columnar.totals(metric='focus_ms') == {'a.exe': 2000}
+    assert columnar.totals(date(2024, 1, 2), date(2024, 1, 2)) == {'a.exe': 1000, 'b.exe': 7000}
@@ -0,0 +1,152 @@
+"""Bucle de muestreo guiado por eventos, con ventanas simuladas y relojes falsos."""
+from datetime import datetime
+
+from TimeTracker import SimulatedWindowSource, TrackerCore
+
+DAY = '2024-03-12'
+
+
+class FakeClock:
+    """Reloj monotónico y de pared que solo avanza con advance()."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.wall = datetime(2024, 3, 12, 10, 0).timestamp()
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.wall
+
+    def advance(self, seconds):
+        self.now += seconds
+        self.wall += seconds
+
+
+class ScriptedEvents:
+    """Origen de eventos que, en cada espera, avanza el reloj y aplica un paso del guion.
+
+    `step(source, clock)` simula lo que pasa durante la espera; el muestreo se
+    detiene cuando el reloj llega a `until`.
+    """
+
+    def __init__(self, core, source, clock, step, until, period=0.01):
+        self.core = core
+        self.source = source
+        self.clock = clock
+        self.step = step
+        self.until = until
+        self.period = period
+        self._first = True
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def wake(self):
+        pass
+
+    def wait(self, timeout):
+        if self._first:
+            self._first = False
+            self.source.pop_changes()
+            return None
+        self.clock.advance(min(timeout, self.period))
+        self.step(self.source, self.clock)
+        if self.clock.now >= self.until:
+            self.core.tracking = False
+        return self.source.pop_changes()
+
+
+def run_sampler(tmp_path, monkeypatch, step, seconds, pids=(1,), period=0.01):
+    """Ejecuta track_usage en este hilo durante `seconds` simulados; devuelve (core, fuente, créditos).
+
+    `pids` es el proceso de cada ventana (hwnd 1, 2, ...); el foco empieza en la primera.
+    """
+    monkeypatch.chdir(tmp_path)
+    clock = FakeClock()
+    source = SimulatedWindowSource(windows=len(pids), processes=max(pids), churn=0, clock=clock.monotonic)
+    for pid, window in zip(pids, source.windows.values()):
+        window[0] = pid
+        window[2:] = [(0, 0, 800, 800), True]
+    core = TrackerCore(source)
+    core.set_clocks(clock.monotonic, clock.time)
+    core.event_source = ScriptedEvents(core, source, clock, step, clock.now + seconds, period)
+    credits = []
+    record_presence = core.store.record_presence
+    monkeypatch.setattr(core.store, 'record_presence',
+                        lambda *args, **kwargs: credits.append(args) or record_presence(*args, **kwargs))
+    core.tracking = True
+    core.track_usage()
+    return core, source, credits
+
+
+def test_title_changes_are_coalesced(tmp_path, monkeypatch):
+    titles = iter(range(10 ** 6))
+
+    def retitle(source, clock):
+        source.set_title(1, f"Compilando {next(titles)}")
+
+    core, source, credits = run_sampler(tmp_path, monkeypatch, retitle, 3.0)
+    try:
+        # Un título cada 10 ms durante 3 s: como mucho un registro por segundo, más el tramo final
+        assert len(credits) <= 4
+        assert core.store.day_totals(DAY) == {'proc0001.exe': 3000}
+    finally:
+        core.shutdown()
+
+
+def test_only_the_foreground_window_gets_focus_time(tmp_path, monkeypatch):
+    def switch(source, clock):
+        elapsed = clock.now - 1000.0
+        if elapsed == 1.0:
+            source.focus_window(2)  # Otra ventana de la misma app
+        elif elapsed == 2.0:
+            source.focus_window(3)
+
+    core, source, _ = run_sampler(tmp_path, monkeypatch, switch, 3.0, pids=(1, 1, 2), period=0.25)
+    try:
+        assert core.store.day_totals(DAY) == {'proc0001.exe': 3000, 'proc0002.exe': 3000}
+        assert core.store.day_totals(DAY, 'focus_ms') == {'proc0001.exe': 2000, 'proc0002.exe': 1000}
+        day = core.store.get_day(DAY)
+        assert day['proc0001.exe']['title_focus'] == {'Documento 1': 1000, 'Documento 2': 1000}
+        assert day['proc0002.exe']['title_focus'] == {'Documento 3': 1000}
+    finally:
+        core.shutdown()
+
+
+def test_idle_pauses_focus_but_not_visible_time(tmp_path, monkeypatch):
+    def idle_between_2_and_3(source, clock):
+        elapsed = clock.now - 1000.0
+        if 2.0 <= elapsed < 3.0:
+            source.set_idle(300)
+        elif elapsed == 3.0:
+            source.advance()  # Vuelve la entrada del usuario
+
+    core, source, _ = run_sampler(tmp_path, monkeypatch, idle_between_2_and_3, 4.0, pids=(1, 2), period=0.25)
+    try:
+        assert core.store.day_totals(DAY) == {'proc0001.exe': 4000, 'proc0002.exe': 4000}
+        assert core.store.day_totals(DAY, 'focus_ms') == {'proc0001.exe': 3000}
+    finally:
+        core.shutdown()
+
+
+def test_both_modes_come_from_one_pass(tmp_path, monkeypatch):
+    def switch(source, clock):
+        if clock.now - 1000.0 == 1.0:
+            source.focus_window(2)
+
+    core, source, credits = run_sampler(tmp_path, monkeypatch, switch, 3.0, pids=(1, 2), period=0.25)
+    try:
+        # Cada crédito registra a la vez el tiempo visible y el de primer plano
+        assert all(args[4] is not None for args in credits)
+        visible = core.title_breakdown(DAY, 'proc0001.exe')
+        core.set_tracking_mode('focus')
+        assert core.snapshot.totals == {'proc0001.exe': 1000, 'proc0002.exe': 2000}
+        assert core.title_breakdown(DAY, 'proc0001.exe') == [('Documento 1', 1)]
+        assert visible == [('Documento 1', 3)]
+    finally:
+        core.shutdown()
@@ -0,0 +1,114 @@
+"""Importación de los datos JSON al abrir SqliteUsageStore."""
+import pytest
+
+from TimeTracker import SqliteUsageStore, UsageStore
+
+DAY = '2024-03-12'
+
+
+def write_json_history(data_dir):
+    store = UsageStore(data_dir)
+    store.load(DAY)
+    store.record_presence(DAY, {'a.exe': {'Editor'}}, 60000)
+    store.record_presence('2024-03-11', {'b.exe': {'Hoja'}}, 30000)
+    store.close()
+
+
+def test_failed_import_is_retried(tmp_path, monkeypatch):
+    write_json_history(tmp_path / 'json')
+    db_file = tmp_path / 'usage.sqlite3'
+
+    def failing_get_day(self, date, create=True):
+        raise OSError("disco desconectado")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(UsageStore, 'get_day', failing_get_day)
+        with pytest.raises(OSError):
+            SqliteUsageStore(db_file, import_dir=tmp_path / 'json').load(DAY)
+    assert db_file.exists()
+
+    store = SqliteUsageStore(db_file, import_dir=tmp_path / 'json')
+    store.load(DAY)
+    assert store.day_totals(DAY) == {'a.exe': 60000}
+    assert store.day_totals('2024-03-11') == {'b.exe': 30000}
+    store.close()
+
+    # Ya importada: abrirla otra vez no duplica el historial
+    store = SqliteUsageStore(db_file, import_dir=tmp_path / 'json')
+    store.load(DAY)
+    assert store.day_totals(DAY) == {'a.exe': 60000}
+    store.close()
+
+
+def test_database_without_json_is_marked_imported(tmp_path):
+    db_file = tmp_path / 'usage.sqlite3'
+    store = SqliteUsageStore(db_file, import_dir=tmp_path / 'json')
+    store.load(DAY)
+    store.record_presence(DAY, {'a.exe': {'Editor'}}, 1000)
+    store.close()
+    # Datos JSON que aparecen después no se mezclan con una base en uso
+    write_json_history(tmp_path / 'json')
+    store = SqliteUsageStore(db_file, import_dir=tmp_path / 'json')
+    store.load(DAY)
+    assert store.day_totals(DAY) == {'a.exe': 1000}
+    store.close()
+
+
+def test_title_focus_time_survives_old_schema(tmp_path):
+    import sqlite3
+
+    db_file = tmp_path / 'usage.sqlite3'
+    # Base anterior al tiempo en primer plano por título
+    conn = sqlite3.connect(db_file)
+    conn.execute("CREATE TABLE titles (day TEXT NOT NULL, app TEXT NOT NULL, title TEXT NOT NULL,"
+                 " ms INTEGER NOT NULL, PRIMARY KEY (day, app, title)) WITHOUT ROWID")
+    conn.execute("INSERT INTO titles VALUES (?, 'a.exe', 'Editor', 5000)", (DAY,))
+    conn.execute(f"PRAGMA user_version = {SqliteUsageStore.IMPORTED}")
+    conn.commit()
+    conn.close()
+
+    store = SqliteUsageStore(db_file, import_dir=tmp_path / 'json', title_top_k=1)
+    store.load(DAY)
+    store.record_presence(DAY, {'a.exe': {'Editor', 'Hoja'}}, 1000, focused='a.exe', focused_title='Hoja')
+    store.record_presence(DAY, {'a.exe': {'Editor', 'Hoja'}}, 1000, focused='a.exe', focused_title='Editor')
+    store.flush()
+    data = store.get_day(DAY)['a.exe']
+    assert data['titles'] == {'Editor': 7000, SqliteUsageStore.OTHER_TITLES: 2000}
+    assert data['title_focus'] == {'Editor': 1000, SqliteUsageStore.OTHER_TITLES: 1000}
+    store.close()
+
+
+def test_import_leaves_the_json_files_in_place(tmp_path):
+    import json
+
+    write_json_history(tmp_path / 'json')
+    # Registros que siguen en el diario, sin compactar
+    store = UsageStore(tmp_path / 'json')
+    store.load(DAY)
+    store.record_presence(DAY, {'c.exe': {'Consola'}}, 2000)
+    store.flush()
+    store._journal.close()
+    journal = store.journal_file.read_bytes()
+    legacy_file = tmp_path / 'app_usage_data.json'
+    legacy_file.write_text(json.dumps({'2023-01-05': {'d.exe': {'time': 30, 'last_seen': 0.0}}}))
+
+    store = SqliteUsageStore(tmp_path / 'usage.sqlite3', import_dir=tmp_path / 'json', legacy_file=legacy_file)
+    store.load(DAY)
+    assert store.day_totals(DAY) == {'a.exe': 60000, 'c.exe': 2000}
+    assert store.day_totals('2023-01-05') == {'d.exe': 30000}
+    store.close()
+    assert legacy_file.exists()
+    assert store.import_dir.joinpath('journal.log').read_bytes() == journal
+
+
+def test_import_from_only_a_legacy_file(tmp_path):
+    import json
+
+    legacy_file = tmp_path / 'app_usage_data.json'
+    legacy_file.write_text(json.dumps({'2023-01-05': {'d.exe': {'time': 30, 'last_seen': 0.0}}}))
+    store = SqliteUsageStore(tmp_path / 'usage.sqlite3', legacy_file=legacy_file)
+    store.load(DAY)
+    assert store.day_totals('2023-01-05') == {'d.exe': 30000}
+    store.close()
+    assert legacy_file.exists()
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['app_usage_data.json', 'usage.sqlite3']
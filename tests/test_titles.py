@@ -0,0 +1,40 @@
+"""La tabla de títulos internados no crece con cada título visto desde el arranque."""
+from pathlib import Path
+
+from TimeTracker import SqliteUsageStore, UsageStore
+
+DAY = '2024-03-12'
+
+
+def record_distinct_titles(store, ticks):
+    for tick in range(ticks):
+        # Un título que se repite en todos los ticks y uno distinto por tick
+        store.record_presence(DAY, {'a.exe': {'Editor', f"Documento {tick}"}}, 1000)
+        store.flush()
+
+
+def test_usage_store_prunes_titles_at_compaction(tmp_path):
+    store = UsageStore(tmp_path / 'data', compact_every=100, title_top_k=5)
+    store.load(DAY)
+    record_distinct_titles(store, 2000)
+    # Quedan los del día en caché (recortado al doble del top-k) más los del último tramo del diario
+    assert len(store.titles.titles) <= 2 * 5 + 1 + 100
+    store.record_presence(DAY, {'a.exe': {'Editor'}}, 1000)
+    store.flush()
+    store._journal.close()  # Cierre abrupto: el diario se reproduce al abrir
+
+    reopened = UsageStore(tmp_path / 'data')
+    day = reopened.load(DAY)
+    assert day['a.exe']['ms'] == 2001 * 1000
+    assert day['a.exe']['titles']['Editor'] == 2001 * 1000
+    assert sum(day['a.exe']['titles'].values()) == 2 * 2000 * 1000 + 1000
+    reopened.close()
+
+
+def test_sqlite_store_keeps_no_titles_in_memory(tmp_path):
+    store = SqliteUsageStore(Path(tmp_path) / 'usage.sqlite3', title_top_k=5)
+    store.load(DAY)
+    record_distinct_titles(store, 500)
+    assert len(store.titles.titles) == 0
+    assert store.get_day(DAY)['a.exe']['titles']['Editor'] == 500 * 1000
+    store.close()